@@ -0,0 +1,227 @@
+"""
+促銷區 / 體驗區偵測流程的離線效能評測（不開視窗）。
+
+以錄製的影片或合成影像逐幀呼叫 SalesAreaDetection.detect / ExperienceAreaDetection.detect，
+統計端到端 FPS、p50/p99 延遲、各階段延遲（由 time_logger 的延遲紀錄器取得）與峰值記憶體 (RSS)，
+結果存成 JSON，可用 --compare 與其他 commit 的結果比較。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_pipelines --area sales --video data/cam4.mp4 --rois rois.json --frames 300
+    python -m benchmarks.bench_pipelines --area both --synthetic 200 --output benchmarks/results/cpu.json
+    python -m benchmarks.bench_pipelines --area sales --synthetic 200 --compare benchmarks/results/cpu.json
+
+--rois 為 JSON 檔，格式與 /camera-area 的 area_list 相同：[{"id": ..., "name": ..., "position": [[x, y], ...]}]；
+未指定時使用畫面中央的一個 ROI。模型權重與執行裝置依 src/config/config.py 的設定載入。
+峰值 RSS 為整個進程的峰值，--area both 時體驗區的數值包含促銷區，需要個別數值時請分開執行。
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from typing import Dict, Iterator, List, Optional
+import cv2
+import numpy as np
+from src.services.monitoring.latencyRecorder import get_latency_recorder
+
+
+def peak_rss_mb() -> float:
+    """目前進程的峰值 RSS (MB)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 單位為 KB，macOS 為 bytes
+        return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    except ImportError:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def video_frames(path: str, limit: int) -> Iterator[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video: {path}")
+    count = 0
+    try:
+        while limit <= 0 or count < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def synthetic_frames(count: int, width: int, height: int, seed: int) -> Iterator[np.ndarray]:
+    """固定亂數種子的合成影像：模糊雜訊背景 + 數個移動的色塊"""
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8), (0, 0), 5)
+    blobs = [(rng.integers(0, width), rng.integers(0, height), rng.integers(-8, 8), rng.integers(-8, 8),
+              tuple(int(c) for c in rng.integers(0, 255, size=3))) for _ in range(6)]
+    size = max(16, min(width, height) // 10)
+    for index in range(count):
+        frame = background.copy()
+        for x, y, dx, dy, color in blobs:
+            cx, cy = int(x + dx * index) % width, int(y + dy * index) % height
+            cv2.rectangle(frame, (cx, cy), (cx + size, cy + size * 2), color, -1)
+        yield frame
+
+
+def default_rois(width: int, height: int) -> List[dict]:
+    x1, y1, x2, y2 = width // 4, height // 4, width * 3 // 4, height * 3 // 4
+    return [{"id": "area_1", "name": "Benchmark Area", "position": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]}]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def build_detector(area: str):
+    """建立偵測器並關閉視覺化，回傳 (detector, 單幀呼叫函式)"""
+    if area == 'sales':
+        from src.services.detect import salesAreaDetection as module
+        module.VISUAL = False
+        detector = module.SalesAreaDetection()
+        return detector, lambda camera_id, frame, args: detector.detect(
+            cameraId=camera_id, image=frame, ROIs_info=args.roi_info, record_mode=False)
+    from src.services.detect import experienceAreaDetection as module
+    module.VISUAL = False
+    detector = module.ExperienceAreaDetection()
+    return detector, lambda camera_id, frame, args: detector.detect(
+        cameraId=camera_id, image=frame, products_of_interest=args.products)
+
+
+def run_area(area: str, args) -> Dict[str, object]:
+    detector, detect = build_detector(area)
+    frames = video_frames(args.video, args.frames + args.warmup if args.frames > 0 else 0) if args.video else \
+        synthetic_frames(args.synthetic + args.warmup, args.width, args.height, args.seed)
+    camera_id = os.path.basename(args.video) if args.video else 'synthetic'
+    recorder = get_latency_recorder()
+
+    latencies = []
+    wall_start = None
+    for index, frame in enumerate(frames):
+        if index == args.warmup:
+            # 暖機結束後才開始統計（模型初始化、CUDA/ONNX 首次執行較慢）
+            recorder.reset()
+            wall_start = time.perf_counter()
+        if args.roi_info is None:
+            args.roi_info = default_rois(frame.shape[1], frame.shape[0])
+        start = time.perf_counter_ns()
+        detect(camera_id, frame, args)
+        if index >= args.warmup:
+            latencies.append((time.perf_counter_ns() - start) / 1e6)
+    wall = time.perf_counter() - wall_start if wall_start is not None else 0.0
+
+    if hasattr(detector, 'close'):
+        detector.close()
+
+    latencies.sort()
+    stages = {stage: cameras.get(camera_id) or next(iter(cameras.values()))
+              for stage, cameras in recorder.snapshot().items()}
+    return {
+        "frames": len(latencies),
+        "fps": round(len(latencies) / wall, 3) if wall > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.5), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "stages": {
+            stage: dict(summary, fps=round(1000.0 / summary['avg_ms'], 2) if summary['avg_ms'] else None)
+            for stage, summary in sorted(stages.items())
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(current: dict, baseline: dict) -> None:
+    """印出與基準結果的差異（FPS 與 p99 延遲）"""
+    print(f"\ncompare with {baseline.get('meta', {}).get('commit')}:")
+    for area, result in current['results'].items():
+        base = baseline.get('results', {}).get(area)
+        if not base:
+            print(f"  {area}: no baseline")
+            continue
+        def change(new, old):
+            return f"{(new - old) / old:+.1%}" if old else "n/a"
+        print(f"  {area}: fps {base['fps']} -> {result['fps']} ({change(result['fps'], base['fps'])}), "
+              f"p99 {base['latency_ms']['p99']} -> {result['latency_ms']['p99']} ms "
+              f"({change(result['latency_ms']['p99'], base['latency_ms']['p99'])}), "
+              f"peak RSS {base['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+        for stage, summary in result['stages'].items():
+            old = base.get('stages', {}).get(stage)
+            if old:
+                print(f"    {stage}: p50 {old['p50_ms']} -> {summary['p50_ms']} ms "
+                      f"({change(summary['p50_ms'], old['p50_ms'])})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Detection pipeline benchmark')
+    parser.add_argument('--area', choices=['sales', 'experience', 'both'], default='both', help='Pipeline to benchmark')
+    parser.add_argument('--video', type=str, default=None, help='Recorded video to replay')
+    parser.add_argument('--frames', type=int, default=0, help='Max frames to read from the video (0 = all)')
+    parser.add_argument('--synthetic', type=int, default=100, help='Number of synthetic frames when --video is not set')
+    parser.add_argument('--width', type=int, default=1920, help='Synthetic frame width')
+    parser.add_argument('--height', type=int, default=1080, help='Synthetic frame height')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for synthetic frames')
+    parser.add_argument('--warmup', type=int, default=5, help='Frames excluded from the statistics')
+    parser.add_argument('--rois', type=str, default=None, help='JSON file with the sales-area ROI list')
+    parser.add_argument('--products', type=str, default='', help='Comma separated experience-area products of interest')
+    parser.add_argument('--output', type=str, default=None,
+                        help='JSON output path (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline JSON to compare with')
+    args = parser.parse_args()
+
+    args.roi_info = None
+    if args.rois:
+        with open(args.rois, 'r', encoding='utf-8') as f:
+            args.roi_info = json.load(f)
+    args.products = [product for product in args.products.split(',') if product]
+
+    get_latency_recorder().configure(enabled=True, sample_rate=1.0)
+    areas = ['sales', 'experience'] if args.area == 'both' else [args.area]
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "source": args.video or f"synthetic {args.width}x{args.height} seed={args.seed}",
+            "warmup": args.warmup,
+        },
+        "results": {},
+    }
+    for area in areas:
+        result = run_area(area, args)
+        report['results'][area] = result
+        print(f"{area}: {result['frames']} frames, {result['fps']} FPS, "
+              f"p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms, "
+              f"peak RSS {result['peak_rss_mb']} MB")
+        for stage, summary in result['stages'].items():
+            print(f"  {stage:<45} p50 {summary['p50_ms']:>9} ms  p99 {summary['p99_ms']:>9} ms  n={summary['count']}")
+
+    output = args.output or os.path.join('benchmarks', 'results', f"{report['meta']['commit'] or 'result'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nsaved: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
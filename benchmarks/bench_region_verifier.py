@@ -0,0 +1,95 @@
+"""
+二次檢查比對引擎的效能與一致性評測。
+
+以合成的商品裁切影像與遮罩，比較舊流程（skimage 彩色 SSIM + utils.compare_masks）
+與 RegionVerifier 的執行時間，並檢查分數差異與丟失判定的一致率。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_region_verifier --samples 200
+"""
+import time
+import argparse
+import cv2
+import numpy as np
+from skimage.metrics import structural_similarity as ssim
+from src.utils.utils import utils
+from src.services.track.regionVerifier import RegionVerifier
+from src.config.config import SSIM_THRESHOLD, MASK_SIMILARITY_THRESHOLD
+
+
+def make_sample(rng: np.random.Generator, min_side: int = 80, max_side: int = 320):
+    """產生一組 (原始裁切, 當前裁切, 原始遮罩, 當前遮罩)，約一半為商品被拿走的情境"""
+    h, w = rng.integers(min_side, max_side, size=2)
+    base = cv2.GaussianBlur(rng.integers(0, 255, size=(h, w, 3), dtype=np.uint8), (0, 0), 3)
+    origin_mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.ellipse(origin_mask, (w // 2, h // 2), (w // 3, h // 3), 0, 0, 360, 255, -1)
+    origin = base.copy()
+    origin[origin_mask > 0] = (origin[origin_mask > 0] * 0.5 + 100).astype(np.uint8)
+
+    if rng.random() < 0.5:
+        # 商品仍在：加入輕微雜訊與位移
+        current = np.clip(origin.astype(np.int16) + rng.integers(-8, 8, size=origin.shape), 0, 255).astype(np.uint8)
+        current_mask = np.roll(origin_mask, int(rng.integers(-3, 3)), axis=1)
+    else:
+        # 商品被拿走：只剩背景與較小的殘留遮罩
+        current = base.copy()
+        current_mask = np.zeros_like(origin_mask)
+        cv2.ellipse(current_mask, (w // 3, h // 3), (w // 8, h // 6), 0, 0, 360, 255, -1)
+    return origin, current, origin_mask, current_mask
+
+
+def legacy_scores(origin, current, origin_mask, current_mask):
+    ssim_score, _ = ssim(origin, current, full=True, channel_axis=-1)
+    mask_similarity = utils.compare_masks(origin_mask, current_mask)
+    missing = ssim_score < SSIM_THRESHOLD or mask_similarity < MASK_SIMILARITY_THRESHOLD
+    return ssim_score, mask_similarity, missing
+
+
+def run(samples: int, seed: int, max_side: int):
+    rng = np.random.default_rng(seed)
+    data = [make_sample(rng) for _ in range(samples)]
+    exact = RegionVerifier(max_side=0, early_exit=False)
+    fast = RegionVerifier(max_side=max_side, early_exit=True)
+
+    start = time.perf_counter()
+    legacy = [legacy_scores(*sample) for sample in data]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    full = [exact.verify(o, c, masks=(om, cm)) for o, c, om, cm in data]
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    quick = [fast.verify(o, c, masks=(om, cm)) for o, c, om, cm in data]
+    fast_time = time.perf_counter() - start
+
+    # 灰階 SSIM 與彩色 SSIM 的差異、完整遮罩相似度的差異
+    ssim_diff = np.array([abs(l[0] - r.ssim) for l, r in zip(legacy, full)])
+    mask_diff = np.array([abs(l[1] - r.mask_similarity) for l, r in zip(legacy, full)])
+    exact_agree = np.mean([l[2] == r.missing for l, r in zip(legacy, full)])
+    fast_agree = np.mean([l[2] == r.missing for l, r in zip(legacy, quick)])
+    early_rate = np.mean([r.early_exit for r in quick])
+
+    print(f"samples: {samples}")
+    print(f"legacy            : {legacy_time * 1000 / samples:.3f} ms/sample")
+    print(f"verifier (exact)  : {exact_time * 1000 / samples:.3f} ms/sample")
+    print(f"verifier (fast)   : {fast_time * 1000 / samples:.3f} ms/sample (max_side={max_side})")
+    print(f"SSIM |diff|       : mean {ssim_diff.mean():.4f}, max {ssim_diff.max():.4f}")
+    print(f"Mask |diff|       : mean {mask_diff.mean():.4f}, max {mask_diff.max():.4f}")
+    print(f"decision agreement: exact {exact_agree:.2%}, fast {fast_agree:.2%}")
+    print(f"early exit rate   : {early_rate:.2%}")
+    return exact_agree, fast_agree
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='RegionVerifier benchmark')
+    parser.add_argument('--samples', type=int, default=200, help='Number of synthetic samples')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--max-side', type=int, default=64, help='Downscaled crop size for the fast verifier')
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help='Exit with an error if the decision agreement falls below this ratio')
+    args = parser.parse_args()
+
+    exact_agree, fast_agree = run(args.samples, args.seed, args.max_side)
+    if min(exact_agree, fast_agree) < args.min_agreement:
+        raise SystemExit(f"Decision agreement below {args.min_agreement:.0%}")
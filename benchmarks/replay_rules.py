@@ -0,0 +1,84 @@
+"""
+以模擬時鐘重播錄製的偵測結果，對規則引擎（ObjectTracker、AreaInteractionMonitor、ChairManager）做壓力測試，
+不需要模型權重與影像。
+
+錄製：在 src/config/config.py 設定 DETECTION_RECORD_DIR，偵測進程會把每幀模型推論與追蹤後的結果
+寫成 .npz 檔（每 DETECTION_RECORD_CHUNK 幀一個檔案，結束時寫出剩餘的幀）。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.replay_rules records/sales_1234_20250101-120000_0000.npz
+    python -m benchmarks.replay_rules records/ --repeat 10 --cameras 8 --output benchmarks/results/replay.json
+
+--repeat 將錄製內容依時間接續重播多次；--cameras 將每台相機複製成多台（相機 ID 加上 #n）以模擬更多相機。
+促銷區的丟失二次檢查需要影像，重播時以 --assume-missing / --assume-present 決定結果。
+"""
+import sys
+import json
+import time
+import argparse
+import dataclasses
+from typing import Iterator, List
+from src.services.replay.detectionLog import DetectionLog, RecordedFrame
+from src.services.replay.ruleReplayer import RuleReplayer
+
+
+def expand_frames(detection_log: DetectionLog, repeat: int, cameras: int) -> Iterator[RecordedFrame]:
+    """依 repeat 與 cameras 展開錄製的幀，每次展開都重新解碼，規則引擎修改偵測結果時不會互相影響"""
+    gap = detection_log.duration() + 1.0
+    for index in range(repeat):
+        offset = gap * index
+        copies = [iter(detection_log) for _ in range(cameras)]
+        for frames in zip(*copies):
+            for copy_index, frame in enumerate(frames):
+                yield dataclasses.replace(
+                    frame,
+                    camera_id=frame.camera_id if cameras == 1 else f"{frame.camera_id}#{copy_index}",
+                    timestamp=frame.timestamp + offset)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay recorded detections through the rule engines')
+    parser.add_argument('paths', nargs='+', help='Detection log files (.npz) or directories')
+    parser.add_argument('--repeat', type=int, default=1, help='Replay the recording N times back to back')
+    parser.add_argument('--cameras', type=int, default=1, help='Clone every camera N times')
+    parser.add_argument('--limit', type=int, default=None, help='Max frames to replay')
+    parser.add_argument('--assume-missing', dest='assume_missing', action='store_true', default=True,
+                        help='Second check confirms missing products (default)')
+    parser.add_argument('--assume-present', dest='assume_missing', action='store_false',
+                        help='Second check rejects missing products')
+    parser.add_argument('--events', action='store_true', help='Print every replayed event')
+    parser.add_argument('--output', type=str, default=None, help='JSON output path')
+    args = parser.parse_args()
+
+    detection_log = DetectionLog.load(args.paths)
+    if len(detection_log) == 0:
+        sys.exit("Detection log is empty")
+    frames: List[RecordedFrame] = list(expand_frames(detection_log, max(1, args.repeat), max(1, args.cameras)))
+    print(f"{detection_log.area}: {len(detection_log)} recorded frames, {len(detection_log.camera_ids())} cameras, "
+          f"{detection_log.duration():.1f} s; replaying {len(frames)} frames")
+
+    replayer = RuleReplayer(area=detection_log.area, assume_missing=args.assume_missing)
+    try:
+        result = replayer.run(frames, limit=args.limit)
+    finally:
+        replayer.close()
+    print(f"{result['frames']} frames in {result['wall_seconds']} s ({result['fps']} FPS), "
+          f"simulated {result['simulated_seconds']} s = {result['speedup']}x real time, {result['events']} events")
+    if args.events:
+        for event in replayer.events:
+            print(f"  {event.timestamp:.3f} {event.camera_id} {event.kind} {event.detail}")
+
+    if args.output:
+        report = {
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "source": args.paths,
+            "area": detection_log.area,
+            "repeat": args.repeat,
+            "cameras": args.cameras,
+            "assume_missing": args.assume_missing,
+            "result": result,
+            "events": [dataclasses.asdict(event) for event in replayer.events],
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"saved: {args.output}")
@@ -8,6 +8,10 @@ from src.services.monitoring.healthCheck import HealthChecker
 from src.services.monitoring.systemMonitor import SystemMonitor
 from src.api.endpoints.experienceArea import ExperienceAreaHandler
 from src.api.endpoints.salesArea import SalesAreaHandler
+from src.api.endpoints.frameIngest import FrameIngestHandler
+from src.api.endpoints.resultStream import ResultStreamHandler
+from src.api.endpoints.latency import LatencyHandler
+from src.api.endpoints.metrics import MetricsHandler
 from src.models.responses import HealthCheckResponse
 from src.services.lib.loggingService import log
 from typing import Optional
@@ -41,6 +45,20 @@ class AIServerAPI:
                     None,  # 進程池將在需要時創建
                     self.frame_buffer
                 )
+                self.frame_ingest_handler = FrameIngestHandler(
+                    self.sales_area_detection,
+                    self.experience_area_detection
+                )
+                self.result_stream_handler = ResultStreamHandler()
+                self.latency_handler = LatencyHandler(
+                    self.sales_area_handler,
+                    self.experience_area_handler
+                )
+                self.metrics_handler = MetricsHandler(
+                    self.sales_area_handler,
+                    self.experience_area_handler,
+                    self.frame_ingest_handler
+                )
                 
                 # 啟動系統監控
                 self.background_tasks = BackgroundTasks()
@@ -66,6 +84,15 @@ class AIServerAPI:
         # 註冊路由
         router.post("/experience-area")(api.experience_area_handler.handle_request)
         router.post("/sales-area")(api.sales_area_handler.handle_request)
+        router.post("/ingest/{area}")(api.frame_ingest_handler.handle_base64)
+        router.post("/ingest/{area}/{camera_id}")(api.frame_ingest_handler.handle_raw)
+        router.get("/ingest-stats")(api.frame_ingest_handler.stats)
+        router.websocket("/results/ws")(api.result_stream_handler.websocket)
+        router.get("/results/sse")(api.result_stream_handler.sse)
+        router.get("/results/stats")(api.result_stream_handler.stats)
+        router.get("/latency")(api.latency_handler.query)
+        router.post("/latency/config")(api.latency_handler.configure)
+        router.get("/metrics")(api.metrics_handler.metrics)
         router.get("/health", response_model=HealthCheckResponse)(api.health_check)
         router.post("/shutdown")(api.shutdown_endpoint)
 
@@ -102,6 +129,8 @@ class AIServerAPI:
         """關閉所有服務"""
         if hasattr(self, 'system_monitor'):
             self.system_monitor.stop_monitoring()
+        if hasattr(self, 'frame_ingest_handler'):
+            self.frame_ingest_handler.shutdown()
         cv2.destroyAllWindows()
 
     def __del__(self):
@@ -1,10 +1,12 @@
 from fastapi import HTTPException
 from src.services.lib.loggingService import log
 from src.models.requests import ExperienceAreaRequest
-from src.services.lib.processManager import ProcessManager
+from src.core.shardSupervisor import ShardSupervisor
+from src.services.streaming.resultBroadcaster import get_result_broadcaster
 from src.services.utils.cameraUtils import fetch_camera_area, CameraManager, FrameData
 from src.services.monitoring.healthCheck import HealthChecker
-from src.config.config import VISUAL
+from src.services.monitoring.latencyRecorder import get_latency_recorder
+from src.config.config import IPC_METRICS_INTERVAL, EXPERIENCE_AREA_SHARDS, EXPERIENCE_TIME_THRES, LEAVE_TIME_THRES, VISUAL
 import threading
 import signal
 import queue
@@ -19,7 +21,7 @@ class ExperienceAreaHandler:
         self.health_checker = HealthChecker()
 
     @staticmethod
-    def _run_experience_area(stop_event, shared_state):
+    def _run_experience_area(stop_event, channel):
         """
         靜態方法用於在子進程中運行，避免傳遞類實例
         """
@@ -27,13 +29,19 @@ class ExperienceAreaHandler:
             # 在子進程中創建所需的對象
             from src.services.detect.experienceAreaDetection import ExperienceAreaDetection
             from src.services.monitoring.healthCheck import HealthChecker
-            from src.services.utils.cameraUtils import CameraManager, fetch_camera_area
+            from src.services.utils.cameraUtils import CameraManager
+            from src.services.utils.cameraConfigClient import get_camera_config_client
+            from src.core.shardSupervisor import CameraAssignment
+            from src.services.utils.frameRateGovernor import FrameRateGovernor
+            from src.services.streaming.resultDelta import ResultDeltaEncoder
             
             detector = ExperienceAreaDetection()
             health_checker = HealthChecker()
             camera_manager = CameraManager(buffer_size=30)
             frame_queue = queue.Queue(maxsize=30)
             shutdown_event = threading.Event()
+            stats = {'frames': 0, 'errors': 0}
+            governor = FrameRateGovernor(min_state_threshold=min(EXPERIENCE_TIME_THRES, LEAVE_TIME_THRES))
             
             # 設置信號處理
             def signal_handler(signum, frame):
@@ -49,16 +57,17 @@ class ExperienceAreaHandler:
                 try:
                     while not (stop_event.is_set() or shutdown_event.is_set()):
                         try:
-                            system_load = health_checker.get_system_load()
-                            process_rate = 2 if system_load["cpu_percent"] > 80 else 1
-
                             for camera_id in list(camera_manager._streams.keys()):
                                 if stop_event.is_set() or shutdown_event.is_set():
                                     return
 
-                                frame_data = camera_manager.get_latest_frame(camera_id, timeout=0.05)
+                                # 依各相機的目標 FPS 取樣，只取最新的一幀
+                                if not governor.is_due(camera_id):
+                                    continue
+                                frame_data, discarded = camera_manager.get_newest_frame(camera_id)
                                 if not frame_data:
                                     continue
+                                governor.mark_scheduled(camera_id, skipped=discarded)
 
                                 try:
                                     frame_queue.put(frame_data, timeout=0.1)
@@ -69,7 +78,7 @@ class ExperienceAreaHandler:
                                     except (queue.Empty, queue.Full):
                                         pass
 
-                            threading.Event().wait(0.001 * process_rate)
+                            threading.Event().wait(0.005)
 
                         except Exception as e:
                             log.error(f"處理幀時發生錯誤: {str(e)}")
@@ -95,15 +104,32 @@ class ExperienceAreaHandler:
                             products_of_interest = frame_data.metadata.get('product_list', [])
                             products_of_interest = [p['name'] for p in products_of_interest]
 
+                            start_time = time.perf_counter()
                             chairs, pillows, persons, image = detector.detect(
                                 cameraId=frame_data.camera_id,
                                 image=frame_data.image,
-                                products_of_interest=products_of_interest
+                                products_of_interest=products_of_interest,
+                                timestamp=frame_data.timestamp
+                            )
+                            stats['frames'] += 1
+                            camera_chairs = detector.chair_manager.get_camera_chairs(frame_data.camera_id)
+                            governor.record(
+                                frame_data.camera_id,
+                                cost=time.perf_counter() - start_time,
+                                active=len(persons) > 0 or any(chair.state == 'in_use' for chair in camera_chairs)
+                            )
+                            channel.send_result(
+                                camera_id=frame_data.camera_id,
+                                area='experience-area',
+                                timestamp=frame_data.timestamp,
+                                persons=persons,
+                                chairs=ResultDeltaEncoder.sections_from(chairs=camera_chairs)['chairs']
                             )
 
                         except queue.Empty:
                             continue
                         except Exception as e:
+                            stats['errors'] += 1
                             log.error(f"分析幀時發生錯誤: {str(e)}")
                             if stop_event.is_set() or shutdown_event.is_set():
                                 return
@@ -124,7 +150,11 @@ class ExperienceAreaHandler:
                         detector.cleanup_visualization()
                     except Exception as e:
                         log.error(f"清理視覺化窗口時發生錯誤: {str(e)}")
-                
+                    try:
+                        detector.close()
+                    except Exception as e:
+                        log.error(f"寫出偵測結果錄製時發生錯誤: {str(e)}")
+
                 if camera_manager:
                     try:
                         log.info("正在停止相機串流...")
@@ -137,18 +167,31 @@ class ExperienceAreaHandler:
                         frame_queue.get_nowait()
                     except queue.Empty:
                         break
+
+                try:
+                    from src.services.notification.notificationClient import shutdown_notification_client
+                    shutdown_notification_client()
+                except Exception as e:
+                    log.error(f"關閉通報客戶端時發生錯誤: {str(e)}")
                 
                 log.info("資源清理完成")
 
             try:
+                # 建立通報客戶端，並補送上次未送達的事件
+                from src.services.notification.notificationClient import get_notification_client
+                get_notification_client(channel='experience')
+
                 # 獲取相機資訊
-                experience_area_info = fetch_camera_area(type='experience')
+                config_client = get_camera_config_client('experience')
+                experience_area_info = config_client.fetch()
                 if not experience_area_info:
                     log.error("未能獲取相機資訊，請檢查服務狀態。")
                     return
 
-                # 初始化所有相機
-                camera_manager.initialize_cameras(experience_area_info)
+                # 初始化本進程負責的相機（由 ShardSupervisor 分配）
+                assignment = CameraAssignment()
+                assignment.apply(channel.poll_control())
+                camera_manager.initialize_cameras(assignment.filter(experience_area_info))
                 camera_manager.start_capture()
 
                 # 啟動工作線程
@@ -158,19 +201,51 @@ class ExperienceAreaHandler:
                     thread.start()
                     threads.append(thread)
 
-                # 等待停止信號
-                while not stop_event.is_set():
+                # 等待停止信號，並處理 API 進程送來的控制訊息
+                last_metrics_time = 0.0
+                while not (stop_event.is_set() or shutdown_event.is_set()):
                     try:
-                        if shared_state.get('update_requested', False):
-                            experience_area_info = fetch_camera_area(type='experience')
-                            for camera_id, info in experience_area_info.items():
+                        assign_changed, update_requested = assignment.apply(channel.poll_control())
+                        diff = None
+                        if update_requested:
+                            # 先取得最新設定，同時收到的分配變更才會以新設定初始化相機
+                            experience_area_info, diff = config_client.refresh()
+                        if assign_changed:
+                            added, removed = assignment.sync_cameras(camera_manager, config_client.config)
+                            for camera_id in removed:
+                                governor.remove(camera_id)
+                            log.info(f"相機分配已更新: 新增 {added}, 釋放 {removed}")
+                        if diff is not None:
+                            for camera_id, info in assignment.filter(diff.added).items():
+                                camera_manager.initialize_camera(
+                                    camera_id=camera_id,
+                                    rtsp_url=info['meta']['rtsp_url'],
+                                    metadata=info
+                                )
+                            for camera_id, info in assignment.filter(diff.changed).items():
                                 camera_manager.update_camera_metadata(
                                     camera_id=camera_id,
                                     metadata={
                                         'product_list': info['product_list']
                                     }
                                 )
-                            shared_state['update_requested'] = False
+                            for camera_id in diff.removed:
+                                camera_manager.release_camera(camera_id)
+                                governor.remove(camera_id)
+
+                        if time.time() - last_metrics_time >= IPC_METRICS_INTERVAL:
+                            last_metrics_time = time.time()
+                            channel.send_metrics({
+                                'frames': stats['frames'],
+                                'errors': stats['errors'],
+                                'queue_size': frame_queue.qsize(),
+                                'cameras': len(camera_manager._streams),
+                                'governor': governor.stats(),
+                                'latency': get_latency_recorder().snapshot(),
+                                'capture': camera_manager.capture_stats(),
+                                'tracker': detector.tracker_stats(),
+                                'notification': get_notification_client().metrics(),
+                            })
                         time.sleep(0.2)
                     except Exception as e:
                         log.error(f"更新處理時發生錯誤: {str(e)}")
@@ -190,7 +265,10 @@ class ExperienceAreaHandler:
     async def handle_request(self, request: ExperienceAreaRequest):
         try:
             if not self.process_manager:
-                self.process_manager = ProcessManager(target_function=self._run_experience_area)
+                self.process_manager = ShardSupervisor(target_function=self._run_experience_area,
+                                                       type='experience',
+                                                       num_shards=EXPERIENCE_AREA_SHARDS,
+                                                       on_result=get_result_broadcaster().publish_result)
 
             if request.action == "start":
                 msg = self.process_manager.start()
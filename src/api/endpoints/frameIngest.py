@@ -0,0 +1,122 @@
+import time
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from src.services.lib.loggingService import log
+from src.models.requests import CameraInput
+from src.services.utils.cameraUtils import FrameData
+from src.services.utils.cameraConfigClient import get_camera_config_client
+from src.services.utils.frameDecoder import decode_jpeg, decode_base64_jpeg
+from src.services.utils.frameIngestor import FrameIngestor
+from src.services.streaming.resultBroadcaster import get_result_broadcaster
+from src.config.config import RECORD_MODE
+
+# 接收路徑的區域名稱 -> 相機設定類型
+AREA_TYPES = {
+    'sales-area': 'promotion',
+    'experience-area': 'experience',
+}
+
+
+class FrameIngestHandler:
+    """
+    推送模式的影像接收端點。
+    上游 (例如 NVR) 以 base64 JSON 或原始 JPEG (application/octet-stream) 推送影像，
+    解碼後交由與 RTSP 相同的偵測流程處理。
+    """
+    def __init__(self, sales_area_detection, experience_area_detection):
+        self.sales_area_detection = sales_area_detection
+        self.experience_area_detection = experience_area_detection
+        self.ingestors = {
+            'sales-area': FrameIngestor(self._process_sales_frame, name="sales-area-ingestor"),
+            'experience-area': FrameIngestor(self._process_experience_frame, name="experience-area-ingestor"),
+        }
+
+    def _process_sales_frame(self, frame_data: FrameData):
+        objects_dict, persons, _, _ = self.sales_area_detection.detect(
+            cameraId=frame_data.camera_id,
+            image=frame_data.image,
+            ROIs_info=frame_data.metadata.get('area_list', []),
+            record_mode=RECORD_MODE,
+            timestamp=frame_data.timestamp
+        )
+        get_result_broadcaster().publish(
+            camera_id=frame_data.camera_id,
+            area='sales-area',
+            objects=[info['object'] for info in objects_dict.values()],
+            persons=persons,
+            timestamp=frame_data.timestamp
+        )
+
+    def _process_experience_frame(self, frame_data: FrameData):
+        products_of_interest = [p['name'] for p in frame_data.metadata.get('product_list', [])]
+        _, _, persons, _ = self.experience_area_detection.detect(
+            cameraId=frame_data.camera_id,
+            image=frame_data.image,
+            products_of_interest=products_of_interest,
+            timestamp=frame_data.timestamp
+        )
+        get_result_broadcaster().publish(
+            camera_id=frame_data.camera_id,
+            area='experience-area',
+            persons=persons,
+            chairs=self.experience_area_detection.chair_manager.get_camera_chairs(frame_data.camera_id),
+            timestamp=frame_data.timestamp
+        )
+
+    def _get_ingestor(self, area: str) -> FrameIngestor:
+        if area not in self.ingestors:
+            raise HTTPException(status_code=404, detail=f"Unknown area: {area}")
+        return self.ingestors[area]
+
+    @staticmethod
+    def _camera_metadata(area: str, camera_id: str) -> dict:
+        """未在請求中提供 ROI/商品資訊時，使用相機設定服務（含快取）的設定"""
+        client = get_camera_config_client(AREA_TYPES[area])
+        config = client.config if client.config is not None else client.fetch()
+        metadata = (config or {}).get(camera_id)
+        if metadata is None:
+            raise HTTPException(status_code=404, detail=f"Unknown camera: {camera_id}")
+        return metadata
+
+    def _submit(self, area: str, camera_id: str, image, metadata: dict) -> dict:
+        ingestor = self._get_ingestor(area)
+        replaced = ingestor.submit(FrameData(timestamp=time.time(), image=image,
+                                             camera_id=camera_id, metadata=metadata))
+        return {"message": "accepted", "replaced": replaced}
+
+    async def handle_base64(self, area: str, camera_input: CameraInput):
+        """接收 base64 編碼的 JPEG"""
+        self._get_ingestor(area)
+        try:
+            image = await run_in_threadpool(decode_base64_jpeg, camera_input.base64_image)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if area == 'sales-area' and camera_input.ROIs_info is not None:
+            metadata = {'area_list': [ROI.dict() for ROI in camera_input.ROIs_info]}
+        elif area == 'experience-area' and camera_input.product_list is not None:
+            metadata = {'product_list': [{'name': name} for name in camera_input.product_list]}
+        else:
+            metadata = self._camera_metadata(area, camera_input.cameraId)
+        return self._submit(area, camera_input.cameraId, image, metadata)
+
+    async def handle_raw(self, area: str, camera_id: str, request: Request):
+        """接收原始 JPEG 位元組 (application/octet-stream)，直接從請求緩衝區解碼"""
+        self._get_ingestor(area)
+        body = await request.body()
+        try:
+            image = await run_in_threadpool(decode_jpeg, body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        metadata = self._camera_metadata(area, camera_id)
+        return self._submit(area, camera_id, image, metadata)
+
+    async def stats(self):
+        return {area: ingestor.stats() for area, ingestor in self.ingestors.items()}
+
+    def shutdown(self):
+        for ingestor in self.ingestors.values():
+            try:
+                ingestor.stop()
+            except Exception as e:
+                log.error(f"停止影像接收線程時發生錯誤: {str(e)}")
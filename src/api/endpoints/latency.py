@@ -0,0 +1,59 @@
+from typing import Optional
+from fastapi import HTTPException
+from src.services.monitoring.latencyRecorder import get_latency_recorder
+
+
+class LatencyHandler:
+    """
+    各處理階段、各相機的延遲查詢。
+    API 進程（推送模式）直接讀取本進程的紀錄，偵測子進程的紀錄隨監控數據定期回報。
+    """
+    def __init__(self, sales_area_handler, experience_area_handler):
+        self.area_handlers = {
+            'sales_area': sales_area_handler,
+            'experience_area': experience_area_handler,
+        }
+        self.recorder = get_latency_recorder()
+
+    @staticmethod
+    def _filter(snapshot: dict, stage: Optional[str], camera_id: Optional[str]) -> dict:
+        result = {}
+        for stage_name, cameras in (snapshot or {}).items():
+            if stage and stage_name != stage:
+                continue
+            cameras = {camera: summary for camera, summary in cameras.items() if not camera_id or camera == camera_id}
+            if cameras:
+                result[stage_name] = cameras
+        return result
+
+    async def query(self, stage: Optional[str] = None, camera_id: Optional[str] = None):
+        """/ai-server/latency?stage=SalesAreaDetection.detect&camera_id=cam1"""
+        result = {
+            'enabled': self.recorder.enabled,
+            'sample_rate': self.recorder.sample_rate,
+            'api': self.recorder.snapshot(stage=stage, camera_id=camera_id),
+        }
+        for area, handler in self.area_handlers.items():
+            supervisor = getattr(handler, 'process_manager', None)
+            if supervisor is None:
+                continue
+            result[area] = {
+                shard: self._filter(metrics.get('latency'), stage, camera_id)
+                for shard, metrics in supervisor.metrics.items()
+            }
+        return result
+
+    async def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                        reset: bool = False):
+        """開啟/關閉延遲紀錄、調整取樣比例，並同步到所有偵測子進程"""
+        if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+            raise HTTPException(status_code=400, detail="sample_rate must be between 0 and 1")
+        self.recorder.configure(enabled=enabled, sample_rate=sample_rate)
+        if reset:
+            self.recorder.reset()
+        control = {'action': 'latency', 'enabled': enabled, 'sample_rate': sample_rate, 'reset': reset}
+        for handler in self.area_handlers.values():
+            supervisor = getattr(handler, 'process_manager', None)
+            if supervisor is not None and supervisor.is_alive():
+                supervisor.broadcast(control)
+        return {'enabled': self.recorder.enabled, 'sample_rate': self.recorder.sample_rate}
@@ -0,0 +1,61 @@
+import time
+from fastapi.responses import PlainTextResponse
+from src.services.monitoring.healthCheck import HealthChecker
+from src.services.monitoring.latencyRecorder import get_latency_recorder
+from src.services.monitoring.prometheusExporter import MetricsRegistry, add_latency, add_notification, add_shard
+from src.services.notification.notificationClient import peek_notification_client
+from src.services.streaming.resultBroadcaster import get_result_broadcaster
+
+
+class MetricsHandler:
+    """
+    Prometheus 格式的監控端點 /ai-server/metrics。
+    偵測子進程每 IPC_METRICS_INTERVAL 秒透過 IPC 通道回報累計數據，這裡彙整所有分片與 API 進程本身的數據，
+    各相機的指標以 area / shard / camera 標籤區分。
+    """
+    def __init__(self, sales_area_handler, experience_area_handler, frame_ingest_handler=None):
+        self.area_handlers = {
+            'sales_area': sales_area_handler,
+            'experience_area': experience_area_handler,
+        }
+        self.frame_ingest_handler = frame_ingest_handler
+
+    def collect(self) -> MetricsRegistry:
+        registry = MetricsRegistry()
+        now = time.time()
+        for area, handler in self.area_handlers.items():
+            supervisor = getattr(handler, 'process_manager', None)
+            shards = getattr(supervisor, 'shards', []) if supervisor is not None else []
+            for index, shard in enumerate(shards):
+                labels = {'area': area, 'shard': str(index)}
+                registry.gauge('shard_up', '分片進程是否運行中').add(shard.is_alive(), **labels)
+                channel = shard.channel
+                if channel is None or not channel.metrics:
+                    continue
+                registry.gauge('shard_metrics_age_seconds', '距離分片上次回報監控數據的秒數').add(
+                    round(now - channel.metrics_time, 3), **labels)
+                add_shard(registry, channel.metrics, **labels)
+
+        # API 進程本身：推送模式的分析延遲、通報客戶端與結果串流
+        add_latency(registry, get_latency_recorder().snapshot(), area='api', shard='api')
+        notification_client = peek_notification_client()
+        if notification_client is not None:
+            add_notification(registry, notification_client.metrics(), area='api', shard='api')
+        if self.frame_ingest_handler is not None:
+            for area, ingestor in self.frame_ingest_handler.ingestors.items():
+                stats = ingestor.stats()
+                for key, value in stats.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        registry.gauge('ingest_stat', '推送模式影像接收的統計').add(value, area=area, key=key)
+        broadcaster = get_result_broadcaster().stats()
+        registry.gauge('stream_subscribers', '結果串流的訂閱者數量').add(broadcaster['subscribers'])
+        registry.counter('stream_dropped_total', '結果串流因訂閱者過慢而丟棄的訊息數').add(broadcaster['dropped'])
+
+        load = HealthChecker.get_system_load()
+        registry.gauge('system_cpu_percent', 'CPU 使用率').add(load['cpu_percent'])
+        registry.gauge('system_memory_percent', '記憶體使用率').add(load['memory_percent'])
+        registry.gauge('system_disk_percent', '磁碟使用率').add(load['disk_usage'])
+        return registry
+
+    async def metrics(self):
+        return PlainTextResponse(self.collect().render(), media_type='text/plain; version=0.0.4; charset=utf-8')
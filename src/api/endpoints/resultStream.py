@@ -0,0 +1,63 @@
+import json
+from typing import Optional
+from fastapi import Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from src.services.lib.loggingService import log
+from src.services.streaming.resultBroadcaster import get_result_broadcaster
+from src.config.config import STREAM_KEEPALIVE
+
+
+def _encode(message: dict) -> str:
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False)
+
+
+def _parse_camera_ids(camera_ids: Optional[str]):
+    """camera_ids 以逗號分隔，例如 ?camera_ids=cam1,cam2"""
+    if not camera_ids:
+        return None
+    return [camera_id for camera_id in camera_ids.split(',') if camera_id]
+
+
+class ResultStreamHandler:
+    """
+    即時結果串流端點。
+    訂閱後先收到每台相機的快照 (snapshot)，之後只收到變動的差異 (delta)。
+    """
+    def __init__(self):
+        self.broadcaster = get_result_broadcaster()
+
+    async def websocket(self, websocket: WebSocket, camera_ids: Optional[str] = None):
+        """WebSocket 串流：/ai-server/results/ws?camera_ids=cam1,cam2"""
+        await websocket.accept()
+        subscription = self.broadcaster.subscribe(camera_ids=_parse_camera_ids(camera_ids))
+        try:
+            while True:
+                message = await subscription.get()
+                await websocket.send_text(_encode(message))
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            log.error(f"結果串流 WebSocket 發生錯誤: {str(e)}")
+        finally:
+            self.broadcaster.unsubscribe(subscription)
+
+    async def sse(self, request: Request, camera_ids: Optional[str] = None):
+        """Server-Sent Events 串流：/ai-server/results/sse?camera_ids=cam1,cam2"""
+        subscription = self.broadcaster.subscribe(camera_ids=_parse_camera_ids(camera_ids))
+
+        async def event_stream():
+            try:
+                while not await request.is_disconnected():
+                    message = await subscription.get(timeout=STREAM_KEEPALIVE)
+                    if message is None:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield f"id: {message['camera_id']}:{message['seq']}\nevent: {message['type']}\ndata: {_encode(message)}\n\n"
+            finally:
+                self.broadcaster.unsubscribe(subscription)
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def stats(self):
+        return self.broadcaster.stats()
@@ -5,10 +5,14 @@ import threading
 from fastapi import HTTPException
 from src.services.lib.loggingService import log
 from src.models.requests import SalesAreaRequest
-from src.services.lib.processManager import ProcessManager
+from src.core.shardSupervisor import ShardSupervisor
+from src.services.streaming.resultBroadcaster import get_result_broadcaster
 from src.services.utils.cameraUtils import fetch_camera_area, CameraManager
 from src.services.monitoring.healthCheck import HealthChecker
-from src.config.config import VISUAL, RECORD_MODE
+from src.services.monitoring.latencyRecorder import get_latency_recorder
+from src.config.config import IPC_METRICS_INTERVAL, SALES_AREA_SHARDS, SALES_PIPELINE_ENABLED, PIPELINE_QUEUE_SIZE, \
+    NOT_EXIST_THRES, EXIT_THRESHOLD, CHECK_DURATION, VISUAL, RECORD_MODE, RECORD_PASSTHROUGH, RECORD_PRETIME, \
+    RECORD_POSTTIME, RECORD_PASSTHROUGH_MAX_BYTES, PROMOTION_OUTPUT_DIR
 
 
 class SalesAreaHandler:
@@ -19,7 +23,7 @@ class SalesAreaHandler:
         self.health_checker = HealthChecker()
 
     @staticmethod
-    def _run_sales_area(stop_event, shared_state):
+    def _run_sales_area(stop_event, channel):
         """
         靜態方法用於在子進程中運行，避免傳遞類實例
         """
@@ -27,14 +31,26 @@ class SalesAreaHandler:
             # 在子進程中創建所需的對象
             from src.services.detect.salesAreaDetection import SalesAreaDetection
             from src.services.monitoring.healthCheck import HealthChecker
-            from src.services.utils.cameraUtils import CameraManager, fetch_camera_area
+            from src.services.utils.cameraUtils import CameraManager
+            from src.services.utils.cameraConfigClient import get_camera_config_client
+            from src.core.shardSupervisor import CameraAssignment
+            from src.services.utils.frameRateGovernor import FrameRateGovernor
             from src.services.video.RecordingService import RecordingService
+            from src.services.lib.stagePipeline import StagedPipeline
             
             detector = SalesAreaDetection()
             health_checker = HealthChecker()
             camera_manager = CameraManager(buffer_size=30)
             frame_queue = queue.Queue(maxsize=30)
             shutdown_event = threading.Event()
+            stats = {'frames': 0, 'errors': 0}
+            governor = FrameRateGovernor(min_state_threshold=min(NOT_EXIST_THRES, EXIT_THRESHOLD, CHECK_DURATION))
+
+            # 不重新編碼的錄影：由相機串流端保存原始壓縮封包，未安裝 PyAV 時維持原本的錄影方式
+            if RECORD_MODE and RECORD_PASSTHROUGH and camera_manager.enable_passthrough(
+                    pre_seconds=RECORD_PRETIME, post_seconds=RECORD_POSTTIME,
+                    output_dir=PROMOTION_OUTPUT_DIR, max_bytes=RECORD_PASSTHROUGH_MAX_BYTES):
+                detector.recording_provider = camera_manager.get_passthrough_recorder
 
             # 設置信號處理
             def signal_handler(signum, frame):
@@ -50,16 +66,17 @@ class SalesAreaHandler:
                 try:
                     while not (stop_event.is_set() or shutdown_event.is_set()):
                         try:
-                            system_load = health_checker.get_system_load()
-                            process_rate = 2 if system_load["cpu_percent"] > 80 else 1
-
                             for camera_id in list(camera_manager._streams.keys()):
                                 if stop_event.is_set() or shutdown_event.is_set():
                                     return
 
-                                frame_data = camera_manager.get_latest_frame(camera_id, timeout=0.05)
+                                # 依各相機的目標 FPS 取樣，只取最新的一幀
+                                if not governor.is_due(camera_id):
+                                    continue
+                                frame_data, discarded = camera_manager.get_newest_frame(camera_id)
                                 if not frame_data:
                                     continue
+                                governor.mark_scheduled(camera_id, skipped=discarded)
 
                                 try:
                                     frame_queue.put(frame_data, timeout=0.1)
@@ -70,7 +87,7 @@ class SalesAreaHandler:
                                     except (queue.Empty, queue.Full):
                                         pass
 
-                            threading.Event().wait(0.001 * process_rate)
+                            threading.Event().wait(0.005)
 
                         except Exception as e:
                             log.error(f"處理幀時發生錯誤: {str(e)}")
@@ -83,6 +100,37 @@ class SalesAreaHandler:
                 finally:
                     log.info("影像擷取線程已退出")
 
+            def send_result(camera_id, timestamp, objects_dict, persons, cost):
+                stats['frames'] += 1
+                governor.record(camera_id, cost=cost, active=len(persons) > 0)
+                channel.send_result(
+                    camera_id=camera_id,
+                    area='sales-area',
+                    timestamp=timestamp,
+                    objects=[info['object'] for info in objects_dict.values()],
+                    persons=persons
+                )
+
+            # 偵測 → 追蹤 → 規則 三階段管線，各階段在不同線程執行
+            pipeline = None
+            if SALES_PIPELINE_ENABLED:
+                pipeline = StagedPipeline(
+                    stages=[
+                        ('detect', lambda frame_data: detector.detect_stage(
+                            cameraId=frame_data.camera_id,
+                            image=frame_data.image,
+                            ROIs_info=frame_data.metadata.get('area_list', []),
+                            timestamp=frame_data.timestamp)),
+                        ('track', detector.track_stage),
+                        ('rules', lambda job: detector.rules_stage(job, record_mode=RECORD_MODE)),
+                    ],
+                    queue_size=PIPELINE_QUEUE_SIZE,
+                    # 管線的單幀成本取決於最慢的階段
+                    on_output=lambda job: send_result(job['cameraId'], job['timestamp'], *job['result'][:2],
+                                                      cost=max(job['stage_seconds'].values())),
+                    name='sales-pipeline'
+                )
+
             def analyze_frames():
                 """影像分析線程"""
                 log.info("影像分析線程已啟動")
@@ -93,18 +141,27 @@ class SalesAreaHandler:
                             if frame_data is None:
                                 continue
 
+                            if pipeline is not None:
+                                # 管線已滿時丟棄該幀，擷取線程會持續提供最新的影像
+                                pipeline.submit(frame_data, timeout=0.5)
+                                continue
+
                             ROIs_info = frame_data.metadata.get('area_list', [])
-                            
+                            start_time = time.perf_counter()
                             object_list, persons, ROIs, interactiveAreas = detector.detect(
                                 cameraId=frame_data.camera_id,
                                 image=frame_data.image,
                                 ROIs_info=ROIs_info,
-                                record_mode=RECORD_MODE
+                                record_mode=RECORD_MODE,
+                                timestamp=frame_data.timestamp
                             )
+                            send_result(frame_data.camera_id, frame_data.timestamp, object_list, persons,
+                                        cost=time.perf_counter() - start_time)
 
                         except queue.Empty:
                             continue
                         except Exception as e:
+                            stats['errors'] += 1
                             log.error(f"分析幀時發生錯誤: {str(e)}")
                             if stop_event.is_set() or shutdown_event.is_set():
                                 return
@@ -120,11 +177,21 @@ class SalesAreaHandler:
                 log.info("開始清理資源...")
                 shutdown_event.set()
                 
+                if pipeline is not None:
+                    try:
+                        pipeline.stop()
+                    except Exception as e:
+                        log.error(f"停止處理管線時發生錯誤: {str(e)}")
+
                 if detector:
                     try:
                         detector.cleanup_visualization()
                     except Exception as e:
                         log.error(f"清理視覺化窗口時發生錯誤: {str(e)}")
+                    try:
+                        detector.close()
+                    except Exception as e:
+                        log.error(f"停止背景工作時發生錯誤: {str(e)}")
                 
                 if camera_manager:
                     try:
@@ -138,18 +205,31 @@ class SalesAreaHandler:
                         frame_queue.get_nowait()
                     except queue.Empty:
                         break
+
+                try:
+                    from src.services.notification.notificationClient import shutdown_notification_client
+                    shutdown_notification_client()
+                except Exception as e:
+                    log.error(f"關閉通報客戶端時發生錯誤: {str(e)}")
                 
                 log.info("資源清理完成")
 
             try:
+                # 建立通報客戶端，並補送上次未送達的事件
+                from src.services.notification.notificationClient import get_notification_client
+                get_notification_client(channel='promotion')
+
                 # 獲取相機資訊
-                sales_area_info = fetch_camera_area(type='promotion')
+                config_client = get_camera_config_client('promotion')
+                sales_area_info = config_client.fetch()
                 if not sales_area_info:
                     log.error("未能獲取相機資訊，請檢查服務狀態。")
                     return
 
-                # 初始化所有相機
-                camera_manager.initialize_cameras(sales_area_info)
+                # 初始化本進程負責的相機（由 ShardSupervisor 分配）
+                assignment = CameraAssignment()
+                assignment.apply(channel.poll_control())
+                camera_manager.initialize_cameras(assignment.filter(sales_area_info))
                 camera_manager.start_capture()
 
                 # 啟動工作線程
@@ -159,17 +239,55 @@ class SalesAreaHandler:
                     thread.start()
                     threads.append(thread)
 
-                # 等待停止信號
-                while not stop_event.is_set():
+                # 等待停止信號，並處理 API 進程送來的控制訊息
+                last_metrics_time = 0.0
+                while not (stop_event.is_set() or shutdown_event.is_set()):
                     try:
-                        if shared_state.get('update_requested', False):
-                            sales_area_info = fetch_camera_area(type='promotion')
-                            for camera_id, info in sales_area_info.items():
+                        assign_changed, update_requested = assignment.apply(channel.poll_control())
+                        diff = None
+                        if update_requested:
+                            # 先取得最新設定，同時收到的分配變更才會以新設定初始化相機
+                            sales_area_info, diff = config_client.refresh()
+                        if assign_changed:
+                            added, removed = assignment.sync_cameras(camera_manager, config_client.config)
+                            for camera_id in removed:
+                                governor.remove(camera_id)
+                            log.info(f"相機分配已更新: 新增 {added}, 釋放 {removed}")
+                        if diff is not None:
+                            # 只將有變動的相機設定推送給偵測流程
+                            for camera_id, info in assignment.filter(diff.added).items():
+                                camera_manager.initialize_camera(
+                                    camera_id=camera_id,
+                                    rtsp_url=info['meta']['rtsp_url'],
+                                    metadata=info
+                                )
+                            for camera_id, info in assignment.filter(diff.changed).items():
                                 camera_manager.update_camera_metadata(
                                     camera_id=camera_id,
                                     metadata=info
                                 )
-                            shared_state['update_requested'] = False
+                            for camera_id in diff.removed:
+                                camera_manager.release_camera(camera_id)
+                                governor.remove(camera_id)
+                            if not diff.is_empty():
+                                log.info(f"相機設定已更新: 新增 {list(diff.added)}, 變動 {diff.changed_rois}, 移除 {diff.removed}")
+
+                        if time.time() - last_metrics_time >= IPC_METRICS_INTERVAL:
+                            last_metrics_time = time.time()
+                            channel.send_metrics({
+                                'frames': stats['frames'],
+                                'errors': stats['errors'],
+                                'queue_size': frame_queue.qsize(),
+                                'cameras': len(camera_manager._streams),
+                                'governor': governor.stats(),
+                                'pipeline': pipeline.stats() if pipeline is not None else {},
+                                'recording': detector.recording_stats(),
+                                'latency': get_latency_recorder().snapshot(),
+                                'capture': camera_manager.capture_stats(),
+                                'tracker': detector.tracker_stats(),
+                                'second_check': detector.second_check_stats(),
+                                'notification': get_notification_client().metrics(),
+                            })
                         time.sleep(0.2)
                     except Exception as e:
                         log.error(f"更新處理時發生錯誤: {str(e)}")
@@ -189,7 +307,10 @@ class SalesAreaHandler:
     async def handle_request(self, request: SalesAreaRequest):
         try:
             if not self.process_manager:
-                self.process_manager = ProcessManager(target_function=self._run_sales_area)
+                self.process_manager = ShardSupervisor(target_function=self._run_sales_area,
+                                                       type='promotion',
+                                                       num_shards=SALES_AREA_SHARDS,
+                                                       on_result=get_result_broadcaster().publish_result)
 
             if request.action == "start":
                 msg = self.process_manager.start()
@@ -41,14 +41,57 @@ pillow_context = Context(
 )
 # 基礎設定
 DATABASE_FILE = 'smart_retail.db'
+OUTBOX_DATABASE_FILE = 'notification_outbox.db' # 通報事件暫存區(outbox)的資料庫檔案
 LOGPATH='log'
 VISUAL = True #是否可視化AI影像
+VISUAL_MODE = 'window' # 可視化方式：window(本機視窗) / mjpeg(HTTP 預覽，瀏覽器開啟 http://<host>:<VISUAL_MJPEG_PORT>/)
+VISUAL_MAX_FPS = 5.0 # 可視化每台相機的最高顯示 FPS，繪製與顯示在背景線程執行
+VISUAL_SIZE = (1440, 960) # 可視化輸出影像大小 (寬, 高)
+VISUAL_MJPEG_PORT = 8090 # MJPEG 預覽的埠號，多個分片時依序使用下一個埠號
+VISUAL_JPEG_QUALITY = 70 # MJPEG 預覽的 JPEG 壓縮品質
+LATENCY_ENABLED = True # 是否記錄各處理階段、各相機的延遲直方圖（/ai-server/latency 查詢）
+LATENCY_SAMPLE_RATE = 1.0 # 延遲紀錄的取樣比例 (0~1)，降低可減少額外負擔
+DETECTION_RECORD_DIR = None # 設定目錄時錄製每幀的偵測/追蹤結果(.npz，不含影像)，供 benchmarks/replay_rules.py 離線重播規則引擎
+DETECTION_RECORD_CHUNK = 3000 # 偵測結果錄製檔每個檔案的最大幀數
 GetCameraInfoENDPOINT = '192.168.1.80:65334' # 訪問獲取相機資訊服務的IP
+CAMERA_CONFIG_CACHE_DIR = 'cache' # 相機區域設定快取的存放位置
+CAMERA_CONFIG_TIMEOUT = 5.0 # 取得相機區域設定的逾時秒數
 NotificationENDPOINT = '192.168.1.99:18080' # 訪問通報服務的IP
+NOTIFY_CONNECT_TIMEOUT = 2.0 # 通報服務連線逾時秒數
+NOTIFY_READ_TIMEOUT = 5.0 # 通報服務讀取逾時秒數
+NOTIFY_QUEUE_SIZE = 1000 # 待送通報事件的佇列上限
+NOTIFY_BATCH_WINDOW = 0.2 # 合併連續通報事件的等待秒數
+NOTIFY_MAX_BATCH = 50 # 每批最多送出的通報事件數
+NOTIFY_MAX_RETRIES = 3 # 單一通報事件的最大重試次數
+NOTIFY_BACKOFF_BASE = 0.5 # 通報重試退避的起始秒數
+NOTIFY_BACKOFF_MAX = 10.0 # 通報重試退避的最大秒數
+NOTIFY_POOL_SIZE = 4 # 通報服務的連線池大小
+NOTIFY_OUTBOX_ENABLED = True # 是否先將通報事件寫入本地暫存區，待通報服務恢復後依序補送
+NOTIFY_OUTBOX_LEASE = 60.0 # 補送暫存區事件時的租約秒數，同一服務的多個分片同時只有一個分片補送，分片異常結束時租約到期後由其他分片接手
+SALES_AREA_SHARDS = 1 # 促銷區偵測子進程(分片)數量，相機平均分配到各分片，0 表示使用 CPU 核心數
+EXPERIENCE_AREA_SHARDS = 1 # 體驗區偵測子進程(分片)數量，0 表示使用 CPU 核心數
+GOVERNOR_MIN_FPS = 1.0 # 無人活動的相機最低分析 FPS（仍不低於狀態機閾值所需的取樣頻率）
+GOVERNOR_MAX_FPS = 10.0 # 有人活動的相機最高分析 FPS
+GOVERNOR_COMPUTE_BUDGET = 0.9 # 每秒可用於分析的秒數，所有相機的需求超過時依活動程度降低 FPS
+GOVERNOR_ACTIVITY_DECAY = 0.3 # 相機活動程度移動平均的更新係數，越大越快反映最新狀態
+GOVERNOR_REBALANCE_INTERVAL = 1.0 # 重新分配各相機 FPS 的間隔秒數
+SALES_PIPELINE_ENABLED = True # 促銷區是否以偵測/追蹤/規則三階段管線平行處理連續幀
+PIPELINE_QUEUE_SIZE = 2 # 管線各階段之間的佇列上限
+IPC_MAX_PENDING = 64 # 偵測子進程送往 API 進程的待送訊息上限，超過時丟棄最舊的結果
+IPC_METRICS_INTERVAL = 5.0 # 偵測子進程回報監控數據的間隔秒數
+STREAM_QUEUE_SIZE = 64 # 結果串流-每個訂閱者的待送訊息上限，超過時丟棄並改送完整快照
+STREAM_BBOX_TOLERANCE = 2 # 結果串流-bbox 座標變動小於該值(像素)時不送出更新
+STREAM_KEEPALIVE = 15.0 # 結果串流-SSE 無資料時送出 keepalive 的間隔秒數
 RECORD_MODE = False #是否錄下通報前後影像
 RECORD_FPS = 10 # 紀錄事件影像的FPS
 RECORD_PRETIME = 10  # 紀錄事件發生前的秒數
 RECORD_POSTTIME = 5  # 紀錄事件發生後的秒數
+RECORD_PREROLL_MAX_BYTES = 64 * 1024 * 1024 # 每台相機預錄緩衝區(JPEG 壓縮)的位元組上限
+RECORD_JPEG_QUALITY = 80 # 預錄影格的 JPEG 壓縮品質
+RECORD_TASK_QUEUE_SIZE = 32 # 每台相機待背景錄影線程處理的影格上限，超過時丟棄影格而不阻塞分析
+CLIP_QUEUE_SIZE = 128 # 每支事件影片待編碼寫入的影格上限，超過時丟棄影格
+RECORD_PASSTHROUGH = False # 是否直接保存相機原始壓縮封包錄影(不重新編碼，需安裝 PyAV，影片不含偵測框)
+RECORD_PASSTHROUGH_MAX_BYTES = 32 * 1024 * 1024 # 每台相機預錄壓縮封包的位元組上限
 EXPERIENCE_OUTPUT_DIR = 'output/experience' # 體驗區通報事件紀錄影像的存放位置
 PROMOTION_OUTPUT_DIR = 'output/promotion' # 促銷區通報事件紀錄影像的存放位置
 
@@ -63,6 +106,16 @@ NOT_EXIST_THRES = 10  # 物品消失的时间阈值
 SSIM_THRESHOLD = 0.5  # 促銷區-商品SSIM相似度阈值
 MASK_SIMILARITY_THRESHOLD = 0.5  # 促銷區-商品MASK相似度阈值
 MAX_NOTIFICATIONS = 3 # 促銷區-區域最大通報次數
+ORIGIN_FRAME_REFRESH_INTERVAL = 1.0 # 促銷區-區域無人時更新原始幀(origin_frame)的最小間隔秒數
+MASK_CACHE_SIZE = 256 # 促銷區-原始幀MobileSAM遮罩快取的最大數量
+MASK_CACHE_PREFETCH = False # 促銷區-區域無人時是否預先計算原始幀遮罩
+ROI_MIN_INSIDE_RATIO = 0.2 # 促銷區-行人與ROI外接框的交集需有該比例落在ROI多邊形內才算互動
+SEGMENT_CLUSTER_MARGIN = 32 # 促銷區-FastSAM 分割時合併相鄰 ROI 的間距(像素)
+SEGMENT_MOTION_THRES = 6.0 # 促銷區-ROI 群組畫面平均灰階差異超過該值才重新分割
+ASYNC_SECOND_CHECK = True # 促銷區-是否在背景工作線程執行二次檢查與通報
+SECOND_CHECK_WORKERS = 2 # 促銷區-二次檢查工作線程數量
+SECOND_CHECK_MAX_PENDING = 8 # 促銷區-等待中二次檢查工作的上限
+VERIFY_MAX_SIDE = 64 # 促銷區-二次檢查時裁切影像縮小後的最長邊(像素)，0 表示不縮小
 
 # 體驗區參數
 EXPERIENCE_PRODUCT_DICT = {
@@ -1,7 +1,12 @@
 from peewee import SqliteDatabase
-from src.config.config import DATABASE_FILE
+from src.config.config import DATABASE_FILE, OUTBOX_DATABASE_FILE
 # 定義數據庫
 db = SqliteDatabase(DATABASE_FILE)
+# 通報事件暫存區使用獨立的資料庫，WAL 模式讓寫入不會阻塞讀取
+outbox_db = SqliteDatabase(OUTBOX_DATABASE_FILE, pragmas={
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+})
 
 def initialize_database():
     """
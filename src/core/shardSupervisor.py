@@ -0,0 +1,209 @@
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from src.services.lib.loggingService import log
+from src.services.lib.processManager import ProcessManager
+from src.services.utils.cameraConfigClient import get_camera_config_client
+from src.services.monitoring.latencyRecorder import get_latency_recorder
+
+
+def plan_assignment(camera_ids: Iterable[str], current: List[Set[str]]) -> List[Set[str]]:
+    """
+    規劃相機在各分片的分配。
+    已分配的相機盡量留在原分片（避免重新載入追蹤狀態），新相機放到負載最小的分片，
+    最後把相機從最多的分片移到最少的分片，直到各分片相機數量相差不超過 1。
+    :param camera_ids: 目前所有相機 ID
+    :param current: 各分片目前的相機集合
+    :return: 各分片新的相機集合
+    """
+    camera_ids = set(camera_ids)
+    shards = [set(cameras) & camera_ids for cameras in current]
+    assigned = set().union(*shards) if shards else set()
+
+    for camera_id in sorted(camera_ids - assigned):
+        min(shards, key=len).add(camera_id)
+
+    while shards:
+        heaviest = max(shards, key=len)
+        lightest = min(shards, key=len)
+        if len(heaviest) - len(lightest) <= 1:
+            break
+        lightest.add(max(heaviest))
+        heaviest.remove(max(heaviest))
+    return shards
+
+
+class CameraAssignment:
+    """
+    分片子進程端的相機分配狀態。
+    由 ShardSupervisor 以控制訊息 {"action": "assign", "camera_ids": [...]} 指定，
+    未收到分配前視為負責所有相機（單進程模式）。
+    延遲紀錄的設定 {"action": "latency", ...} 也在此套用到子進程的 LatencyRecorder。
+    """
+    def __init__(self):
+        self.camera_ids: Optional[Set[str]] = None
+
+    def apply(self, controls: List[Dict[str, Any]]):
+        """
+        處理控制訊息。
+        :return: (分配是否變動, 是否要求更新設定)
+        """
+        assign_changed, update_requested = False, False
+        for control in controls:
+            action = control.get('action')
+            if action == 'assign':
+                camera_ids = set(control.get('camera_ids', []))
+                if camera_ids != self.camera_ids:
+                    self.camera_ids = camera_ids
+                    assign_changed = True
+            elif action == 'update':
+                update_requested = True
+            elif action == 'latency':
+                recorder = get_latency_recorder()
+                recorder.configure(enabled=control.get('enabled'), sample_rate=control.get('sample_rate'))
+                if control.get('reset'):
+                    recorder.reset()
+        return assign_changed, update_requested
+
+    def owns(self, camera_id: str) -> bool:
+        return self.camera_ids is None or camera_id in self.camera_ids
+
+    def filter(self, camera_info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """只保留本分片負責的相機設定"""
+        return {camera_id: info for camera_id, info in (camera_info or {}).items() if self.owns(camera_id)}
+
+    def sync_cameras(self, camera_manager, camera_info: Optional[Dict[str, Any]]):
+        """
+        依目前的分配調整 CameraManager：釋放不再負責的相機，初始化新分配到的相機。
+        :return: (新增的相機 ID 列表, 釋放的相機 ID 列表)
+        """
+        owned = self.filter(camera_info)
+        removed = [camera_id for camera_id in list(camera_manager._streams) if camera_id not in owned]
+        for camera_id in removed:
+            camera_manager.release_camera(camera_id)
+        added = [
+            camera_id for camera_id, info in owned.items()
+            if camera_manager.initialize_camera(camera_id=camera_id, rtsp_url=info['meta']['rtsp_url'], metadata=info)
+        ]
+        return added, removed
+
+
+class ShardSupervisor:
+    """
+    將同一區域的相機分散到多個偵測子進程（分片）。
+    每個分片是獨立的 ProcessManager，各自載入模型並維護追蹤狀態；
+    啟動與更新設定時依相機清單重新分配，新增相機會放到負載最小的分片；
+    啟動時相機數少於分片數而未開滿的分片，在更新設定且相機增加後補足。
+    """
+    def __init__(self, target_function, type: str, num_shards: int = 1,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        :param target_function: 分片子進程執行的函式，簽名為 target_function(stop_event, channel)
+        :param type: 相機設定類型 (promotion / experience)
+        :param num_shards: 分片數量，0 表示使用 CPU 核心數
+        :param on_result: 收到子進程單幀結果時的回呼函式
+        """
+        self.target_function = target_function
+        self.type = type
+        self.num_shards = num_shards if num_shards > 0 else (os.cpu_count() or 1)
+        self.on_result = on_result
+        self.shards: List[ProcessManager] = []
+        self.assignments: List[Set[str]] = []
+
+    def _camera_ids(self) -> Optional[List[str]]:
+        camera_info = get_camera_config_client(self.type).fetch()
+        if camera_info is None:
+            return None
+        return list(camera_info.keys())
+
+    def is_alive(self) -> bool:
+        return any(shard.is_alive() for shard in self.shards)
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """各分片最近一次回報的監控數據"""
+        return {f"shard_{index}": shard.metrics for index, shard in enumerate(self.shards)}
+
+    def broadcast(self, control: Dict[str, Any]) -> None:
+        """送出控制訊息給所有運行中的分片"""
+        for shard in self.shards:
+            if shard.is_alive():
+                shard.channel.send_control(control)
+
+    def start(self):
+        if self.is_alive():
+            log.warning("分片進程已在運行中")
+            return {"status": "error", "message": "Shards are already running"}
+
+        camera_ids = self._camera_ids()
+        if camera_ids is None:
+            return {"status": "error", "message": "Failed to fetch camera info"}
+
+        # 分片數不超過相機數，避免啟動沒有工作的進程
+        num_shards = max(1, min(self.num_shards, len(camera_ids)))
+        self.shards = [ProcessManager(target_function=self.target_function, on_result=self.on_result)
+                       for _ in range(num_shards)]
+        self.assignments = plan_assignment(camera_ids, [set() for _ in range(num_shards)])
+
+        pids = []
+        for shard, cameras in zip(self.shards, self.assignments):
+            msg = shard.start(initial_controls=[{"action": "assign", "camera_ids": sorted(cameras)}])
+            if msg['status'] != 'success':
+                self.stop()
+                return msg
+            pids.append(shard.process.pid)
+        log.info(f"已啟動 {num_shards} 個分片進程，相機分配: {[sorted(c) for c in self.assignments]}")
+        return {"status": "success", "message": f"Started {num_shards} shard(s) with PIDs: {pids}"}
+
+    def stop(self):
+        if not self.is_alive():
+            log.warning("分片進程未在運行")
+            return {"status": "error", "message": "Process is not running"}
+        for shard in self.shards:
+            if shard.is_alive():
+                shard.stop()
+        self.shards, self.assignments = [], []
+        return {"status": "success", "message": "Process stopped successfully"}
+
+    def update(self):
+        """重新取得相機清單、重新分配，並通知各分片更新設定"""
+        if not self.is_alive():
+            log.info("分片進程未運行，嘗試重新啟動")
+            return self.start()
+
+        camera_ids = self._camera_ids()
+        if camera_ids is None:
+            return {"status": "error", "message": "Failed to fetch camera info"}
+
+        # 啟動時相機較少而未開滿的分片，相機增加後補足到設定的分片數，並把相機平均移到新分片
+        num_shards = max(1, min(self.num_shards, len(camera_ids)))
+        new_shards = [ProcessManager(target_function=self.target_function, on_result=self.on_result)
+                      for _ in range(num_shards - len(self.shards))]
+        current = self.assignments + [set() for _ in new_shards]
+        assignments = plan_assignment(camera_ids, current)
+
+        for index, (shard, cameras) in enumerate(zip(self.shards, assignments)):
+            if not shard.is_alive():
+                # 分片意外結束時以新的分配重新啟動
+                shard.start(initial_controls=[{"action": "assign", "camera_ids": sorted(cameras)}])
+                continue
+            controls = [{"action": "update"}]
+            if cameras != self.assignments[index]:
+                controls.insert(0, {"action": "assign", "camera_ids": sorted(cameras)})
+            for control in controls:
+                shard.channel.send_control(control)
+
+        # 既有分片先釋放移出的相機，再啟動新分片接手
+        started = []
+        for shard, cameras in zip(new_shards, assignments[len(self.shards):]):
+            msg = shard.start(initial_controls=[{"action": "assign", "camera_ids": sorted(cameras)}])
+            if msg['status'] != 'success':
+                log.error(f"新增分片進程失敗: {msg['message']}")
+                # 未啟動的分片負責的相機留待下次更新時重新分配
+                break
+            started.append(shard)
+        self.shards.extend(started)
+        self.assignments = assignments[:len(self.shards)]
+        if started:
+            log.info(f"已新增 {len(started)} 個分片進程，共 {len(self.shards)} 個")
+        log.info(f"相機分配已更新: {[sorted(c) for c in self.assignments]}")
+        return {"status": "success", "message": "Update request sent"}
@@ -0,0 +1,17 @@
+from peewee import CharField, FloatField, IntegerField, TextField
+from src.models.BaseModel import BaseModel
+from src.config.database import outbox_db
+
+class OutboxEvent(BaseModel):
+    channel = CharField(index=True)  # 寫入事件的服務，例如 promotion / experience
+    path = CharField()
+    payload = TextField()  # JSON 字串
+    created_at = FloatField()
+    attempts = IntegerField(default=0)
+    last_error = CharField(null=True)
+    claimed_by = CharField(null=True)  # 正在補送此事件的進程
+    lease_until = FloatField(default=0.0)  # 租約到期時間，到期後其他進程可重新取得
+
+    class Meta:
+        database = outbox_db
+        table_name = 'notification_outbox'
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 class SalesAreaRequest(BaseModel):
     action: str = Field(..., description="三種動作請求: start (啟動), update (更新), stop (停止)")
@@ -14,5 +14,6 @@ class ROIInfo(BaseModel):
 
 class CameraInput(BaseModel):
     cameraId: str
-    ROIs_info: List[ROIInfo]
+    ROIs_info: Optional[List[ROIInfo]] = Field(None, description="促銷區 ROI，未提供時使用相機設定服務的設定")
+    product_list: Optional[List[str]] = Field(None, description="體驗區關注商品，未提供時使用相機設定服務的設定")
     base64_image: str
\ No newline at end of file
@@ -1,24 +1,58 @@
 import time
+import inspect
 from functools import wraps
+from typing import Optional
 from src.services.lib.threadManager import ThreadManager
+from src.services.monitoring.latencyRecorder import get_latency_recorder, current_camera
+
+def _camera_locator(func, camera_arg: str, camera_key: Optional[str] = None):
+    """
+    依裝飾器指定的參數名稱，回傳從 (args, kwargs) 取出相機 ID 的函式。
+    :param camera_arg: 相機 ID 所在的參數名稱
+    :param camera_key: 參數為管線階段的 job dict 時，相機 ID 的鍵值
+    """
+    params = list(inspect.signature(func).parameters)
+    if camera_arg not in params:
+        raise ValueError(f"{func.__qualname__} 沒有參數 {camera_arg}")
+    index = params.index(camera_arg)
+
+    def locate(args, kwargs):
+        value = kwargs[camera_arg] if camera_arg in kwargs else (args[index] if len(args) > index else None)
+        if camera_key is not None and value is not None:
+            value = value[camera_key]
+        return value
+    return locate
+
+
+def time_logger(func=None, *, camera_arg: Optional[str] = None, camera_key: Optional[str] = None):
+    """
+    記錄函式執行時間到延遲直方圖（階段名稱為 類別.函式），可由 /ai-server/latency 查詢。
+    以 @time_logger(camera_arg='cameraId') 指定相機參數時依相機分別統計，並讓內層呼叫沿用同一個相機 ID；
+    管線階段以 @time_logger(camera_arg='job', camera_key='cameraId') 指定 job dict 中的相機 ID。
+    未指定時沿用外層呼叫的相機 ID。
+    :param camera_arg: 相機 ID 所在的參數名稱
+    :param camera_key: camera_arg 為 dict 時，相機 ID 的鍵值
+    """
+    if func is None:
+        return lambda f: time_logger(f, camera_arg=camera_arg, camera_key=camera_key)
+
+    recorder = get_latency_recorder()
+    locate_camera = _camera_locator(func, camera_arg, camera_key) if camera_arg is not None else None
+    qualname = func.__qualname__
 
-def time_logger(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        # 檢查第一個參數是否是self，從而推測這個函數屬於哪個類
-        class_name = args[0].__class__.__name__ if args and hasattr(args[0], '__class__') else None
-        
-        start_time = time.time()  # 記錄開始時間
-        result = func(*args, **kwargs)  # 執行被裝飾的函數
-        end_time = time.time()  # 記錄結束時間
-        execution_time = end_time - start_time  # 計算執行時間
-
-        if class_name:
-            print(f"Function '{func.__name__}' from class '{class_name}' executed in {execution_time:.4f} seconds")
-        else:
-            print(f"Function '{func.__name__}' executed in {execution_time:.4f} seconds")
-        
-        return result
+        if not recorder.should_sample():
+            return func(*args, **kwargs)
+        camera_id = locate_camera(args, kwargs) if locate_camera else None
+        token = current_camera.set(camera_id) if camera_id is not None else None
+        start_time = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            recorder.record(qualname, time.perf_counter_ns() - start_time, camera_id or current_camera.get())
+            if token is not None:
+                current_camera.reset(token)
     return wrapper
 
 
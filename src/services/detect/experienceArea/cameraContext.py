@@ -1,25 +1,34 @@
-import time
+from src.services.utils.clock import Clock, get_clock
 
 class CameraContext:
-    def __init__(self):
+    def __init__(self, clock: Clock=None):
+        """
+        :param clock: 呼叫端未提供影格時間戳時使用的時鐘，預設為進程共用的時鐘
+        """
+        self.clock = clock if clock is not None else get_clock()
         self.objects_dict = {}
 
-    def update_chairs(self, chairs):
+    def update_chairs(self, chairs, current_time: float=None):
+        """
+        :param current_time: 影格時間戳，未提供時使用時鐘的時間
+        """
+        current_time = self.clock.now() if current_time is None else current_time
         for chair in chairs:
             obj_id = chair.get("id")
             self.objects_dict[obj_id] = {
                 "object": chair,
-                "time": time.time()
+                "time": current_time
             }
-        self.cleanup_expired_objects(timeout=300)
+        self.cleanup_expired_objects(timeout=300, current_time=current_time)
 
             
-    def cleanup_expired_objects(self, timeout: int=300):
+    def cleanup_expired_objects(self, timeout: int=300, current_time: float=None):
         """
         清理超時的物件。
         :param timeout: 超時的時間（秒），預設為300秒。
+        :param current_time: 影格時間戳，未提供時使用時鐘的時間
         """
-        current_time = time.time()
+        current_time = self.clock.now() if current_time is None else current_time
         expired_keys = [
             obj_id for obj_id, obj_data in self.objects_dict.items()
             if current_time - obj_data["time"] > timeout
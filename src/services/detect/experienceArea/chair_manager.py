@@ -1,9 +1,9 @@
-import time
 import threading
 from enum import Enum
 from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from src.utils.utils import utils
+from src.services.utils.clock import Clock, get_clock
 
 class ChairStateChange(Enum):
     OCCUPIED = "occupied"
@@ -23,18 +23,23 @@ class ChairInfo:
     position: List[float]
     type: Optional[str] = None
     state: str = 'idle'
-    last_updated: float = field(default_factory=time.time)
-    last_state_change: float = field(default_factory=time.time)
+    last_updated: float = 0.0
+    last_state_change: float = 0.0
     matched_pillow: Optional[dict] = None
     related_ids: set = field(default_factory=set)
     occupying_person: Optional[dict] = None
     # 新增用於追蹤椅墊配對的欄位
     temp_pillow_match: Optional[dict] = None  # 暫時的椅墊配對
     pillow_match_start_time: Optional[float] = None  # 開始配對的時間
-    vacant_start: float = field(default_factory=time.time)
+    vacant_start: Optional[float] = None
     
 class ChairManager:
-    def __init__(self, data_ttl: int = 30):
+    def __init__(self, data_ttl: int = 30, clock: Clock = None):
+        """
+        :param data_ttl: 椅子資料多久未更新（秒）即移除
+        :param clock: 呼叫端未提供影格時間戳時使用的時鐘，預設為進程共用的時鐘
+        """
+        self.clock = clock if clock is not None else get_clock()
         self._contexts: Dict[str, Dict[str, ChairInfo]] = {}
         self._lock = threading.RLock()
         self._data_ttl = data_ttl
@@ -70,12 +75,13 @@ class ChairManager:
         return relations
 
     def update_chairs_info(self, camera_id: str, chairs: List[dict], 
-                        persons: List[dict]) -> None:
+                        persons: List[dict], current_time: float = None) -> None:
         """
         更新椅子信息，處理ID關聯和位置更新
         重要：所有檢查都基於context中的資訊
+        current_time 為影格時間戳，未提供時使用時鐘的時間
         """
-        current_time = time.time()
+        current_time = self.clock.now() if current_time is None else current_time
         
         with self._lock:
             if camera_id not in self._contexts:
@@ -112,6 +118,8 @@ class ChairManager:
                             chair_id=chair_id,
                             position=new_position,
                             last_updated=current_time,
+                            last_state_change=current_time,
+                            vacant_start=current_time,
                             related_ids={chair_id}
                         )
                 else:
@@ -142,7 +150,8 @@ class ChairManager:
     def update_chair_types(self, camera_id: str, pillows: List[dict], 
                         persons: List[dict],
                         match_time_threshold: float = 3.0,  # 需要持續配對的時間
-                        overlap_threshold: float = 0.7) -> None:
+                        overlap_threshold: float = 0.7,
+                        current_time: float = None) -> None:
         """
         更新椅子類型，基於椅墊匹配
         使用時間序列的匹配邏輯：
@@ -157,8 +166,9 @@ class ChairManager:
             persons (List[dict]): 檢測到的人物列表
             match_time_threshold (float): 需要持續配對的時間（秒）
             overlap_threshold (float): 椅墊與椅子重疊面積的閾值
+            current_time (float): 影格時間戳，未提供時使用時鐘的時間
         """
-        current_time = time.time()
+        current_time = self.clock.now() if current_time is None else current_time
         context = self._contexts.get(camera_id, {})
         if not context:
             return
@@ -240,13 +250,15 @@ class ChairManager:
                             occupation_time_threshold: float = 3.0,
                             vacant_time_threshold: float = 2.0,
                             chair_overlap_threshold: float = 0.6,
-                            pillow_overlap_threshold: float = 0.7
+                            pillow_overlap_threshold: float = 0.7,
+                            current_time: float = None
                             ) -> List[ChairStateEvent]:
         """
         更新椅子使用狀態並生成事件
         使用以人為主體的配對邏輯，確保一個人只會配對到一張椅子
+        current_time 為影格時間戳，未提供時使用時鐘的時間
         """
-        current_time = time.time()
+        current_time = self.clock.now() if current_time is None else current_time
         state_events = []
         
         def calculate_distance(point1, point2):
@@ -404,14 +416,19 @@ class ChairManager:
 
         return matched_id
 
+    def camera_ids(self) -> List[str]:
+        """目前有椅子資料的相機"""
+        with self._lock:
+            return list(self._contexts.keys())
+
     def get_camera_chairs(self, camera_id: str) -> List[ChairInfo]:
         """獲取指定相機的所有椅子信息"""
         with self._lock:
             return list(self._contexts.get(camera_id, {}).values())
 
-    def _cleanup_expired_data(self, camera_id: str) -> None:
+    def _cleanup_expired_data(self, camera_id: str, current_time: float = None) -> None:
         """清理過期數據"""
-        current_time = time.time()
+        current_time = self.clock.now() if current_time is None else current_time
         context = self._contexts.get(camera_id, {})
         
         expired_chairs = [
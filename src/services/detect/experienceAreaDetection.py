@@ -1,6 +1,4 @@
 import cv2
-import time
-import requests
 import numpy as np  
 from typing import List
 from src.config.config import *
@@ -10,58 +8,102 @@ from src.services.database.ChairService import ChairService
 from src.services.detect.experienceArea.cameraContext import CameraContext
 from src.services.detect.experienceArea.detection_service import DetectionService
 from src.services.detect.experienceArea.chair_manager import ChairManager, ChairStateEvent, ChairStateChange
+from src.services.replay.detectionLog import DetectionRecorder
+from src.services.utils.clock import Clock, get_clock
 from src.views.view import View
+from src.views.visualizationSink import VisualizationSink, VisualRecord
 from src.services.lib.loggingService import log
+from src.services.notification.notificationClient import get_notification_client
 
 class ExperienceAreaDetection:
-    def __init__(self) -> None:
+    def __init__(self, load_models: bool=True, clock: Clock=None) -> None:
+        """
+        椅子狀態以影格時間戳 (FrameData.timestamp) 計時，呼叫端未提供時間戳時才使用 clock 的時間。
+        :param load_models: 是否載入模型，重播錄製的偵測結果時不需要模型
+        :param clock: 預設為進程共用的時鐘，離線處理時可傳入模擬時鐘
+        """
+        self.clock = clock if clock is not None else get_clock()
         self.detection_service = DetectionService(
             chair_context=chair_context,
             pillow_context=pillow_context,
             person_context=pose_person_context,
             reid_context=reid_context
-        )
-        self.chair_manager = ChairManager(data_ttl=300)
+        ) if load_models else None
+        self.chair_manager = ChairManager(data_ttl=300, clock=self.clock)
         self.view = View()
         self.product_dict = EXPERIENCE_PRODUCT_DICT
         self.camera_contexts = dict()
-        self._visualization_windows = set()
+        self.visual_sink = None
+        self.visual_enabled = VISUAL
+        self.detection_recorder = DetectionRecorder(area='experience') if DETECTION_RECORD_DIR else None
         
     def __del__(self):
         """確保資源正確釋放"""
         self.cleanup_visualization()
 
     def cleanup_visualization(self):
-        """清理所有已創建的視窗"""
+        """停止視覺化線程並關閉所有已創建的視窗"""
         try:
-            # 關閉所有已創建的視窗
-            for window_name in self._visualization_windows:
-                cv2.destroyWindow(window_name)
-            self._visualization_windows.clear()
-            
-            # 確保所有窗口都被處理
-            cv2.waitKey(1)
+            if self.visual_sink is not None:
+                self.visual_sink.stop()
+                self.visual_sink = None
         except Exception as e:
             log.error(f"清理視覺化窗口時發生錯誤: {str(e)}")
 
+    def close(self):
+        """寫出尚未存檔的偵測結果錄製"""
+        if self.detection_recorder is not None:
+            self.detection_recorder.close()
+
+    def tracker_stats(self) -> dict:
+        """各相機追蹤中的椅子數量與使用中的椅子數量"""
+        stats = {}
+        for cameraId in self.chair_manager.camera_ids():
+            chairs = self.chair_manager.get_camera_chairs(cameraId)
+            stats[cameraId] = {
+                'chairs': len(chairs),
+                'in_use': sum(1 for chair in chairs if chair.state == 'in_use'),
+            }
+        return stats
+
     def get_camera_context(self, cameraId: str):
         if cameraId not in self.camera_contexts:
-            self.camera_contexts[cameraId] = CameraContext()
+            self.camera_contexts[cameraId] = CameraContext(clock=self.clock)
         return self.camera_contexts[cameraId]
 
-    @time_logger
-    def detect(self, cameraId: str, image: np.ndarray, products_of_interest: list):
+    @time_logger(camera_arg='cameraId')
+    def detect(self, cameraId: str, image: np.ndarray, products_of_interest: list, timestamp: float=None):
+        """
+        :param timestamp: 影格時間戳 (FrameData.timestamp)，未提供時使用時鐘的時間
+        """
+        timestamp = self.clock.now() if timestamp is None else timestamp
         chairs, pillows, persons = self.detection_service.detect(cameraId=cameraId, image=image)
+        if self.detection_recorder is not None:
+            self.detection_recorder.record(cameraId, timestamp,
+                                           {'chairs': chairs, 'pillows': pillows, 'persons': persons},
+                                           extra=products_of_interest)
+        self.apply_rules(cameraId, chairs, pillows, persons, products_of_interest, timestamp=timestamp)
 
+        # 如果啟用了視覺化，更新顯示
+        if self.visual_enabled:
+            self.visual(cameraId, image, pillows, persons)  
+        
+        return chairs, pillows, persons, image
+
+    def apply_rules(self, cameraId: str, chairs: list, pillows: list, persons: list,
+                    products_of_interest: list, timestamp: float=None) -> List[ChairStateEvent]:
+        """以偵測結果更新椅子資訊與狀態並送出狀態變更通知（重播錄製的偵測結果時直接由此進入）"""
+        timestamp = self.clock.now() if timestamp is None else timestamp
         # 更新椅子信息
         self.chair_manager.update_chairs_info(
             camera_id=cameraId,
             chairs=chairs,
             persons=persons,
+            current_time=timestamp,
         )
         
         # 更新椅子類型和椅墊匹配
-        self.chair_manager.update_chair_types(cameraId, pillows, persons)
+        self.chair_manager.update_chair_types(cameraId, pillows, persons, current_time=timestamp)
 
         
         # 更新椅子狀態並獲取狀態變更事件
@@ -71,41 +113,35 @@ class ExperienceAreaDetection:
             pillows=pillows,
             occupation_time_threshold=EXPERIENCE_TIME_THRES,
             vacant_time_threshold=LEAVE_TIME_THRES,
-            products_of_interest=products_of_interest
+            products_of_interest=products_of_interest,
+            current_time=timestamp
         )
         
         # 處理所有狀態變更事件
         for event in state_events:
             self._notify_state_change(event)
-        
-        # 如果啟用了視覺化，更新顯示
-        if VISUAL:
-            self.visual(cameraId, image, pillows, persons)  
-        
-        return chairs, pillows, persons, image
+        return state_events
     
     def _notify_state_change(self, event: ChairStateEvent):
-            """處理椅子狀態變更通知"""
+            """處理椅子狀態變更通知（由通報客戶端在背景送出）"""
             try:
                 payload = {
                     'camera_id': event.camera_id,
                     'product_id': self.product_dict.get(event.chair_type),
                     'is_using': event.state_change == ChairStateChange.OCCUPIED
                 }
-                api_url = f"http://{NotificationENDPOINT}/experience-event"
-                response = requests.post(api_url, json=payload)
-                if response.status_code == 200:
-                    log.info(f"Successfully notified status change for camera {event.camera_id} "
-                        f"and chair {event.chair_type}")
-                else:
-                    log.error(f"Failed to send notification: status code {response.status_code}")
+                get_notification_client().notify(
+                    path="/experience-event",
+                    payload=payload,
+                    coalesce_key=(event.camera_id, event.chair_id)
+                )
             except Exception as e:
                 log.error(f"Error sending notification: {str(e)}")
                 
     def visual(self, cameraId: str, image: np.ndarray, 
               pillows: List[dict], persons: List[dict]):
         """
-        視覺化檢測結果
+        將檢測結果交給視覺化線程，繪製與顯示不在分析線程執行，也不會修改推論用的影像
         Args:
             cameraId: 攝像頭ID
             image: 原始圖像
@@ -113,28 +149,24 @@ class ExperienceAreaDetection:
             persons: 檢測到的人物列表
         """
         try:
-            # 從 ChairManager 獲取椅子信息
-            chairs = self.chair_manager.get_camera_chairs(cameraId)
-            
-            # 添加到已創建視窗集合中
-            self._visualization_windows.add(cameraId)
-            
-            # 視覺化處理
-            self.view.visualExperienceArea(
-                image=image,
-                pillows=pillows,
-                chairs=chairs,
-                persons=persons
-            )
-            # 調整顯示大小和更新窗口
-            resized_image = cv2.resize(image, (1440, 960))
-            cv2.imshow(cameraId, resized_image)
-            cv2.waitKey(1)
-            
+            # 取出椅子目前的狀態，避免視覺化線程讀到之後才更新的資料
+            chairs = [
+                {
+                    "category": "chair",
+                    "id": chair.chair_id,
+                    "bbox": chair.position,
+                    "state": chair.state,
+                    "type": chair.type
+                }
+                for chair in self.chair_manager.get_camera_chairs(cameraId)
+            ]
+            if self.visual_sink is None:
+                self.visual_sink = VisualizationSink(render=self.render_visual, name='experience-visual')
+            self.visual_sink.submit(cameraId, image, pillows=pillows, chairs=chairs, persons=persons)
         except Exception as e:
             log.error(f"視覺化過程中發生錯誤: {str(e)}")
-            self.cleanup_visualization()
-            
-
- 
 
+    def render_visual(self, record: VisualRecord) -> np.ndarray:
+        """在視覺化線程中繪製檢測結果（縮放到輸出大小的緩衝區後再繪製，不修改原始影像）"""
+        return self.view.visualExperienceChairs(image=record.image, output_size=self.visual_sink.output_size,
+                                                **record.payload)
@@ -1,32 +1,69 @@
-import time
-from src.utils.utils import utils
+from src.services.utils.clock import Clock, get_clock
+from src.services.detect.salesArea.compiledRoi import compile_rois
 
 class CameraContext:
-    def __init__(self):
+    def __init__(self, clock: Clock=None):
+        """
+        :param clock: 呼叫端未提供影格時間戳時使用的時鐘，預設為進程共用的時鐘
+        """
+        self.clock = clock if clock is not None else get_clock()
         self.objects_dict = {}
         self.roi_info_dict = {}
+        self.compiled_rois = {}  # {roi_id: CompiledROI}
+        self.roi_version = 0  # ROI 設定版本，ROI 重新計算時遞增
+        self._rois_source = None
 
-    def update_objects(self, objects):
+    def update_objects(self, objects, current_time: float=None):
+        """
+        :param current_time: 影格時間戳，未提供時使用時鐘的時間
+        """
+        current_time = self.clock.now() if current_time is None else current_time
         for obj in objects:
             obj_id = obj.get("id")
             self.objects_dict[obj_id] = {
                 "object": obj,
-                "time": time.time()
+                "time": current_time
             }
-        self.cleanup_expired_objects(timeout=300)
+        self.cleanup_expired_objects(timeout=300, current_time=current_time)
         
     def update_rois(self, ROIs_info):
+        """
+        ROI 設定變動時重新編譯 ROI 幾何（外接框、多邊形遮罩與積分圖），
+        設定未變動（同一份 ROIs_info）時直接略過。
+        :return: 新增、移除或位置變動的 ROI ID 集合
+        """
+        if ROIs_info is self._rois_source:
+            return set()
+
+        previous = self.compiled_rois
+        compiled_rois = {}
         for ROI in ROIs_info:
             roi_id = ROI['id']
-            bbox = utils.find_min_bounding_box(points=ROI['position'])
-            self.roi_info_dict[roi_id] = bbox
+            polygon = [list(map(int, p)) for p in ROI['position']]
+            # 多邊形未變動時沿用已編譯的結果
+            if roi_id in previous and previous[roi_id].polygon == polygon:
+                compiled_rois[roi_id] = previous[roi_id]
+            else:
+                compiled_rois.update(compile_rois([ROI]))
+
+        changed = {
+            roi_id for roi_id in set(previous) | set(compiled_rois)
+            if previous.get(roi_id) is not compiled_rois.get(roi_id)
+        }
+        self._rois_source = ROIs_info
+        self.compiled_rois = compiled_rois
+        self.roi_info_dict = {roi_id: roi.bbox for roi_id, roi in compiled_rois.items()}
+        if changed:
+            self.roi_version += 1
+        return changed
             
-    def cleanup_expired_objects(self, timeout: int=180):
+    def cleanup_expired_objects(self, timeout: int=180, current_time: float=None):
         """
         清理超時的物件。
         :param timeout: 超時的時間（秒），預設為180秒。
+        :param current_time: 影格時間戳，未提供時使用時鐘的時間
         """
-        current_time = time.time()
+        current_time = self.clock.now() if current_time is None else current_time
         expired_keys = [
             obj_id for obj_id, obj_data in self.objects_dict.items()
             if current_time - obj_data["time"] > timeout
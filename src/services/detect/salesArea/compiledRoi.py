@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional
+from src.utils.utils import utils
+
+
+class CompiledROI:
+    """
+    預先編譯的 ROI 幾何資訊：外接框、多邊形遮罩與其積分圖。
+    多邊形遮罩只在 ROI 設定變動時建立一次，之後「框有多少比例落在多邊形內」的查詢為 O(1)。
+    """
+    def __init__(self, roi_id: str, polygon: List[List[int]]):
+        """
+        :param roi_id: ROI ID
+        :param polygon: 多邊形頂點 [[x, y], ...]
+        """
+        self.roi_id = roi_id
+        self.polygon = [list(map(int, p)) for p in polygon]
+        self.bbox = utils.find_min_bounding_box(points=self.polygon)
+        x1, y1, x2, y2 = self.bbox
+        self.width = max(1, x2 - x1)
+        self.height = max(1, y2 - y1)
+
+        points = np.array(self.polygon, dtype=np.int32) - np.array([x1, y1], dtype=np.int32)
+        self.mask = np.zeros((self.height, self.width), dtype=np.uint8)
+        cv2.fillPoly(self.mask, [points], 1)
+        # 積分圖大小為 (h+1, w+1)，integral[y, x] 為 mask[:y, :x] 的總和
+        self.integral = cv2.integral(self.mask)
+        self.area = int(self.integral[-1, -1])
+
+    def _inside_pixels(self, box) -> int:
+        x1, y1, x2, y2 = self.bbox
+        bx1 = min(max(int(box[0]) - x1, 0), self.width)
+        by1 = min(max(int(box[1]) - y1, 0), self.height)
+        bx2 = min(max(int(box[2]) - x1, 0), self.width)
+        by2 = min(max(int(box[3]) - y1, 0), self.height)
+        if bx2 <= bx1 or by2 <= by1:
+            return 0
+        ii = self.integral
+        return int(ii[by2, bx2] - ii[by1, bx2] - ii[by2, bx1] + ii[by1, bx1])
+
+    def fraction_inside(self, box) -> float:
+        """
+        計算框的面積有多少比例落在多邊形內。
+        :param box: [x1, y1, x2, y2]
+        :return: 0~1 的比例
+        """
+        box_area = utils.calculate_area(box)
+        if box_area <= 0:
+            return 0.0
+        return self._inside_pixels(box) / box_area
+
+    def coverage(self, box) -> float:
+        """計算多邊形的面積有多少比例被框覆蓋"""
+        if self.area == 0:
+            return 0.0
+        return self._inside_pixels(box) / self.area
+
+    def intersects(self, box, min_fraction: float = 0.0) -> bool:
+        """框與多邊形是否相交（可指定框落在多邊形內的最小比例）"""
+        if not utils.bboxes_overlap(self.bbox, box):
+            return False
+        inside = self._inside_pixels(box)
+        if min_fraction <= 0:
+            return inside > 0
+        box_area = utils.calculate_area(box)
+        return box_area > 0 and inside / box_area >= min_fraction
+
+
+def compile_rois(ROIs_info: list) -> Dict[str, CompiledROI]:
+    """將相機的 ROI 設定編譯為 {roi_id: CompiledROI}"""
+    return {ROI['id']: CompiledROI(roi_id=ROI['id'], polygon=ROI['position']) for ROI in ROIs_info}
@@ -5,6 +5,7 @@ from src.dao.context import Context
 from src.utils.utils import utils
 from src.services.detect.base.baseDetection import BaseDetection
 from src.services.detect.salesArea.salesUtils import SalesUtils
+from src.services.detect.salesArea.roiSegmenter import RoiSegmenter
 from src.services.decorator.decorator import  time_logger, postprocess_decorator
 from src.services.models.person_pose import PersonPose
 from src.services.models.object_detect import ObjectDetect
@@ -23,29 +24,39 @@ class DetectionService(BaseDetection):
         self.mobilesam_model = self._create_model(model_class=MobileSAM, context=mobilesam_context)
         self.person_model = self._create_model(model_class=ObjectDetect, context=person_context)
         self.reid_model_dict = dict()
+        self.roi_segmenter_dict = dict()
         self.salesUtils = SalesUtils()
         
-    @postprocess_decorator(names_dict={0: "object", 1: "person"})
-    @time_logger
-    def detect(self, cameraId: str, image: np.ndarray, ROIs: dict):
-        reid_model_dict = self.getReidModel(cameraId=cameraId)
-        person_reid_model = reid_model_dict['person']
-        sam_reid_model = reid_model_dict['sam']
-    
+    @time_logger(camera_arg='cameraId')
+    def detect(self, cameraId: str, image: np.ndarray, ROIs: dict, compiled_rois: dict=None):
+        person_tensor_outputs, sam_tensor_outputs = self.detect_models(cameraId=cameraId, image=image, ROIs=ROIs,
+                                                                       compiled_rois=compiled_rois)
+        return self.track(cameraId=cameraId, image=image,
+                          person_tensor_outputs=person_tensor_outputs, sam_tensor_outputs=sam_tensor_outputs)
+
+    @time_logger(camera_arg='cameraId')
+    def detect_models(self, cameraId: str, image: np.ndarray, ROIs: dict, compiled_rois: dict=None):
+        """
+        模型推論階段：行人偵測，ROI 無人時再以 FastSAM 分割商品。
+        :return: (行人偵測張量, FastSAM 分割張量；ROI 有人時為 None)
+        """
         # 處理行人模型的預測
         person_tensor_outputs = self.postprocess_person_output(self.person_model.detect(image=image))
-        person_reid_outputs = person_reid_model.detect(data=person_tensor_outputs, image=image)
-        if not self.salesUtils.being_visited(ROIs=ROIs, persons=person_tensor_outputs):
-            x1, y1, x2, y2 = utils.get_minimum_enclosing_bbox([ROI for _, ROI in ROIs.items()])
-            roi_image = image[y1: y2, x1:x2]
-            sam_tensor_outputs = self.sam_model.detect(image=roi_image, ori_point=[x1, y1])
-            sam_reid_outputs = sam_reid_model.detect(data=sam_tensor_outputs, image=image)
-            all_objects = person_reid_outputs + sam_reid_outputs
-    
-        else:
-            all_objects = person_reid_outputs
-        
-        return all_objects
+        sam_tensor_outputs = None
+        if not self.salesUtils.being_visited(ROIs=ROIs, persons=person_tensor_outputs, compiled_rois=compiled_rois):
+            sam_tensor_outputs = self.getRoiSegmenter(cameraId=cameraId).segment(image=image, ROIs=ROIs)
+        return person_tensor_outputs, sam_tensor_outputs
+
+    @time_logger(camera_arg='cameraId')
+    @postprocess_decorator(names_dict={0: "object", 1: "person"})
+    def track(self, cameraId: str, image: np.ndarray, person_tensor_outputs, sam_tensor_outputs=None):
+        """追蹤階段：以 ReID 為行人與商品分配 ID"""
+        reid_model_dict = self.getReidModel(cameraId=cameraId)
+        person_reid_outputs = reid_model_dict['person'].detect(data=person_tensor_outputs, image=image)
+        if sam_tensor_outputs is None:
+            return person_reid_outputs
+        sam_reid_outputs = reid_model_dict['sam'].detect(data=sam_tensor_outputs, image=image)
+        return person_reid_outputs + sam_reid_outputs
 
     @postprocess_decorator(names_dict={0: "object"})
     def detect_all_objects(self, cameraId: str, image: np.ndarray, ROI: list):
@@ -65,6 +76,11 @@ class DetectionService(BaseDetection):
             })
         return self.reid_model_dict.get(cameraId)
 
+    def getRoiSegmenter(self, cameraId: str):
+        if cameraId not in self.roi_segmenter_dict:
+            self.roi_segmenter_dict[cameraId] = RoiSegmenter(sam_model=self.sam_model)
+        return self.roi_segmenter_dict[cameraId]
+
     def postprocess_person_output(self, outputs: list):
         outputs = outputs.clone()  # 創建張量的副本
         outputs[:, 5] = torch.where(outputs[:, 5] == 0, 
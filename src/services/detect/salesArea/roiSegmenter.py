@@ -0,0 +1,96 @@
+import torch
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from src.utils.utils import utils
+from src.config.config import SEGMENT_CLUSTER_MARGIN
+from src.services.utils.changeDetector import ChangeDetector
+
+
+class RoiSegmenter:
+    """
+    ROI 範圍內的 FastSAM 分割。
+    將重疊（或相距 margin 以內）的 ROI 合併成群組，每個群組各自裁切並依裁切大小調整模型輸入尺寸，
+    取代以所有 ROI 最小外接框進行單次分割的做法；群組畫面沒有變化時直接沿用上次的分割結果。
+    """
+    def __init__(self, sam_model, margin: int = SEGMENT_CLUSTER_MARGIN, change_detector: ChangeDetector = None):
+        """
+        :param sam_model: FastSAM 模型 (Sam)
+        :param margin: 合併 ROI 時允許的間距（像素）
+        :param change_detector: 變化偵測器，未指定時使用預設參數建立
+        """
+        self.sam_model = sam_model
+        self.margin = margin
+        self.change_detector = change_detector or ChangeDetector()
+        self._rois_signature = None
+        self._clusters: List[List[int]] = []
+        self._cache: Dict[Tuple[int, int, int, int], torch.Tensor] = {}
+
+    def plan_crops(self, ROIs: dict, image_shape) -> List[List[int]]:
+        """
+        規劃裁切範圍：合併重疊的 ROI，回傳每個群組的外接框 [x1, y1, x2, y2]。
+        """
+        h, w = image_shape[:2]
+        boxes = [[int(v) for v in roi] for roi in ROIs.values()]
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(boxes)):
+                for j in range(i + 1, len(boxes)):
+                    if self._near(boxes[i], boxes[j]):
+                        boxes[i] = utils.merge_bboxes(boxes[i], boxes[j])
+                        del boxes[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        clusters = []
+        for x1, y1, x2, y2 in boxes:
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(w, x2), min(h, y2)
+            if x2 > x1 and y2 > y1:
+                clusters.append([x1, y1, x2, y2])
+        return clusters
+
+    def _near(self, bbox1, bbox2) -> bool:
+        m = self.margin
+        expanded = [bbox1[0] - m, bbox1[1] - m, bbox1[2] + m, bbox1[3] + m]
+        return utils.bboxes_overlap(expanded, bbox2)
+
+    def _imgsz(self, crop_shape) -> int:
+        """依裁切大小選擇模型輸入尺寸（32 的倍數，不超過模型預設尺寸）"""
+        long_side = max(crop_shape[:2])
+        imgsz = int(np.ceil(long_side / 32.0) * 32)
+        return max(32, min(self.sam_model.imgsz, imgsz))
+
+    def segment(self, image: np.ndarray, ROIs: dict) -> torch.Tensor:
+        """
+        對所有 ROI 群組進行分割，回傳座標已校正回原圖的 FastSAM 輸出張量。
+        """
+        signature = tuple(sorted((k, tuple(v)) for k, v in ROIs.items()))
+        if signature != self._rois_signature:
+            self._rois_signature = signature
+            self._clusters = self.plan_crops(ROIs, image.shape)
+            keys = [tuple(c) for c in self._clusters]
+            self._cache = {k: v for k, v in self._cache.items() if k in keys}
+            self.change_detector.retain(keys)
+
+        outputs = []
+        for cluster in self._clusters:
+            key = tuple(cluster)
+            x1, y1, x2, y2 = cluster
+            crop = image[y1:y2, x1:x2]
+            if key not in self._cache or self.change_detector.has_changed(key, crop):
+                self._cache[key] = self.sam_model.detect(image=crop, ori_point=[x1, y1], imgsz=self._imgsz(crop.shape))
+                self.change_detector.set_reference(key, crop)
+            outputs.append(self._cache[key])
+
+        if not outputs:
+            # 空結果與模型輸出放在同一裝置上，後續 cat 與索引才不會發生裝置不一致
+            return torch.zeros((0, 6), device=self.sam_model.device)
+        return torch.cat(outputs, dim=0)
+
+    def invalidate(self) -> None:
+        """清除所有快取的分割結果"""
+        self._cache.clear()
+        self.change_detector.retain([])
@@ -16,11 +16,18 @@ class SalesUtils:
         return objects, persons
     
     # 檢測ROI狀態是否正在被訪問
-    def being_visited(self, ROIs: dict, persons: list):
+    def being_visited(self, ROIs: dict, persons: list, compiled_rois: dict=None):
         visited = False
-        for _, ROI in ROIs.items():
-            if any([utils.calculate_iou(ROI, person[:4])>0 for person in persons]):
-                visited = True
+        for roi_id, ROI in ROIs.items():
+            compiled_roi = compiled_rois.get(roi_id) if compiled_rois else None
+            for person in persons:
+                person_bbox = [int(v) for v in person[:4]]
+                if compiled_roi is not None:
+                    # 以多邊形判斷，避免斜向區域的外接框誤判
+                    if compiled_roi.intersects(person_bbox):
+                        visited = True
+                elif utils.calculate_iou(ROI, person_bbox) > 0:
+                    visited = True
         return visited   
         
         
@@ -1,18 +1,34 @@
 import cv2
-import time
 import numpy as np
 from src.config.config import *
 from src.services.decorator.decorator import  time_logger
+from src.services.utils.clock import Clock, get_clock
 from src.services.detect.salesArea.salesUtils import SalesUtils
 from src.services.detect.salesArea.cameraContext import CameraContext
 from src.services.detect.salesArea.detection_service import DetectionService
 from src.services.track.areaInteractionMonitor import AreaInteractionMonitor
 from src.services.track.objectTracker import ObjectTracker
+from src.services.track.maskCache import MaskCache
+from src.services.track.secondCheckWorker import SecondCheckWorker
 from src.services.video.RecordingService import RecordingService
+from src.services.replay.detectionLog import DetectionRecorder
 from src.views.view import View
+from src.views.visualizationSink import VisualizationSink, VisualRecord
 
 class SalesAreaDetection:
-    def __init__(self, not_exist_thres: int=PRODUCT_NO_EXIST_THRES):
+    monitor_class = AreaInteractionMonitor  # ROI 互動監控的類別，重播時替換為不需要影像的版本
+
+    def __init__(self, not_exist_thres: int=PRODUCT_NO_EXIST_THRES, load_models: bool=True,
+                 async_second_check: bool=ASYNC_SECOND_CHECK, clock: Clock=None):
+        """
+        規則（物件逾時、離開區域、商品丟失）以影格時間戳 (FrameData.timestamp) 計時，
+        呼叫端未提供時間戳時才使用 clock 的時間。
+        :param not_exist_thres: 商品消失多久（秒）視為丟失
+        :param load_models: 是否載入模型，重播錄製的偵測結果時不需要模型
+        :param async_second_check: 是否在背景工作池執行丟失的二次檢查
+        :param clock: 預設為進程共用的時鐘，離線處理時可傳入模擬時鐘
+        """
+        self.clock = clock if clock is not None else get_clock()
         self.object_tracker = ObjectTracker(window_size=PRODUCT_WINDOW_SIZE, 
                                             min_avg_appearance=PRODUCT_MIN_AVG_APPEARANCE, 
                                             min_area=PRODUCT_AREA_THRES)
@@ -23,37 +39,90 @@ class SalesAreaDetection:
             mobilesam_context=mobilesam_context,
             person_context=person_context,
             reid_context=reid_context
-        )
+        ) if load_models else None
         self.roi_monitor_dict = dict()
         self.camera_contexts = dict()
         self.recording_services = dict()
+        self.recording_provider = None  # Callable[[cameraId], 錄影器 or None]
+        self.visual_sink = None
+        self.visual_enabled = VISUAL
+        self.detection_recorder = DetectionRecorder(area='sales') if DETECTION_RECORD_DIR else None
         self.not_exist_thres = not_exist_thres
         self.max_area_bboxs_dict = dict()
+        self.mask_cache = MaskCache(max_entries=MASK_CACHE_SIZE)
+        self.second_check_worker = SecondCheckWorker() if async_second_check else None
         
 
     def get_camera_context(self, cameraId: str):
         if cameraId not in self.camera_contexts:
-            self.camera_contexts[cameraId] = CameraContext()
+            self.camera_contexts[cameraId] = CameraContext(clock=self.clock)
         return self.camera_contexts[cameraId]
     
     def get_recording_service(self, cameraId: str):
+        if self.recording_provider is not None:
+            # 由相機串流端提供不重新編碼的錄影器，相機未啟用時退回重新編碼的錄影方式
+            recorder = self.recording_provider(cameraId)
+            if recorder is not None:
+                return recorder
         if cameraId not in self.recording_services:
             self.recording_services[cameraId] = RecordingService(
                                                     fps=RECORD_FPS,
                                                     pre_seconds=RECORD_PRETIME,
                                                     post_seconds=RECORD_POSTTIME,
-                                                    output_dir=PROMOTION_OUTPUT_DIR)
+                                                    output_dir=PROMOTION_OUTPUT_DIR,
+                                                    clock=self.clock)
         return self.recording_services[cameraId]
 
-    @time_logger
-    def detect(self, cameraId: str, image: np.ndarray, ROIs_info: list, record_mode: bool=False):
+    @time_logger(camera_arg='cameraId')
+    def detect(self, cameraId: str, image: np.ndarray, ROIs_info: list, record_mode: bool=False,
+               timestamp: float=None):
+        """
+        :param timestamp: 影格時間戳 (FrameData.timestamp)，未提供時使用時鐘的時間
+        """
+        job = self.detect_stage(cameraId=cameraId, image=image, ROIs_info=ROIs_info, timestamp=timestamp)
+        job = self.track_stage(job)
+        job = self.rules_stage(job, record_mode=record_mode)
+        return job['result']
+
+    @time_logger(camera_arg='cameraId')
+    def detect_stage(self, cameraId: str, image: np.ndarray, ROIs_info: list, timestamp: float=None) -> dict:
+        """
+        偵測階段：更新 ROI 設定並執行行人偵測與 FastSAM 分割。
+        各階段以 dict 傳遞同一幀的資料，可依序呼叫，也可交由 StagedPipeline 在不同線程執行。
+        """
         camera_context = self.get_camera_context(cameraId=cameraId)
-        recording_service = self.get_recording_service(cameraId=cameraId)
+        changed_rois = camera_context.update_rois(ROIs_info=ROIs_info)
+        # ROI 更新時會換成新的字典，保存本幀的參照即為快照，規則階段不會讀到下一幀的 ROI
+        ROIs, compiled_rois = camera_context.roi_info_dict, camera_context.compiled_rois
+        person_tensor_outputs, sam_tensor_outputs = self.detection_service.detect_models(
+            cameraId=cameraId, image=image, ROIs=ROIs, compiled_rois=compiled_rois)
+        return {
+            'cameraId': cameraId,
+            'image': image,
+            'timestamp': self.clock.now() if timestamp is None else timestamp,
+            'ROIs_info': ROIs_info,
+            'ROIs': ROIs,
+            'compiled_rois': compiled_rois,
+            'changed_rois': changed_rois,
+            'person_tensor_outputs': person_tensor_outputs,
+            'sam_tensor_outputs': sam_tensor_outputs,
+        }
 
-        camera_context.update_rois(ROIs_info=ROIs_info)
-        ROIs = camera_context.roi_info_dict
-        
-        all_objects = self.detection_service.detect(cameraId=cameraId, image=image, ROIs=ROIs)            
+    @time_logger(camera_arg='job', camera_key='cameraId')
+    def track_stage(self, job: dict) -> dict:
+        """追蹤階段：ReID 追蹤、物件穩定度過濾，並更新相機的物件字典"""
+        cameraId = job['cameraId']
+        all_objects = self.detection_service.track(cameraId=cameraId, image=job['image'],
+                                                   person_tensor_outputs=job.pop('person_tensor_outputs'),
+                                                   sam_tensor_outputs=job.pop('sam_tensor_outputs'))
+        if self.detection_recorder is not None:
+            self.detection_recorder.record(cameraId, job['timestamp'], {'objects': all_objects},
+                                           extra=job['ROIs_info'])
+        return self.apply_tracking(job, all_objects)
+
+    def apply_tracking(self, job: dict, all_objects: list) -> dict:
+        """以 ReID 追蹤後的結果更新物件穩定度與相機的物件字典（重播錄製的偵測結果時直接由此進入）"""
+        camera_context = self.get_camera_context(cameraId=job['cameraId'])
         # 將所有物件分割為物件與行人
         objects, persons = self.sale_utils.get_objects_persons(all_objects=all_objects)
         
@@ -61,58 +130,155 @@ class SalesAreaDetection:
         filter_objects = self.object_tracker.filter_objects(current_objects=objects)
 
         # 將本次預測到的物件更新到物件字典內
-        camera_context.update_objects(objects=filter_objects)
-        
-        if len(camera_context.objects_dict) > 0:
+        camera_context.update_objects(objects=filter_objects, current_time=job['timestamp'])
+        job['persons'] = persons
+        # 規則階段可能與下一幀的追蹤同時進行，傳遞物件字典的複本
+        job['objects_dict'] = dict(camera_context.objects_dict)
+        return job
+
+    @time_logger(camera_arg='job', camera_key='cameraId')
+    def rules_stage(self, job: dict, record_mode: bool=False) -> dict:
+        """規則階段：ROI 互動監控、丟失判定、錄影與視覺化"""
+        cameraId, image, ROIs = job['cameraId'], job['image'], job['ROIs']
+        persons, objects_dict = job['persons'], job['objects_dict']
+        if job['changed_rois']:
+            self.apply_roi_changes(cameraId=cameraId, area_ids=job['changed_rois'])
+
+        if len(objects_dict) > 0:
             for area_id, roi in ROIs.items():
                 self.roi_monitor(cameraId=cameraId, 
                                 area_id=area_id, 
                                 roi_bbox=roi, 
+                                compiled_roi=job['compiled_rois'].get(area_id),
                                 persons=persons, 
                                 current_frame = image,
-                                objects_dict=camera_context.objects_dict, 
-                                record_mode=record_mode)
+                                objects_dict=objects_dict, 
+                                record_mode=record_mode,
+                                current_time=job['timestamp'])
             # self.check_ROI_missing_product(cameraId=cameraId, area_id=area_id, roi=roi, persons=persons)
-        if record_mode:
+        self.handle_confirmed_missing(record_mode=record_mode, current_time=job['timestamp'])
+        recording_service = self.get_recording_service(cameraId=cameraId) if record_mode else None
+        if record_mode and recording_service.needs_frames:
             zones = [roi for _, roi in ROIs.items()]
-            self.view.visualSalesArea(image=image, persons=persons, objects_dict=camera_context.objects_dict,
+            self.view.visualSalesArea(image=image, persons=persons, objects_dict=objects_dict,
                                       zones=zones, interactiveAreas=self.max_area_bboxs_dict.get(cameraId, [])
                                       )
-            recording_service.buffer_frame(image) if not recording_service.is_recording else recording_service.record_frame(image)
+            if not recording_service.is_recording:
+                recording_service.buffer_frame(image, timestamp=job['timestamp'])
+            else:
+                recording_service.record_frame(image, timestamp=job['timestamp'])
             
-        if VISUAL:
-            self.visual(cameraId=cameraId, image=image, persons=persons)    
+        if self.visual_enabled:
+            self.visual(cameraId=cameraId, image=image, persons=persons, objects_dict=objects_dict)    
         
-        return  camera_context.objects_dict, persons, ROIs, self.max_area_bboxs_dict.get(cameraId, [])
+        job['result'] = (objects_dict, persons, ROIs, self.max_area_bboxs_dict.get(cameraId, []))
+        return job
         
-    def roi_monitor(self, cameraId: str, area_id: str, roi_bbox: list, persons: list, current_frame:np.ndarray, objects_dict: dict, record_mode: bool):
+    def roi_monitor(self, cameraId: str, area_id: str, roi_bbox: list, persons: list, current_frame:np.ndarray, objects_dict: dict, record_mode: bool,
+                    current_time: float=None, compiled_roi=None):
+        """
+        :param compiled_roi: 本幀在偵測階段保存的 CompiledROI 快照
+        """
+        current_time = self.clock.now() if current_time is None else current_time
         id = f"{cameraId}_{area_id}"
         if id not in self.roi_monitor_dict:
             self.roi_monitor_dict.update({
-                id: AreaInteractionMonitor(area_bbox=roi_bbox, mobilesam_model=self.detection_service.mobilesam_model)
+                id: self.monitor_class(area_bbox=roi_bbox, 
+                                       mobilesam_model=getattr(self.detection_service, 'mobilesam_model', None),
+                                       area_key=id,
+                                       mask_cache=self.mask_cache,
+                                       second_check_worker=self.second_check_worker,
+                                       compiled_roi=compiled_roi,
+                                       clock=self.clock)
             })
         roi_monitor_instance = self.roi_monitor_dict[id]
         max_area_bboxs = roi_monitor_instance.process_person(persons=persons)
         self.max_area_bboxs_dict[cameraId] = max_area_bboxs
-        roi_monitor_instance.monitor_area_interaction(persons=persons, current_frame=current_frame)
+        roi_monitor_instance.monitor_area_interaction(persons=persons, current_frame=current_frame,
+                                                      current_time=current_time)
         
         # 检查物品丢失并启动录制
         if roi_monitor_instance.update_objects(camera_id=cameraId,
                                                area_id=area_id,
-                                               current_time=time.time(),
+                                               current_time=current_time,
                                                objects_dict=objects_dict,
                                                current_frame=current_frame,
                                                ):
             if record_mode:
                 recording_service = self.get_recording_service(cameraId=cameraId)
-                recording_service.start_recording(cameraId)
+                recording_service.start_recording(cameraId, timestamp=current_time)
                 
-    def visual(self, cameraId, image, persons):
+    def apply_roi_changes(self, cameraId: str, area_ids: set):
+        """ROI 變動時移除受影響區域的監控狀態，下次監控時以新的 ROI 重新建立"""
+        for area_id in area_ids:
+            id = f"{cameraId}_{area_id}"
+            if self.roi_monitor_dict.pop(id, None) is not None:
+                self.mask_cache.invalidate(id)
+
+    def handle_confirmed_missing(self, record_mode: bool, current_time: float=None):
+        """取回背景二次檢查的判定結果，在分析線程上通報、標記已通報並啟動錄影"""
+        if self.second_check_worker is None:
+            return
+        for monitor, cameraId, area_id, candidates, missing in self.second_check_worker.drain_completed():
+            if monitor.apply_check_results(cameraId, area_id, candidates, missing) and record_mode:
+                recording_service = self.get_recording_service(cameraId=cameraId)
+                recording_service.start_recording(cameraId, timestamp=current_time)
+
+    def close(self):
+        """停止背景工作"""
+        if self.second_check_worker is not None:
+            self.second_check_worker.stop()
+        for recording_service in self.recording_services.values():
+            recording_service.close()
+        if self.detection_recorder is not None:
+            self.detection_recorder.close()
+
+    def tracker_stats(self) -> dict:
+        """各相機追蹤中的商品數量與監控中的 ROI 數量"""
+        return {
+            cameraId: {
+                'objects': len(camera_context.objects_dict),
+                'rois': len(camera_context.roi_info_dict),
+            }
+            for cameraId, camera_context in self.camera_contexts.items()
+        }
+
+    def second_check_stats(self) -> dict:
+        """二次檢查工作池的佇列深度與延後提交次數（同步檢查時為空）"""
+        if self.second_check_worker is None:
+            return {}
+        return self.second_check_worker.stats()
+
+    def recording_stats(self) -> dict:
+        """各相機錄影佇列與事件影片寫入器的背壓統計"""
+        if not self.recording_services:
+            return {}
+        writer = next(iter(self.recording_services.values())).clip_writer
+        return {
+            'cameras': {cameraId: service.stats() for cameraId, service in self.recording_services.items()},
+            'writer': writer.stats(),
+        }
+
+    def visual(self, cameraId, image, persons, objects_dict=None):
+        """將偵測結果交給視覺化線程，繪製與顯示不在分析線程執行"""
         camera_context = self.get_camera_context(cameraId=cameraId)
         ROIs = camera_context.roi_info_dict
-        zones = [roi for _, roi in ROIs.items()]
-        image_C = image.copy()
-        self.view.visualSalesArea(image=image_C, persons=persons, objects_dict=camera_context.objects_dict,
-                                    zones=zones, interactiveAreas=self.max_area_bboxs_dict.get(cameraId, [])
-                                    )
-        cv2.imshow(cameraId, cv2.resize(image_C, (1440, 960))); cv2.waitKey(1)
+        objects_dict = camera_context.objects_dict if objects_dict is None else objects_dict
+        if self.visual_sink is None:
+            self.visual_sink = VisualizationSink(render=self.render_visual, name='sales-visual')
+        self.visual_sink.submit(cameraId, image,
+                                persons=persons,
+                                objects_dict=objects_dict,
+                                zones=[roi for _, roi in ROIs.items()],
+                                interactiveAreas=self.max_area_bboxs_dict.get(cameraId, []))
+
+    def render_visual(self, record: VisualRecord) -> np.ndarray:
+        """在視覺化線程中繪製偵測結果（縮放到輸出大小的緩衝區後再繪製，不修改原始影像）"""
+        return self.view.visualSalesArea(image=record.image, output_size=self.visual_sink.output_size,
+                                         **record.payload)
+
+    def cleanup_visualization(self):
+        """停止視覺化線程並關閉視窗"""
+        if self.visual_sink is not None:
+            self.visual_sink.stop()
+            self.visual_sink = None
@@ -0,0 +1,285 @@
+import json
+import time
+import struct
+import threading
+from collections import deque
+from multiprocessing import Pipe
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from src.services.lib.loggingService import log
+from src.config.config import IPC_MAX_PENDING
+
+# 訊息種類
+MSG_RESULT = 1
+MSG_METRICS = 2
+MSG_CONTROL = 3
+
+AREA_CODES = {'sales-area': 0, 'experience-area': 1}
+AREA_NAMES = {code: name for name, code in AREA_CODES.items()}
+
+# kind, area, timestamp, camera_id 長度, 物件數, 行人數, 椅子 JSON 長度
+_RESULT_HEADER = struct.Struct('<BBdHHHI')
+_KIND = struct.Struct('<B')
+
+
+def _pack_boxes(items: Optional[Iterable[dict]]) -> Tuple[int, bytes]:
+    """將 [{'id', 'bbox'}, ...] 打包為 int32 陣列 (N x 5: id, x1, y1, x2, y2)"""
+    if not items:
+        return 0, b''
+    rows = []
+    for index, item in enumerate(items):
+        item_id = item.get('id')
+        bbox = item['bbox']
+        # 未追蹤（沒有 id）的項目以負數索引區分
+        rows.append((-(index + 1) if item_id is None else int(item_id),
+                     int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])))
+    return len(rows), np.asarray(rows, dtype=np.int32).tobytes()
+
+
+def _unpack_boxes(buffer: memoryview, offset: int, count: int) -> Tuple[Dict[str, List[int]], int]:
+    if count == 0:
+        return {}, offset
+    size = count * 5 * 4
+    rows = np.frombuffer(buffer, dtype=np.int32, count=count * 5, offset=offset).reshape(count, 5)
+    return {str(row[0]): row[1:].tolist() for row in rows}, offset + size
+
+
+def encode_result(camera_id: str, area: str, timestamp: float,
+                  objects: Optional[Iterable[dict]] = None,
+                  persons: Optional[Iterable[dict]] = None,
+                  chairs: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    將單幀結果編碼為二進位訊息。
+    物件與行人以 int32 陣列傳送；椅子數量少且欄位不固定，以精簡 JSON 傳送。
+    """
+    camera_bytes = camera_id.encode('utf-8')
+    object_count, object_bytes = _pack_boxes(objects)
+    person_count, person_bytes = _pack_boxes(persons)
+    chair_bytes = json.dumps(chairs, separators=(',', ':')).encode('utf-8') if chairs is not None else b''
+    header = _RESULT_HEADER.pack(MSG_RESULT, AREA_CODES.get(area, 0), timestamp, len(camera_bytes),
+                                 object_count, person_count, len(chair_bytes))
+    # 最後兩個位元組標記物件／行人區塊是否有提供（與「提供但為空」區分）
+    return b''.join((header, camera_bytes, object_bytes, person_bytes, chair_bytes,
+                     bytes([objects is not None, persons is not None])))
+
+
+def decode_result(data: bytes) -> Dict[str, Any]:
+    buffer = memoryview(data)
+    _, area_code, timestamp, camera_len, object_count, person_count, chair_len = _RESULT_HEADER.unpack_from(buffer, 0)
+    offset = _RESULT_HEADER.size
+    camera_id = bytes(buffer[offset:offset + camera_len]).decode('utf-8')
+    offset += camera_len
+    objects, offset = _unpack_boxes(buffer, offset, object_count)
+    persons, offset = _unpack_boxes(buffer, offset, person_count)
+    chairs = json.loads(bytes(buffer[offset:offset + chair_len])) if chair_len else None
+    offset += chair_len
+    has_objects, has_persons = buffer[offset], buffer[offset + 1]
+
+    sections = {}
+    if has_objects:
+        sections['objects'] = objects
+    if has_persons:
+        sections['persons'] = persons
+    if chairs is not None:
+        sections['chairs'] = chairs
+    return {'camera_id': camera_id, 'area': AREA_NAMES.get(area_code, 'sales-area'),
+            'timestamp': timestamp, 'sections': sections}
+
+
+def encode_message(kind: int, payload: Dict[str, Any]) -> bytes:
+    return _KIND.pack(kind) + json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def decode_message(data: bytes) -> Tuple[int, Any]:
+    kind = data[0]
+    if kind == MSG_RESULT:
+        return kind, decode_result(data)
+    return kind, json.loads(data[_KIND.size:])
+
+
+class ChildChannel:
+    """
+    偵測子進程端的通道。
+    結果與監控數據先放入有上限的佇列，由背景線程寫入管道，偵測流程不會因 API 進程讀取較慢而阻塞；
+    佇列已滿時丟棄最舊的結果。控制訊息（例如更新設定）由 poll_control 取回。
+    背景線程由子進程的進入點 (ProcessManager._run_target) 以 start() 啟動一次；
+    API 進程關閉管道後通道即關閉，之後送出的訊息直接丟棄。
+    """
+    def __init__(self, control_conn, result_conn, max_pending: int = IPC_MAX_PENDING):
+        self._control_conn = control_conn
+        self._result_conn = result_conn
+        self.max_pending = max_pending
+        self._pending: deque = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._closed = False
+        self.sent = 0
+        self.dropped = 0
+
+    def __getstate__(self):
+        # 只傳遞管道端點，線程與佇列在子進程中重新建立
+        return {'control_conn': self._control_conn, 'result_conn': self._result_conn,
+                'max_pending': self.max_pending}
+
+    def __setstate__(self, state):
+        self.__init__(state['control_conn'], state['result_conn'], state['max_pending'])
+
+    def start(self):
+        """啟動寫入管道的背景線程（重複呼叫或通道已關閉時不做任何事）"""
+        with self._condition:
+            if self._running or self._closed:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._send_loop, name="ipc-sender", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 1.0):
+        with self._condition:
+            self._running = False
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        for conn in (self._control_conn, self._result_conn):
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _enqueue(self, data: bytes):
+        with self._condition:
+            if self._closed:
+                self.dropped += 1
+                return
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(data)
+            self._condition.notify()
+
+    def _send_loop(self):
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait(timeout=0.5)
+                if not self._running:
+                    return
+                data = self._pending.popleft()
+            try:
+                self._result_conn.send_bytes(data)
+                self.sent += 1
+            except (BrokenPipeError, EOFError, OSError):
+                # API 進程已關閉管道，之後的訊息直接丟棄，不再重新啟動線程
+                with self._condition:
+                    self._running = False
+                    self._closed = True
+                    self.dropped += len(self._pending) + 1
+                    self._pending.clear()
+                return
+
+    def send_result(self, camera_id: str, area: str, timestamp: float,
+                    objects: Optional[Iterable[dict]] = None,
+                    persons: Optional[Iterable[dict]] = None,
+                    chairs: Optional[Dict[str, Any]] = None):
+        """送出單幀結果（非阻塞）"""
+        self._enqueue(encode_result(camera_id, area, timestamp, objects=objects, persons=persons, chairs=chairs))
+
+    def send_metrics(self, metrics: Dict[str, Any]):
+        """送出監控數據（非阻塞）"""
+        metrics = dict(metrics, ipc_sent=self.sent, ipc_dropped=self.dropped)
+        self._enqueue(encode_message(MSG_METRICS, metrics))
+
+    def poll_control(self) -> List[Dict[str, Any]]:
+        """取回所有待處理的控制訊息"""
+        messages = []
+        try:
+            while self._control_conn.poll():
+                kind, payload = decode_message(self._control_conn.recv_bytes())
+                if kind == MSG_CONTROL:
+                    messages.append(payload)
+        except (EOFError, OSError):
+            pass
+        return messages
+
+
+class ParentChannel:
+    """
+    API 進程端的通道。
+    背景線程讀取子進程的結果與監控數據並交給回呼函式；send_control 送出控制訊息。
+    """
+    def __init__(self, on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_metrics: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        :param on_result: 收到單幀結果時的回呼函式
+        :param on_metrics: 收到監控數據時的回呼函式
+        """
+        self.on_result = on_result
+        self.on_metrics = on_metrics
+        control_recv, control_send = Pipe(duplex=False)
+        result_recv, result_send = Pipe(duplex=False)
+        self._control_conn = control_send
+        self._result_conn = result_recv
+        self.child = ChildChannel(control_conn=control_recv, result_conn=result_send)
+        self.metrics: Dict[str, Any] = {}
+        self.metrics_time = 0.0
+        self.received = 0
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="ipc-reader", daemon=True)
+        self._thread.start()
+
+    def release_child_ends(self):
+        """子進程啟動後關閉 API 進程持有的子進程端點，子進程結束時讀取端才會收到 EOF"""
+        for conn in (self.child._control_conn, self.child._result_conn):
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close(self, timeout: float = 1.0):
+        self._running = False
+        for conn in (self._control_conn, self._result_conn):
+            try:
+                conn.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def send_control(self, payload: Dict[str, Any]) -> bool:
+        try:
+            self._control_conn.send_bytes(encode_message(MSG_CONTROL, payload))
+            return True
+        except (BrokenPipeError, EOFError, OSError) as e:
+            log.error(f"送出控制訊息失敗: {str(e)}")
+            return False
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                if not self._result_conn.poll(0.5):
+                    continue
+                kind, payload = decode_message(self._result_conn.recv_bytes())
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                log.error(f"解析子進程訊息時發生錯誤: {str(e)}")
+                continue
+
+            self.received += 1
+            try:
+                if kind == MSG_RESULT and self.on_result:
+                    self.on_result(payload)
+                elif kind == MSG_METRICS:
+                    self.metrics = payload
+                    self.metrics_time = time.time()
+                    if self.on_metrics:
+                        self.on_metrics(payload)
+            except Exception as e:
+                log.error(f"處理子進程訊息時發生錯誤: {str(e)}")
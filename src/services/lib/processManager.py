@@ -1,39 +1,66 @@
 import time
 import threading
 from multiprocessing import Process, Event
+from typing import Any, Callable, Dict, List, Optional
 from src.services.lib.loggingService import log
+from src.services.lib.ipcChannel import ParentChannel
 
 class ProcessManager:
-    def __init__(self, target_function):
+    def __init__(self, target_function, on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        :param target_function: 子進程執行的函式，簽名為 target_function(stop_event, channel)
+        :param on_result: 收到子進程單幀結果時的回呼函式（在 API 進程的讀取線程中呼叫）
+        """
         self.target_function = target_function
+        self.on_result = on_result
         self.process = None
         self.stop_event = None
-        self.shared_state = {}
+        self.channel: Optional[ParentChannel] = None
         
-    def _run_target(self):
+    @staticmethod
+    def _run_target(target_function, stop_event, channel):
+        channel.start()
         try:
-            # 創建新的事件對象
-            self.stop_event = Event()
-            self.target_function(self.stop_event, self.shared_state)
+            target_function(stop_event, channel)
         except Exception as e:
             log.error(f"進程執行錯誤: {str(e)}")
         finally:
+            channel.close()
             log.info("進程執行完成")
 
-    def start(self):
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """子進程最近一次回報的監控數據"""
+        return self.channel.metrics if self.channel else {}
+
+    def is_alive(self) -> bool:
+        return bool(self.process and self.process.is_alive())
+
+    def start(self, initial_controls: Optional[List[Dict[str, Any]]] = None):
+        """
+        :param initial_controls: 子進程啟動前先放入通道的控制訊息（例如分片的相機分配），
+                                 子進程一開始讀取就能取得
+        """
         if self.process and self.process.is_alive():
             log.warning("進程已在運行中")
             return {"status": "error", "message": "Process is already running"}
 
         try:
-            if self.stop_event:
-                self.stop_event.clear()
-                
+            # 停止事件與通道都在 API 進程建立，再傳給子進程，兩端才會是同一個物件
+            self.stop_event = Event()
+            self._close_channel()
+            self.channel = ParentChannel(on_result=self.on_result)
+            for control in initial_controls or []:
+                self.channel.send_control(control)
+
             self.process = Process(
                 target=self._run_target,
+                args=(self.target_function, self.stop_event, self.channel.child),
                 daemon=False
             )
             self.process.start()
+            self.channel.release_child_ends()
+            self.channel.start()
             
             time.sleep(0.5)
             
@@ -77,7 +104,7 @@ class ProcessManager:
                         return {"status": "error", "message": "Failed to kill process"}
 
             self.process = None
-            self.shared_state.clear()
+            self._close_channel()
             
             log.info("進程已停止")
             return {"status": "success", "message": "Process stopped successfully"}
@@ -88,13 +115,19 @@ class ProcessManager:
 
     def update(self):
         if self.process and self.process.is_alive():
-            self.shared_state['update_requested'] = True
+            if not self.channel or not self.channel.send_control({"action": "update"}):
+                return {"status": "error", "message": "Failed to send update request"}
             log.info("更新請求已發送")
             return {"status": "success", "message": "Update request sent"}
         else:
             log.info("進程未運行，嘗試重新啟動")
             return self.start()
 
+    def _close_channel(self):
+        if self.channel:
+            self.channel.close()
+            self.channel = None
+
     def __del__(self):
         """確保資源正確釋放"""
         try:
@@ -0,0 +1,156 @@
+import time
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.services.lib.loggingService import log
+
+_STOP = object()
+
+
+class StageStats:
+    """單一階段的處理時間統計（最近 window 筆）"""
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "errors": self.errors, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2),
+        }
+
+
+class StagedPipeline:
+    """
+    以多個階段組成的處理管線，每個階段在各自的線程中執行，階段之間以有上限的佇列連接。
+    第 N 幀在後段處理時，第 N+1 幀已可進入前段，吞吐量接近最慢階段的速度而非各階段總和。
+    每個階段只有一個工作線程且佇列為先進先出，因此同一相機的幀會依序通過每個階段。
+    階段函式回傳 None 時該筆資料不再往下傳遞；回傳 dict 時會在 'stage_seconds' 記錄各階段耗時。
+    """
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any]]], queue_size: int = 2,
+                 on_output: Optional[Callable[[Any], None]] = None, name: str = "pipeline"):
+        """
+        :param stages: [(階段名稱, 處理函式), ...]
+        :param queue_size: 階段之間的佇列上限
+        :param on_output: 最後一個階段完成後的回呼函式（在最後一個階段的線程中呼叫）
+        :param name: 線程名稱前綴
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_output = on_output
+        self.name = name
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._stats: Dict[str, StageStats] = {stage_name: StageStats() for stage_name, _ in stages}
+        self._threads: List[threading.Thread] = []
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for index, (stage_name, _) in enumerate(self.stages):
+            thread = threading.Thread(target=self._run_stage, args=(index,),
+                                      name=f"{self.name}-{stage_name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 2.0):
+        if not self._running:
+            return
+        self._running = False
+        for q in self._queues:
+            self._clear(q)
+            try:
+                q.put_nowait(_STOP)
+            except queue.Full:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    @staticmethod
+    def _clear(q: queue.Queue):
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """
+        放入第一個階段，佇列已滿時等待至多 timeout 秒。
+        :return: 是否成功放入
+        """
+        if not self._running:
+            self.start()
+        try:
+            self._queues[0].put(item, timeout=timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def _put_next(self, index: int, item: Any) -> None:
+        # 下游佇列已滿時等待（背壓），停止時放棄
+        while self._running:
+            try:
+                self._queues[index].put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run_stage(self, index: int):
+        stage_name, func = self.stages[index]
+        stats = self._stats[stage_name]
+        is_last = index == len(self.stages) - 1
+        while self._running:
+            try:
+                item = self._queues[index].get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                break
+
+            start_time = time.perf_counter()
+            try:
+                result = func(item)
+            except Exception as e:
+                stats.errors += 1
+                log.error(f"管線階段 {stage_name} 發生錯誤: {str(e)}")
+                continue
+            elapsed = time.perf_counter() - start_time
+            stats.record(elapsed)
+
+            if result is None:
+                continue
+            if isinstance(result, dict):
+                # 記錄該筆資料在各階段的耗時，供呼叫端估算單幀成本
+                result.setdefault('stage_seconds', {})[stage_name] = elapsed
+            if not is_last:
+                self._put_next(index + 1, result)
+            elif self.on_output:
+                try:
+                    self.on_output(result)
+                except Exception as e:
+                    log.error(f"管線輸出處理發生錯誤: {str(e)}")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各階段的處理時間統計與佇列長度"""
+        summary = {}
+        for (stage_name, _), q in zip(self.stages, self._queues):
+            summary[stage_name] = dict(self._stats[stage_name].summary(), queue=q.qsize())
+        return summary
@@ -14,11 +14,11 @@ class Sam:
         self.model = FastSAM(ckpt)
         
     @time_logger
-    def detect(self, image: np.ndarray, ori_point: list=[0,0]):
+    def detect(self, image: np.ndarray, ori_point: list=[0,0], imgsz: int=None):
         everything_results = self.model(image, 
                                         device=self.device,
                                         retina_masks=self.retina_masks,
-                                        imgsz=self.imgsz,
+                                        imgsz=imgsz or self.imgsz,
                                         conf=self.conf,
                                         iou=self.iou
                                         )
@@ -1,3 +1,4 @@
+import threading
 import numpy as np
 from ultralytics import SAM
 
@@ -5,12 +6,15 @@ from ultralytics import SAM
 class MobileSAM:
     def __init__(self, ckpt, **kwargs):
         self.model = SAM(ckpt)
+        # 分析線程（預取）與二次檢查工作線程會共用同一個模型
+        self._lock = threading.Lock()
         
     def detect(self, image: np.ndarray, bbox: list[int], label: list[int]):
         x1, y1, x2, y2 = bbox
         mask1 = None
         
-        results = self.model.predict(image, bboxes=bbox, labels=label)
+        with self._lock:
+            results = self.model.predict(image, bboxes=bbox, labels=label)
         for r in results:
             masks = r.masks.data
             for mask in masks:
@@ -18,5 +22,28 @@ class MobileSAM:
                 mask = (mask*255).astype('uint8')
                 mask1 = mask[y1:y2, x1:x2]
         return mask1    
+
+    def detect_batch(self, image: np.ndarray, bboxes: list[list[int]]):
+        """
+        以同一張影像對多個 bbox 提示進行分割，影像編碼器只執行一次。
+        :param image: 輸入影像
+        :param bboxes: bbox 列表，每個格式為 [x1, y1, x2, y2]
+        :return: 與 bboxes 順序對應的遮罩列表（裁切至各自的 bbox），失敗的項目為 None
+        """
+        if not bboxes:
+            return []
+        bboxes = [[int(v) for v in bbox] for bbox in bboxes]
+        crops = [None] * len(bboxes)
+
+        with self._lock:
+            results = self.model.predict(image, bboxes=bboxes, labels=[1] * len(bboxes))
+        for r in results:
+            if r.masks is None:
+                continue
+            masks = r.masks.data.cpu().numpy()
+            for i, mask in enumerate(masks[:len(bboxes)]):
+                x1, y1, x2, y2 = bboxes[i]
+                crops[i] = (mask[y1:y2, x1:x2] * 255).astype('uint8')
+        return crops
                             
                 
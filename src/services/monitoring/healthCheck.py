@@ -29,7 +29,7 @@ class HealthChecker:
                 status[name] = "not_initialized"
             else:
                 try:
-                    if hasattr(manager, 'process') and manager.process and manager.process.is_alive():
+                    if hasattr(manager, 'is_alive') and manager.is_alive():
                         status[name] = "running"
                     else:
                         status[name] = "stopped"
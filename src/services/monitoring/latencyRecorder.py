@@ -0,0 +1,159 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from src.config.config import LATENCY_ENABLED, LATENCY_SAMPLE_RATE
+
+# 巢狀呼叫（例如 detect 內的 Sam.detect、ReID.detect）沒有相機參數時，沿用外層設定的相機 ID
+current_camera: contextvars.ContextVar = contextvars.ContextVar('current_camera', default=None)
+
+
+def _bucket_bounds() -> List[int]:
+    """直方圖的區間上界（奈秒），20µs 到約 60 秒，每個區間約增加 25%"""
+    bounds, bound = [], 20_000
+    while bound < 60_000_000_000:
+        bounds.append(int(bound))
+        bound *= 1.25
+    return bounds
+
+
+BUCKET_BOUNDS_NS = _bucket_bounds()
+
+
+class LatencyHistogram:
+    """
+    固定區間的延遲直方圖，記錄一筆只需一次二分搜尋與幾個整數加法，
+    百分位數以區間上界估計（誤差在 25% 以內）。
+    """
+    __slots__ = ('counts', 'count', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns: int) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_NS, elapsed_ns)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile(self, q: float) -> int:
+        """估計第 q (0~1) 百分位數（奈秒）"""
+        if self.count == 0:
+            return 0
+        target, seen = q * self.count, 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return BUCKET_BOUNDS_NS[index] if index < len(BUCKET_BOUNDS_NS) else self.max_ns
+        return self.max_ns
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ns / self.count / 1e6, 3) if self.count else 0.0,
+            "p50_ms": round(min(self.percentile(0.5), self.max_ns) / 1e6, 3),
+            "p95_ms": round(min(self.percentile(0.95), self.max_ns) / 1e6, 3),
+            "p99_ms": round(min(self.percentile(0.99), self.max_ns) / 1e6, 3),
+            "max_ms": round(self.max_ns / 1e6, 3),
+        }
+
+
+class LatencyRecorder:
+    """
+    各處理階段、各相機的延遲直方圖。
+    以 perf_counter_ns 計時，不輸出到終端機；sample_rate 小於 1 時只記錄部分呼叫以降低額外負擔，
+    停用時 measure / time_logger 只多一次布林判斷。
+    """
+    def __init__(self, enabled: bool = LATENCY_ENABLED, sample_rate: float = LATENCY_SAMPLE_RATE):
+        """
+        :param enabled: 是否記錄
+        :param sample_rate: 取樣比例 (0~1)
+        """
+        self._histograms: Dict[Tuple[str, Optional[str]], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._sample_every = 1
+
+    @property
+    def sample_rate(self) -> float:
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, value: float) -> None:
+        self._sample_rate = min(max(float(value), 0.0), 1.0)
+        # 以固定間隔取樣，不需要亂數
+        self._sample_every = int(round(1.0 / self._sample_rate)) if self._sample_rate > 0 else 0
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+
+    def should_sample(self) -> bool:
+        if not self.enabled or self._sample_every == 0:
+            return False
+        if self._sample_every == 1:
+            return True
+        self._counter += 1
+        return self._counter % self._sample_every == 0
+
+    def record(self, stage: str, elapsed_ns: int, camera_id: Optional[str] = None) -> None:
+        key = (stage, camera_id)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(elapsed_ns)
+
+    @contextmanager
+    def measure(self, stage: str, camera_id: Optional[str] = None):
+        """以 with 區塊計時"""
+        if not self.should_sample():
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter_ns() - start, camera_id or current_camera.get())
+
+    def snapshot(self, stage: Optional[str] = None, camera_id: Optional[str] = None) -> Dict[str, Dict[str, dict]]:
+        """
+        各階段、各相機的延遲摘要 {stage: {camera_id: summary}}，沒有相機的呼叫以 "-" 表示。
+        :param stage: 只回傳指定階段
+        :param camera_id: 只回傳指定相機
+        """
+        with self._lock:
+            items = list(self._histograms.items())
+        result: Dict[str, Dict[str, dict]] = {}
+        for (stage_name, camera), histogram in items:
+            if (stage and stage_name != stage) or (camera_id and camera != camera_id):
+                continue
+            result.setdefault(stage_name, {})[camera or '-'] = histogram.summary()
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+_recorder: Optional[LatencyRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_latency_recorder() -> LatencyRecorder:
+    """取得目前進程共用的延遲紀錄器"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = LatencyRecorder()
+        return _recorder
@@ -0,0 +1,163 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+PREFIX = 'smart_retail'
+
+Labels = Dict[str, str]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if value is None:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricFamily:
+    """同名指標的一組樣本（對應 Prometheus 的一個 # HELP / # TYPE 區塊）"""
+    def __init__(self, name: str, type: str, help: str):
+        self.name = f"{PREFIX}_{name}"
+        self.type = type
+        self.help = help
+        self.samples: List[Tuple[str, Labels, Any]] = []
+
+    def add(self, value: Any, suffix: str = '', **labels) -> 'MetricFamily':
+        if value is not None:
+            self.samples.append((suffix, labels, value))
+        return self
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples:
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items() if val is not None)
+            name = self.name + suffix
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """依名稱收集 MetricFamily，最後輸出成 Prometheus 文字格式"""
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+
+    def family(self, name: str, type: str, help: str) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(name, type, help)
+        return family
+
+    def gauge(self, name: str, help: str) -> MetricFamily:
+        return self.family(name, 'gauge', help)
+
+    def counter(self, name: str, help: str) -> MetricFamily:
+        return self.family(name, 'counter', help)
+
+    def render(self) -> str:
+        lines = []
+        for family in self._families.values():
+            if family.samples:
+                lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+def add_latency(registry: MetricsRegistry, snapshot: Optional[Dict[str, Dict[str, dict]]], **labels) -> None:
+    """LatencyRecorder.snapshot() -> summary 指標（秒）"""
+    family = registry.family('stage_latency_seconds', 'summary', '各處理階段（模型推論、追蹤、規則）的延遲')
+    for stage, cameras in (snapshot or {}).items():
+        for camera_id, summary in cameras.items():
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                family.add(summary[key] / 1000.0, stage=stage, camera=camera_id, quantile=quantile, **labels)
+            family.add(summary['avg_ms'] * summary['count'] / 1000.0, suffix='_sum', stage=stage, camera=camera_id, **labels)
+            family.add(summary['count'], suffix='_count', stage=stage, camera=camera_id, **labels)
+
+
+def add_notification(registry: MetricsRegistry, metrics: Optional[Dict[str, Any]], **labels) -> None:
+    """NotificationClient.metrics() -> 通報佇列與暫存區的積壓"""
+    if not metrics:
+        return
+    registry.gauge('notification_queue_depth', '通報客戶端記憶體佇列中待送的事件數').add(
+        metrics.get('queue_depth'), **labels)
+    registry.gauge('notification_outbox_backlog', '通報暫存區(outbox)中尚未送達的事件數').add(
+        metrics.get('backlog_size'), **labels)
+    registry.gauge('notification_outbox_oldest_seconds', '通報暫存區中最舊事件的等待秒數').add(
+        metrics.get('backlog_age_seconds'), **labels)
+    counters = registry.counter('notification_events_total', '通報事件累計數量（依結果分類）')
+    for key, value in metrics.items():
+        if key not in ('queue_depth', 'backlog_size', 'backlog_age_seconds') and isinstance(value, (int, float)) and not isinstance(value, bool):
+            counters.add(value, result=key, **labels)
+
+
+def add_shard(registry: MetricsRegistry, metrics: Dict[str, Any], **labels) -> None:
+    """偵測子進程透過 IPC 回報的監控數據"""
+    registry.counter('frames_analyzed_total', '已分析的影格數').add(metrics.get('frames'), **labels)
+    registry.counter('analysis_errors_total', '分析失敗的次數').add(metrics.get('errors'), **labels)
+    registry.gauge('analysis_queue_depth', '等待分析的影格佇列長度').add(metrics.get('queue_size'), **labels)
+    registry.gauge('shard_cameras', '分片負責的相機數量').add(metrics.get('cameras'), **labels)
+    registry.counter('ipc_messages_total', '子進程送往 API 進程的訊息數').add(metrics.get('ipc_sent'), **labels)
+    registry.counter('ipc_dropped_total', '子進程因佇列已滿而丟棄的訊息數').add(metrics.get('ipc_dropped'), **labels)
+
+    for camera_id, stats in (metrics.get('capture') or {}).items():
+        registry.counter('camera_frames_captured_total', '相機擷取的影格數（以 rate() 計算擷取 FPS）').add(
+            stats.get('frames'), camera=camera_id, **labels)
+        registry.counter('camera_frames_dropped_total', '相機緩衝區已滿而丟棄的影格數').add(
+            stats.get('dropped'), camera=camera_id, **labels)
+        registry.counter('camera_read_errors_total', '相機讀取失敗次數').add(
+            stats.get('read_errors'), camera=camera_id, **labels)
+        registry.gauge('camera_buffer_depth', '相機緩衝區目前的影格數').add(
+            stats.get('buffered'), camera=camera_id, **labels)
+        registry.gauge('camera_frame_delay_seconds', '相機最新影像距今的秒數').add(
+            stats.get('delay'), camera=camera_id, **labels)
+
+    for camera_id, stats in (metrics.get('governor') or {}).items():
+        registry.gauge('camera_target_fps', '分析 FPS 排程器分配的目標 FPS').add(
+            stats.get('target_fps'), camera=camera_id, **labels)
+        registry.gauge('camera_activity', '相機近期活動程度 (0~1)').add(
+            stats.get('activity'), camera=camera_id, **labels)
+        registry.counter('camera_frames_skipped_total', '排程略過（未分析）的影格數').add(
+            stats.get('skipped'), camera=camera_id, **labels)
+
+    for stage, stats in (metrics.get('pipeline') or {}).items():
+        registry.gauge('pipeline_queue_depth', '處理管線各階段的佇列長度').add(
+            stats.get('queue'), stage=stage, **labels)
+        registry.counter('pipeline_stage_errors_total', '處理管線各階段的錯誤數').add(
+            stats.get('errors'), stage=stage, **labels)
+
+    for camera_id, stats in (metrics.get('tracker') or {}).items():
+        for key, value in stats.items():
+            registry.gauge('tracked_items', '各相機追蹤中的物件數量').add(value, camera=camera_id, kind=key, **labels)
+
+    second_check = metrics.get('second_check') or {}
+    if second_check:
+        registry.gauge('second_check_pending', '二次檢查工作池等待中的工作數').add(second_check.get('pending'), **labels)
+        registry.counter('second_check_rejected_total', '二次檢查工作池已滿而延後至下一幀的提交次數').add(
+            second_check.get('rejected'), **labels)
+
+    recording = metrics.get('recording') or {}
+    for camera_id, stats in (recording.get('cameras') or {}).items():
+        registry.gauge('recording_pending_frames', '錄影背景線程待處理的影格數（錄影延遲）').add(
+            stats.get('pending'), camera=camera_id, **labels)
+        registry.counter('recording_dropped_frames_total', '錄影佇列已滿而丟棄的影格數').add(
+            stats.get('dropped'), camera=camera_id, **labels)
+        registry.gauge('recording_preroll_bytes', '預錄緩衝區的位元組數').add(
+            stats.get('bytes'), camera=camera_id, **labels)
+    writer = recording.get('writer') or {}
+    if writer:
+        registry.gauge('clip_writer_open_clips', '正在寫入的事件影片數').add(writer.get('clips_open'), **labels)
+        registry.counter('clip_writer_frames_written_total', '事件影片已寫入的影格數').add(
+            writer.get('frames_written'), **labels)
+        registry.counter('clip_writer_frames_dropped_total', '事件影片佇列已滿而丟棄的影格數').add(
+            writer.get('frames_dropped'), **labels)
+        registry.gauge('clip_writer_max_queue_depth', '事件影片佇列的最大深度').add(
+            writer.get('max_queue_depth'), **labels)
+        registry.gauge('clip_writer_encode_seconds', '事件影片單張影格的平均編碼秒數').add(
+            writer.get('avg_encode_ms', 0.0) / 1000.0, **labels)
+
+    add_latency(registry, metrics.get('latency'), **labels)
+    add_notification(registry, metrics.get('notification'), **labels)
@@ -0,0 +1,377 @@
+import time
+import queue
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from src.services.lib.loggingService import log
+from src.config.config import NotificationENDPOINT, NOTIFY_CONNECT_TIMEOUT, NOTIFY_READ_TIMEOUT, NOTIFY_QUEUE_SIZE, \
+    NOTIFY_BATCH_WINDOW, NOTIFY_MAX_BATCH, NOTIFY_MAX_RETRIES, NOTIFY_BACKOFF_BASE, NOTIFY_BACKOFF_MAX, NOTIFY_POOL_SIZE, \
+    NOTIFY_OUTBOX_ENABLED
+from src.services.notification.outbox import NotificationOutbox
+
+
+@dataclass
+class NotificationEvent:
+    path: str
+    payload: Dict[str, Any]
+    coalesce_key: Optional[Hashable] = None
+    created_at: float = field(default_factory=time.time)
+
+
+class NotificationClient:
+    """
+    通報服務的 HTTP 客戶端。
+    呼叫端只把事件放進有上限的佇列，由背景線程透過保持連線的 Session 送出；
+    短時間內的連續事件會被合併成一批，相同 coalesce_key 且內容與上一筆相同的重複事件只送出一次，
+    狀態變化（例如 OCCUPIED 後接著 VACANT）則依序全部送出，
+    送出失敗時依指數退避重試。
+    指定 outbox 時，事件先寫入本地暫存區再依序補送，通報服務中斷期間的事件不會遺失；
+    記憶體佇列已滿時的事件由溢出線程寫入暫存區，呼叫端不會等待 SQLite。
+    """
+    def __init__(self, endpoint: str = NotificationENDPOINT,
+                 connect_timeout: float = NOTIFY_CONNECT_TIMEOUT,
+                 read_timeout: float = NOTIFY_READ_TIMEOUT,
+                 max_queue: int = NOTIFY_QUEUE_SIZE,
+                 batch_window: float = NOTIFY_BATCH_WINDOW,
+                 max_batch: int = NOTIFY_MAX_BATCH,
+                 max_retries: int = NOTIFY_MAX_RETRIES,
+                 backoff_base: float = NOTIFY_BACKOFF_BASE,
+                 backoff_max: float = NOTIFY_BACKOFF_MAX,
+                 pool_size: int = NOTIFY_POOL_SIZE,
+                 outbox: Optional[NotificationOutbox] = None):
+        """
+        :param endpoint: 通報服務位址，例如 '192.168.1.99:18080' 或 'http://127.0.0.1:8000'
+        :param connect_timeout: 連線逾時秒數
+        :param read_timeout: 讀取逾時秒數
+        :param max_queue: 待送事件佇列上限
+        :param batch_window: 合併事件的等待時間（秒）
+        :param max_batch: 每批最多事件數
+        :param max_retries: 單一事件的最大重試次數
+        :param backoff_base: 退避的起始秒數
+        :param backoff_max: 退避的最大秒數
+        :param pool_size: 連線池大小
+        :param outbox: 本地暫存區，未指定時事件只保存在記憶體
+        """
+        self.base_url = endpoint if endpoint.startswith(("http://", "https://")) else f"http://{endpoint}"
+        self.timeout = (connect_timeout, read_timeout)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.outbox = outbox
+        self._replay_attempt = 0
+        self._next_replay = 0.0
+        self._has_backlog = outbox is not None  # 啟動時先檢查上次未送達的事件
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._queue: "queue.Queue[NotificationEvent]" = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stats = {"sent": 0, "failed": 0, "dropped": 0, "coalesced": 0, "retries": 0, "spilled": 0}
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="notification-client", daemon=True)
+        self._thread.start()
+
+        # 記憶體佇列已滿時的溢出事件由獨立線程寫入暫存區，呼叫端不執行 SQLite 寫入
+        self._spill_queue: "queue.Queue[NotificationEvent]" = queue.Queue(maxsize=max_queue)
+        self._spill_idle = threading.Event()
+        self._spill_idle.set()
+        self._spill_thread = None
+        if outbox is not None:
+            self._spill_thread = threading.Thread(target=self._run_spill, name="notification-spill", daemon=True)
+            self._spill_thread.start()
+
+    # ------------------------------------------------------------------ 對外介面
+    def notify(self, path: str, payload: Dict[str, Any], coalesce_key: Optional[Hashable] = None) -> bool:
+        """
+        將事件放入待送佇列，不會阻塞呼叫端。
+        :param path: API 路徑，例如 '/experience-event'
+        :param payload: JSON 內容
+        :param coalesce_key: 合併鍵值，同一批內相同鍵值且內容與上一筆相同的事件不重複送出
+        :return: 是否成功放入佇列
+        """
+        event = NotificationEvent(path=path, payload=payload, coalesce_key=coalesce_key)
+        try:
+            self._idle.clear()
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            if self.outbox is not None:
+                # 記憶體佇列已滿時交給溢出線程寫入暫存區，避免事件遺失
+                try:
+                    self._spill_idle.clear()
+                    self._spill_queue.put_nowait(event)
+                    self._count("spilled")
+                    return True
+                except queue.Full:
+                    pass
+            self._count("dropped")
+            log.error(f"通報佇列已滿，捨棄事件: {path} {payload}")
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待佇列中的事件全部處理完成"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._queue.empty() and self._idle.is_set() and self._spill_queue.empty() and self._spill_idle.is_set() \
+                    and self._outbox_empty():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止背景線程（會先嘗試送出已在佇列中的事件）"""
+        self.flush(timeout=timeout)
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+        if self._spill_thread is not None:
+            self._spill_thread.join(timeout=timeout)
+        if self.outbox is not None:
+            try:
+                self.outbox.release()
+            except Exception as e:
+                log.error(f"釋放通報暫存區租約失敗: {str(e)}")
+        self.session.close()
+
+    def metrics(self) -> Dict[str, int]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        if self.outbox is not None:
+            try:
+                stats.update(self.outbox.backlog())
+            except Exception as e:
+                log.error(f"讀取通報暫存區狀態失敗: {str(e)}")
+        return stats
+
+    def _outbox_empty(self) -> bool:
+        if self.outbox is None:
+            return True
+        try:
+            return self.outbox.backlog()['backlog_size'] == 0
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------ 背景處理
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def _collect_batch(self, timeout: float = 0.1) -> List[NotificationEvent]:
+        """取出第一筆事件後，在 batch_window 內繼續收集，並合併相同鍵值且狀態相同的連續事件"""
+        first = self._queue.get(timeout=timeout)
+        events = [first]
+        deadline = time.time() + self.batch_window
+        while len(events) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                events.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        batch: List[NotificationEvent] = []
+        latest: Dict[Hashable, NotificationEvent] = {}
+        for event in events:
+            if event.coalesce_key is None:
+                batch.append(event)
+                continue
+            key = (event.path, event.coalesce_key)
+            previous = latest.get(key)
+            if previous is not None and previous.payload == event.payload:
+                # 與同一鍵值的上一筆狀態相同，屬於重複通報；狀態不同的事件全部依序保留
+                self._count("coalesced")
+                continue
+            latest[key] = event
+            batch.append(event)
+        return batch
+
+    def _run(self):
+        if self.outbox is not None:
+            self._run_with_outbox()
+            return
+        while not self._stop_event.is_set():
+            try:
+                batch = self._collect_batch()
+            except queue.Empty:
+                self._idle.set()
+                continue
+            for event in batch:
+                self.deliver(event)
+            if self._queue.empty():
+                self._idle.set()
+
+    def _run_with_outbox(self):
+        """先把事件寫入暫存區，再依寫入順序補送；補送失敗時等待退避時間，期間持續接收新事件"""
+        while not self._stop_event.is_set():
+            if self._has_backlog:
+                wait = min(0.1, max(0.01, self._next_replay - time.time()))
+            else:
+                wait = 0.1
+            try:
+                batch = self._collect_batch(timeout=wait)
+                self.outbox.append([(e.path, e.payload, e.created_at) for e in batch])
+                self._has_backlog = True
+            except queue.Empty:
+                pass
+            except Exception as e:
+                log.error(f"寫入通報暫存區失敗: {str(e)}")
+
+            if self._has_backlog and time.time() >= self._next_replay:
+                try:
+                    self.replay_outbox()
+                except Exception as e:
+                    log.error(f"補送通報事件時發生錯誤: {str(e)}")
+                    self._schedule_retry()
+            if self._queue.empty():
+                self._idle.set()
+
+    def _run_spill(self):
+        """將溢出的事件分批寫入暫存區，由送出線程依序補送"""
+        while not (self._stop_event.is_set() and self._spill_queue.empty()):
+            try:
+                events = [self._spill_queue.get(timeout=0.1)]
+            except queue.Empty:
+                self._spill_idle.set()
+                continue
+            while len(events) < self.max_batch:
+                try:
+                    events.append(self._spill_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.outbox.append([(e.path, e.payload, e.created_at) for e in events])
+                self._has_backlog = True
+            except Exception as e:
+                self._count("dropped", len(events))
+                log.error(f"寫入通報暫存區失敗，捨棄 {len(events)} 筆溢出事件: {str(e)}")
+            if self._spill_queue.empty():
+                self._spill_idle.set()
+
+    def _schedule_retry(self):
+        self._next_replay = time.time() + self._backoff(self._replay_attempt)
+        self._replay_attempt = min(self._replay_attempt + 1, 16)
+        self._count("retries")
+
+    def replay_outbox(self) -> int:
+        """
+        取得暫存區租約後依序補送事件，遇到無法送達的事件即停止以維持順序，結束時釋放租約。
+        :return: 本次送達的事件數
+        """
+        delivered = 0
+        records = self.outbox.claim(limit=self.max_batch)
+        if records is None:
+            # 同一服務的其他分片正在補送，稍後再確認租約
+            self._next_replay = time.time() + min(1.0, self.outbox.lease)
+            return delivered
+        if not records:
+            self._has_backlog = False
+            return delivered
+        for record in records:
+            if self._stop_event.is_set():
+                break
+            event = NotificationEvent(path=record.path, payload=self.outbox.decode_payload(record),
+                                      created_at=record.created_at)
+            status, error = self._post(event)
+            if status == "sent":
+                self.outbox.ack(record.id)
+                delivered += 1
+                self._replay_attempt = 0
+            elif status == "rejected":
+                # 通報服務明確拒絕的事件無法靠重送解決，移出暫存區避免阻塞後續事件
+                log.error(f"通報事件被拒絕，移出暫存區: {record.path} {record.payload} ({error})")
+                self.outbox.ack(record.id)
+                self._count("failed")
+            else:
+                self.outbox.record_failure(record.id, error)
+                self._schedule_retry()
+                break
+        self.outbox.release()
+        return delivered
+
+    def _post(self, event: NotificationEvent) -> Tuple[str, str]:
+        """
+        送出單一事件一次。
+        :return: (狀態, 錯誤訊息)，狀態為 sent / rejected / retry
+        """
+        url = f"{self.base_url}{event.path}"
+        try:
+            response = self.session.post(url, json=event.payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            log.warning(f"Error sending notification {event.path}: {str(e)}")
+            return "retry", str(e)
+        if 200 <= response.status_code < 300:
+            self._count("sent")
+            log.info(f"Notification sent: {event.path} {event.payload}")
+            return "sent", ""
+        if response.status_code < 500 and response.status_code != 429:
+            # 用戶端錯誤重試也不會成功
+            log.error(f"Failed to send notification {event.path}: status code {response.status_code}")
+            return "rejected", f"status code {response.status_code}"
+        log.warning(f"Notification {event.path} got status code {response.status_code}, retrying")
+        return "retry", f"status code {response.status_code}"
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def deliver(self, event: NotificationEvent) -> bool:
+        """
+        以重試與指數退避送出單一事件。
+        :return: 是否送出成功
+        """
+        for attempt in range(self.max_retries + 1):
+            status, _ = self._post(event)
+            if status == "sent":
+                return True
+            if status == "rejected":
+                break
+            if attempt < self.max_retries:
+                self._count("retries")
+                if self._stop_event.wait(self._backoff(attempt)):
+                    break
+        self._count("failed")
+        return False
+
+
+_client: Optional[NotificationClient] = None
+_client_lock = threading.Lock()
+
+
+def get_notification_client(channel: str = "default") -> NotificationClient:
+    """
+    取得目前進程共用的通報客戶端。
+    :param channel: 暫存區的服務名稱，只在第一次建立客戶端時生效；服務啟動時先以自身名稱呼叫，
+                    即可在重啟後立即補送上次未送達的事件
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            outbox = NotificationOutbox(channel=channel) if NOTIFY_OUTBOX_ENABLED else None
+            _client = NotificationClient(outbox=outbox)
+        return _client
+
+
+def peek_notification_client() -> Optional[NotificationClient]:
+    """取得已建立的通報客戶端，尚未建立時回傳 None（不會建立新的客戶端）"""
+    with _client_lock:
+        return _client
+
+
+def shutdown_notification_client(timeout: float = 5.0) -> None:
+    """送出剩餘事件並關閉共用的通報客戶端"""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.stop(timeout=timeout)
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+from peewee import fn
+from src.config.config import NOTIFY_OUTBOX_LEASE
+from src.config.database import outbox_db
+from src.models.OutboxEvent import OutboxEvent
+
+
+class NotificationOutbox:
+    """
+    通報事件的本地暫存區（append-only）。
+    事件依寫入順序（自增 id）保存在 SQLite，送達後才刪除，進程重啟後仍可繼續補送。
+    每個服務以 channel 區分，只補送自己寫入的事件。
+    同一服務的多個分片共用同一個 channel，補送前須以 claim() 在單一交易中取得租約，
+    同時只有一個分片補送，事件不會被重複送出，也維持寫入順序。
+    """
+    def __init__(self, channel: str, lease: float = NOTIFY_OUTBOX_LEASE, owner: Optional[str] = None):
+        """
+        :param channel: 服務名稱
+        :param lease: 補送租約秒數，持有者異常結束時租約到期後由其他進程接手
+        :param owner: 租約持有者名稱，預設為進程 ID
+        """
+        self.channel = channel
+        self.lease = lease
+        self.owner = owner if owner is not None else str(os.getpid())
+        self._lock = threading.Lock()
+        with outbox_db.connection_context():
+            outbox_db.create_tables([OutboxEvent], safe=True)
+
+    def append(self, events: List[Tuple[str, dict, float]]) -> None:
+        """
+        在單一交易中寫入多筆事件。
+        :param events: [(path, payload, created_at), ...]
+        """
+        if not events:
+            return
+        rows = [
+            {
+                'channel': self.channel,
+                'path': path,
+                'payload': json.dumps(payload, ensure_ascii=False),
+                'created_at': created_at,
+            }
+            for path, payload, created_at in events
+        ]
+        with self._lock, outbox_db.atomic():
+            OutboxEvent.insert_many(rows).execute()
+
+    def peek(self, limit: int = 50) -> List[OutboxEvent]:
+        """依寫入順序取出最早的未送達事件（唯讀，不取得租約）"""
+        with self._lock:
+            return list(
+                OutboxEvent.select()
+                .where(OutboxEvent.channel == self.channel)
+                .order_by(OutboxEvent.id)
+                .limit(limit)
+            )
+
+    def claim(self, limit: int = 50) -> Optional[List[OutboxEvent]]:
+        """
+        在單一交易（IMMEDIATE 鎖）中取得最早的未送達事件與其租約。
+        :return: 取得租約的事件；其他進程持有未到期的租約時回傳 None
+        """
+        now = time.time()
+        with self._lock, outbox_db.atomic(lock_type='IMMEDIATE'):
+            leased_elsewhere = (
+                OutboxEvent.select()
+                .where((OutboxEvent.channel == self.channel) &
+                       (OutboxEvent.lease_until > now) &
+                       (OutboxEvent.claimed_by != self.owner))
+                .exists()
+            )
+            if leased_elsewhere:
+                return None
+            records = list(
+                OutboxEvent.select()
+                .where(OutboxEvent.channel == self.channel)
+                .order_by(OutboxEvent.id)
+                .limit(limit)
+            )
+            if records:
+                OutboxEvent.update(claimed_by=self.owner, lease_until=now + self.lease) \
+                    .where(OutboxEvent.id.in_([record.id for record in records])).execute()
+            return records
+
+    def release(self) -> None:
+        """釋放本進程持有的租約，讓其他進程可以立即補送"""
+        with self._lock:
+            OutboxEvent.update(claimed_by=None, lease_until=0.0) \
+                .where((OutboxEvent.channel == self.channel) & (OutboxEvent.claimed_by == self.owner)).execute()
+
+    def ack(self, event_id: int) -> None:
+        """事件已送達，自暫存區移除"""
+        with self._lock:
+            OutboxEvent.delete().where(OutboxEvent.id == event_id).execute()
+
+    def record_failure(self, event_id: int, error: str) -> None:
+        with self._lock:
+            OutboxEvent.update(
+                attempts=OutboxEvent.attempts + 1,
+                last_error=error[:255]
+            ).where(OutboxEvent.id == event_id).execute()
+
+    def backlog(self) -> Dict[str, float]:
+        """回傳暫存區的積壓數量與最舊事件的等待秒數"""
+        with self._lock:
+            count, oldest = (
+                OutboxEvent.select(fn.COUNT(OutboxEvent.id), fn.MIN(OutboxEvent.created_at))
+                .where(OutboxEvent.channel == self.channel)
+                .scalar(as_tuple=True)
+            )
+        age = time.time() - oldest if oldest else 0.0
+        return {'backlog_size': count or 0, 'backlog_age_seconds': age}
+
+    @staticmethod
+    def decode_payload(event: OutboxEvent) -> dict:
+        return json.loads(event.payload)
@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from src.services.lib.loggingService import log
+from src.config.config import DETECTION_RECORD_DIR, DETECTION_RECORD_CHUNK
+
+FORMAT_VERSION = 1
+
+
+@dataclass
+class RecordedFrame:
+    """一幀錄製的偵測/追蹤結果，groups 為 {群組名稱: [{"category", "id", "score", "bbox"}, ...]}"""
+    camera_id: str
+    timestamp: float
+    groups: Dict[str, List[dict]] = field(default_factory=dict)
+    extra: Any = None
+
+
+class DetectionRecorder:
+    """
+    將每一幀模型推論與追蹤後的結果（不含影像）連同時間戳錄製成 .npz 檔，
+    之後可由 DetectionLog 讀回，交給 RuleReplayer 以模擬時鐘重播規則引擎，不需要模型權重。
+    偵測結果以欄位陣列保存（框座標、分數、ID、類別索引），每幀的額外參數（ROI 設定、關注商品）
+    以 JSON 保存且相同內容只存一次；累積 chunk_frames 幀即寫出一個檔案。
+    """
+    def __init__(self, area: str, output_dir: str = DETECTION_RECORD_DIR, chunk_frames: int = DETECTION_RECORD_CHUNK):
+        """
+        :param area: 區域類型 sales / experience，寫入檔名與檔案資訊
+        :param output_dir: 輸出目錄
+        :param chunk_frames: 每個檔案的最大幀數
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.area = area
+        self.output_dir = output_dir
+        self.chunk_frames = max(1, int(chunk_frames))
+        self.prefix = f"{area}_{os.getpid()}_{time.strftime('%Y%m%d-%H%M%S')}"
+        self.files: List[str] = []
+        self._lock = threading.Lock()
+        self._chunk = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._cameras: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+        self._groups: Dict[str, int] = {}
+        self._extras: Dict[str, int] = {}
+        self._last_extra: tuple = (None, -1)
+        self._timestamps: List[float] = []
+        self._frame_cameras: List[int] = []
+        self._frame_extras: List[int] = []
+        self._offsets: List[int] = [0]
+        self._rows: List[tuple] = []
+
+    @staticmethod
+    def _index(table: Dict[str, int], key: str) -> int:
+        index = table.get(key)
+        if index is None:
+            index = table[key] = len(table)
+        return index
+
+    def _extra_index(self, extra: Any) -> int:
+        if extra is None:
+            return -1
+        # 同一份設定物件（例如未變動的 ROIs_info）不重複序列化
+        if extra is self._last_extra[0]:
+            return self._last_extra[1]
+        index = self._index(self._extras, json.dumps(extra, sort_keys=True, ensure_ascii=False))
+        self._last_extra = (extra, index)
+        return index
+
+    def record(self, camera_id: str, timestamp: float, groups: Dict[str, Sequence[dict]], extra: Any = None) -> None:
+        """
+        錄製一幀。
+        :param camera_id: 相機 ID
+        :param timestamp: 影格時間戳
+        :param groups: {群組名稱: 偵測結果列表}
+        :param extra: 規則引擎需要的其他參數，需可轉成 JSON
+        """
+        with self._lock:
+            self._timestamps.append(float(timestamp))
+            self._frame_cameras.append(self._index(self._cameras, camera_id))
+            self._frame_extras.append(self._extra_index(extra))
+            for group, detections in groups.items():
+                group_index = self._index(self._groups, group)
+                for detection in detections:
+                    detection_id = detection.get('id')
+                    self._rows.append((group_index,
+                                       self._index(self._categories, str(detection.get('category'))),
+                                       -1 if detection_id is None else int(detection_id),
+                                       float(detection.get('score') or 0.0),
+                                       detection['bbox']))
+            self._offsets.append(len(self._rows))
+            if len(self._timestamps) >= self.chunk_frames:
+                self._write()
+
+    def _write(self) -> Optional[str]:
+        if not self._timestamps:
+            return None
+        path = os.path.join(self.output_dir, f"{self.prefix}_{self._chunk:04d}.npz")
+        rows = self._rows
+        meta = {
+            "version": FORMAT_VERSION,
+            "area": self.area,
+            "cameras": list(self._cameras),
+            "categories": list(self._categories),
+            "groups": list(self._groups),
+            "extras": [json.loads(value) for value in self._extras],
+        }
+        np.savez_compressed(
+            path,
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+            timestamps=np.asarray(self._timestamps, dtype=np.float64),
+            frame_cameras=np.asarray(self._frame_cameras, dtype=np.int32),
+            frame_extras=np.asarray(self._frame_extras, dtype=np.int32),
+            offsets=np.asarray(self._offsets, dtype=np.int64),
+            groups=np.asarray([row[0] for row in rows], dtype=np.int16),
+            categories=np.asarray([row[1] for row in rows], dtype=np.int16),
+            ids=np.asarray([row[2] for row in rows], dtype=np.int64),
+            scores=np.asarray([row[3] for row in rows], dtype=np.float32),
+            boxes=np.asarray([row[4] for row in rows], dtype=np.float32).reshape(-1, 4),
+        )
+        log.info(f"偵測結果錄製檔已寫入: {path} ({len(self._timestamps)} 幀, {len(rows)} 筆偵測)")
+        self.files.append(path)
+        self._chunk += 1
+        self._reset()
+        return path
+
+    def flush(self) -> Optional[str]:
+        """將目前累積的幀寫成檔案，回傳檔案路徑（沒有資料時回傳 None）"""
+        with self._lock:
+            return self._write()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            log.error(f"寫入偵測結果錄製檔時發生錯誤: {str(e)}")
+
+
+class DetectionLog:
+    """
+    讀取 DetectionRecorder 錄製的 .npz 檔（可多個檔案），依時間戳排序後逐幀輸出 RecordedFrame。
+    """
+    def __init__(self, area: str, chunks: List[Dict[str, Any]]):
+        self.area = area
+        self._chunks = chunks
+        order = [(float(ts), chunk_index, frame_index)
+                 for chunk_index, chunk in enumerate(chunks)
+                 for frame_index, ts in enumerate(chunk['timestamps'])]
+        order.sort()
+        self._order = [(chunk_index, frame_index) for _, chunk_index, frame_index in order]
+
+    @classmethod
+    def load(cls, paths: Sequence[str]) -> 'DetectionLog':
+        """
+        :param paths: .npz 檔或包含 .npz 檔的目錄
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.npz')))
+            else:
+                files.append(path)
+        if not files:
+            raise FileNotFoundError(f"No detection log found in {list(paths)}")
+
+        area, chunks = None, []
+        for file in files:
+            with np.load(file, allow_pickle=False) as data:
+                chunk = {key: data[key] for key in data.files}
+            meta = json.loads(str(chunk.pop('meta')))
+            if meta.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported detection log version {meta.get('version')}: {file}")
+            if area is not None and meta['area'] != area:
+                raise ValueError(f"Cannot mix {area} and {meta['area']} detection logs: {file}")
+            area = meta['area']
+            chunk['meta'] = meta
+            # 欄位陣列先轉成 Python 型別，逐幀還原時不需要逐一轉換
+            chunk['boxes'] = chunk['boxes'].tolist()
+            for key in ('groups', 'categories', 'ids', 'scores'):
+                chunk[key] = chunk[key].tolist()
+            chunks.append(chunk)
+        return cls(area=area, chunks=chunks)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def camera_ids(self) -> List[str]:
+        return sorted({camera for chunk in self._chunks for camera in chunk['meta']['cameras']})
+
+    def duration(self) -> float:
+        """錄製涵蓋的時間長度（秒）"""
+        if not self._order:
+            return 0.0
+        first, last = self._order[0], self._order[-1]
+        return float(self._chunks[last[0]]['timestamps'][last[1]] - self._chunks[first[0]]['timestamps'][first[1]])
+
+    def frame(self, chunk_index: int, frame_index: int) -> RecordedFrame:
+        chunk = self._chunks[chunk_index]
+        meta = chunk['meta']
+        groups = {group: [] for group in meta['groups']}
+        for row in range(int(chunk['offsets'][frame_index]), int(chunk['offsets'][frame_index + 1])):
+            detection_id = chunk['ids'][row]
+            groups[meta['groups'][chunk['groups'][row]]].append({
+                "category": meta['categories'][chunk['categories'][row]],
+                "id": None if detection_id < 0 else detection_id,
+                "score": chunk['scores'][row],
+                "bbox": [int(v) for v in chunk['boxes'][row]],
+            })
+        extra_index = int(chunk['frame_extras'][frame_index])
+        return RecordedFrame(camera_id=meta['cameras'][int(chunk['frame_cameras'][frame_index])],
+                             timestamp=float(chunk['timestamps'][frame_index]),
+                             groups=groups,
+                             extra=None if extra_index < 0 else meta['extras'][extra_index])
+
+    def __iter__(self) -> Iterator[RecordedFrame]:
+        for chunk_index, frame_index in self._order:
+            yield self.frame(chunk_index, frame_index)
@@ -0,0 +1,146 @@
+import time
+from functools import partial
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+from src.services.utils.clock import SimulatedClock
+from src.services.replay.detectionLog import RecordedFrame
+from src.services.track.areaInteractionMonitor import AreaInteractionMonitor
+from src.services.detect.salesAreaDetection import SalesAreaDetection
+from src.services.detect.experienceAreaDetection import ExperienceAreaDetection
+from src.services.detect.experienceArea.chair_manager import ChairStateEvent
+
+
+@dataclass
+class ReplayEvent:
+    """重播過程中規則引擎產生的通報事件"""
+    timestamp: float
+    camera_id: str
+    kind: str
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+class ReplayAreaMonitor(AreaInteractionMonitor):
+    """
+    重播用的 ROI 互動監控：沒有影像與 MobileSAM，丟失的二次檢查直接採用 assume_missing，
+    通報不送往通報服務而是記錄成 ReplayEvent。
+    """
+    def __init__(self, *args, events: List[ReplayEvent], assume_missing: bool=True, **kwargs):
+        """
+        :param events: 通報事件寫入的列表
+        :param assume_missing: 二次檢查的結果（沒有影像可比對）
+        """
+        super().__init__(*args, **kwargs)
+        self.events = events
+        self.assume_missing = assume_missing
+
+    def second_check_batch(self, current_frame, obj_bboxes: list, origin_frame=None, origin_version: int=None):
+        return [{"bbox": bbox, "ssim": None, "mask_similarity": None, "missing": self.assume_missing}
+                for bbox in obj_bboxes]
+
+    def notify_external_api(self, camera_id: str, area_id: str):
+        self.events.append(ReplayEvent(timestamp=self.clock.now(), camera_id=camera_id, kind='promotion',
+                                       detail={'area_id': area_id}))
+
+
+class ReplaySalesAreaDetection(SalesAreaDetection):
+    """不載入模型的促銷區偵測，直接以錄製的 ReID 追蹤結果執行物件追蹤、ROI 互動與丟失判定"""
+    def __init__(self, clock: SimulatedClock, assume_missing: bool=True):
+        """
+        :param clock: 重播使用的模擬時鐘
+        :param assume_missing: 二次檢查的結果（沒有影像可比對）
+        """
+        self.events: List[ReplayEvent] = []
+        self.monitor_class = partial(ReplayAreaMonitor, events=self.events, assume_missing=assume_missing)
+        super().__init__(load_models=False, async_second_check=False, clock=clock)
+        self.visual_enabled = False
+
+    def replay_frame(self, frame: RecordedFrame) -> None:
+        camera_context = self.get_camera_context(cameraId=frame.camera_id)
+        changed_rois = camera_context.update_rois(ROIs_info=frame.extra or [])
+        job = {
+            'cameraId': frame.camera_id,
+            'image': None,
+            'timestamp': frame.timestamp,
+            'ROIs_info': frame.extra,
+            'ROIs': camera_context.roi_info_dict,
+            'compiled_rois': camera_context.compiled_rois,
+            'changed_rois': changed_rois,
+        }
+        job = self.apply_tracking(job, frame.groups.get('objects', []))
+        self.rules_stage(job, record_mode=False)
+
+
+class ReplayExperienceAreaDetection(ExperienceAreaDetection):
+    """不載入模型的體驗區偵測，直接以錄製的椅子、椅墊與行人結果更新椅子狀態"""
+    def __init__(self, clock: SimulatedClock):
+        """
+        :param clock: 重播使用的模擬時鐘
+        """
+        self.events: List[ReplayEvent] = []
+        super().__init__(load_models=False, clock=clock)
+        self.visual_enabled = False
+
+    def replay_frame(self, frame: RecordedFrame) -> None:
+        self.apply_rules(frame.camera_id,
+                         chairs=frame.groups.get('chairs', []),
+                         pillows=frame.groups.get('pillows', []),
+                         persons=frame.groups.get('persons', []),
+                         products_of_interest=frame.extra or [],
+                         timestamp=frame.timestamp)
+
+    def _notify_state_change(self, event: ChairStateEvent):
+        self.events.append(ReplayEvent(timestamp=event.timestamp, camera_id=event.camera_id, kind='experience',
+                                       detail={'chair_id': event.chair_id, 'chair_type': event.chair_type,
+                                               'state': event.state_change.value}))
+
+
+class RuleReplayer:
+    """
+    以模擬時鐘重播錄製的偵測結果：規則引擎以每一幀錄製的時間戳計時，
+    門檻秒數（EXPERIENCE_TIME_THRES、EXIT_THRESHOLD、NOT_EXIST_THRES 等）以錄製時間計算，
+    重播本身則以最快速度執行。模擬時鐘只注入重播用的偵測器，不影響進程中的其他元件。
+    """
+    def __init__(self, area: str, assume_missing: bool=True):
+        """
+        :param area: 區域類型 sales / experience
+        :param assume_missing: 促銷區丟失二次檢查的結果
+        """
+        self.area = area
+        self.clock = SimulatedClock()
+        self.detector = ReplaySalesAreaDetection(clock=self.clock, assume_missing=assume_missing) \
+            if area == 'sales' else ReplayExperienceAreaDetection(clock=self.clock)
+
+    @property
+    def events(self) -> List[ReplayEvent]:
+        return self.detector.events
+
+    def run(self, frames: Iterable[RecordedFrame], limit: Optional[int]=None) -> Dict[str, Any]:
+        """
+        重播所有幀並回傳統計。
+        :param frames: 錄製的幀（需依時間排序）
+        :param limit: 最多重播的幀數
+        """
+        count, first_ts, last_ts = 0, None, None
+        events_before = len(self.events)
+        start = time.perf_counter()
+        for frame in frames:
+            if limit is not None and count >= limit:
+                break
+            self.clock.set(frame.timestamp)
+            self.detector.replay_frame(frame)
+            first_ts = frame.timestamp if first_ts is None else first_ts
+            last_ts = frame.timestamp
+            count += 1
+        elapsed = time.perf_counter() - start
+        simulated = (last_ts - first_ts) if count else 0.0
+        return {
+            "frames": count,
+            "events": len(self.events) - events_before,
+            "wall_seconds": round(elapsed, 4),
+            "simulated_seconds": round(simulated, 3),
+            "fps": round(count / elapsed, 1) if elapsed > 0 else 0.0,
+            "speedup": round(simulated / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def close(self) -> None:
+        self.detector.close()
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+from src.services.lib.loggingService import log
+from src.services.streaming.resultDelta import ResultDeltaEncoder
+from src.config.config import STREAM_QUEUE_SIZE
+
+
+class Subscription:
+    """
+    單一訂閱者的待送佇列。
+    佇列已滿時不會等待，而是丟棄尚未送出的差異並改送目前的完整快照，
+    慢速客戶端只會漏掉中間狀態，不會拖慢偵測流程或其他訂閱者。
+    """
+    def __init__(self, camera_ids: Optional[Iterable[str]] = None, maxsize: int = STREAM_QUEUE_SIZE):
+        """
+        :param camera_ids: 只接收指定相機的結果，未指定時接收全部
+        :param maxsize: 待送訊息上限
+        """
+        self.camera_ids: Optional[Set[str]] = set(camera_ids) if camera_ids else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def accepts(self, camera_id: str) -> bool:
+        return self.camera_ids is None or camera_id in self.camera_ids
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """取得下一則訊息，逾時回傳 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ResultBroadcaster:
+    """
+    將各相機的結果差異分送給所有訂閱者（WebSocket / SSE）。
+    publish 可在任何線程呼叫：訊息透過 call_soon_threadsafe 交給 API 的事件迴圈分送，
+    呼叫端不會被阻塞；沒有訂閱者時只更新差異狀態。
+    """
+    def __init__(self, encoder: ResultDeltaEncoder = None, queue_size: int = STREAM_QUEUE_SIZE):
+        """
+        :param encoder: 差異編碼器，未指定時使用預設參數建立
+        :param queue_size: 每個訂閱者的待送訊息上限
+        """
+        self.encoder = encoder or ResultDeltaEncoder()
+        self.queue_size = queue_size
+        self._subscribers: List[Subscription] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+
+    # ------------------------------------------------------------------ 訂閱
+    def subscribe(self, camera_ids: Optional[Iterable[str]] = None) -> Subscription:
+        """建立訂閱並先放入相關相機的快照，必須在事件迴圈中呼叫"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(camera_ids=camera_ids, maxsize=self.queue_size)
+        self._enqueue_snapshots(subscription)
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ------------------------------------------------------------------ 發布
+    def publish(self, camera_id: str, area: str, objects: Optional[Iterable[dict]] = None,
+                persons: Optional[Iterable[dict]] = None, chairs: Optional[Iterable[Any]] = None,
+                timestamp: Optional[float] = None) -> None:
+        """
+        發布一台相機的偵測結果（可在偵測線程中呼叫）。
+        :param camera_id: 相機 ID
+        :param area: 區域類型 (sales-area / experience-area)
+        :param objects: 物件 dict 列表
+        :param persons: 行人 dict 列表
+        :param chairs: ChairInfo 列表
+        :param timestamp: 影像時間戳
+        """
+        sections = self.encoder.sections_from(objects=objects, persons=persons, chairs=chairs)
+        self.publish_sections(camera_id, area, sections, timestamp=timestamp)
+
+    def publish_sections(self, camera_id: str, area: str, sections: Dict[str, Dict[str, Any]],
+                         timestamp: Optional[float] = None) -> None:
+        """發布已轉換為區塊格式的結果"""
+        message = self.encoder.encode(camera_id, area, sections, timestamp=timestamp)
+        if message is None or not self._subscribers or self._loop is None:
+            return
+        self.published += 1
+        try:
+            if self._in_loop_thread():
+                self._fanout(message)
+            else:
+                self._loop.call_soon_threadsafe(self._fanout, message)
+        except RuntimeError:
+            # 事件迴圈已關閉
+            self._loop = None
+
+    def publish_result(self, result: Dict[str, Any]) -> None:
+        """發布偵測子進程經由通道送來的結果（decode_result 的輸出）"""
+        self.publish_sections(result['camera_id'], result['area'], result['sections'],
+                              timestamp=result.get('timestamp'))
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _fanout(self, message: Dict[str, Any]) -> None:
+        camera_id = message["camera_id"]
+        for subscription in list(self._subscribers):
+            if not subscription.accepts(camera_id):
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._resync(subscription)
+
+    def _resync(self, subscription: Subscription) -> None:
+        """丟棄訂閱者尚未送出的訊息，改放入目前狀態的快照"""
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+            subscription.dropped += 1
+        log.warning(f"結果串流訂閱者處理過慢，已丟棄 {subscription.dropped} 則訊息並改送快照")
+        self._enqueue_snapshots(subscription)
+
+    def _enqueue_snapshots(self, subscription: Subscription) -> None:
+        for camera_id in self.encoder.camera_ids():
+            if not subscription.accepts(camera_id):
+                continue
+            snapshot = self.encoder.snapshot(camera_id)
+            if snapshot is None:
+                continue
+            try:
+                subscription.queue.put_nowait(snapshot)
+            except asyncio.QueueFull:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in self._subscribers),
+            "cameras": len(self.encoder.camera_ids()),
+        }
+
+
+_broadcaster: Optional[ResultBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_result_broadcaster() -> ResultBroadcaster:
+    """取得目前進程共用的結果分送器"""
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = ResultBroadcaster()
+        return _broadcaster
@@ -0,0 +1,118 @@
+import time
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from src.config.config import STREAM_BBOX_TOLERANCE
+
+
+def _compact_bbox(bbox) -> List[int]:
+    return [int(v) for v in bbox[:4]]
+
+
+def _item_key(item: dict, index: int) -> str:
+    """以追蹤 ID 作為鍵值，未追蹤（沒有 id）的項目以負數索引區分"""
+    item_id = item.get("id")
+    return str(-(index + 1) if item_id is None else item_id)
+
+
+class ResultDeltaEncoder:
+    """
+    將每台相機的偵測結果轉為精簡的差異訊息。
+    只送出新增、移除或變動的物件／行人／椅子；bbox 變動小於 tolerance 的抖動不會送出。
+    每台相機維護遞增的 seq，快照 (snapshot) 與差異 (delta) 共用同一序號，
+    客戶端收到快照後可忽略 seq 不大於快照的差異。
+    """
+    SECTIONS = ("objects", "persons", "chairs")
+
+    def __init__(self, tolerance: int = STREAM_BBOX_TOLERANCE):
+        """
+        :param tolerance: bbox 座標的變動容忍值（像素）
+        """
+        self.tolerance = tolerance
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _changed(self, section: str, old, new) -> bool:
+        if section == "chairs":
+            if old["state"] != new["state"] or old["type"] != new["type"]:
+                return True
+            old, new = old["bbox"], new["bbox"]
+        return any(abs(a - b) > self.tolerance for a, b in zip(old, new))
+
+    def _diff_section(self, section: str, old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        upsert = {key: value for key, value in new.items()
+                  if key not in old or self._changed(section, old[key], value)}
+        remove = [key for key in old if key not in new]
+        diff = {}
+        if upsert:
+            diff["upsert"] = upsert
+        if remove:
+            diff["remove"] = remove
+        return diff
+
+    @staticmethod
+    def sections_from(objects: Optional[Iterable[dict]] = None,
+                      persons: Optional[Iterable[dict]] = None,
+                      chairs: Optional[Iterable[Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        將偵測結果轉為 {區塊: {id: 精簡內容}}。
+        :param objects: 物件 dict 列表（含 'id' 與 'bbox'）
+        :param persons: 行人 dict 列表（含 'id' 與 'bbox'）
+        :param chairs: ChairInfo 列表
+        """
+        sections = {}
+        if objects is not None:
+            sections["objects"] = {_item_key(o, i): _compact_bbox(o["bbox"]) for i, o in enumerate(objects)}
+        if persons is not None:
+            sections["persons"] = {_item_key(p, i): _compact_bbox(p["bbox"]) for i, p in enumerate(persons)}
+        if chairs is not None:
+            sections["chairs"] = {
+                str(c.chair_id): {"state": c.state, "type": c.type, "bbox": _compact_bbox(c.position)}
+                for c in chairs
+            }
+        return sections
+
+    def encode(self, camera_id: str, area: str, sections: Dict[str, Dict[str, Any]],
+               timestamp: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        更新相機狀態並回傳差異訊息，沒有任何變動時回傳 None。
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            state = self._states.setdefault(camera_id, {"area": area, "seq": 0, "ts": timestamp})
+            message = {"type": "delta", "camera_id": camera_id, "area": area}
+            for section, new in sections.items():
+                old = state.get(section, {})
+                diff = self._diff_section(section, old, new)
+                if diff:
+                    message[section] = diff
+                    # 未送出的微小抖動保留上次送出的值，避免客戶端狀態逐漸偏移
+                    upsert = diff.get("upsert", {})
+                    state[section] = {key: upsert.get(key, old.get(key)) for key in new}
+            state["ts"] = timestamp
+            if len(message) == 3:
+                return None
+            state["seq"] += 1
+            message["seq"] = state["seq"]
+            message["ts"] = round(timestamp, 3)
+            return message
+
+    def snapshot(self, camera_id: str) -> Optional[Dict[str, Any]]:
+        """回傳相機目前的完整狀態"""
+        with self._lock:
+            state = self._states.get(camera_id)
+            if state is None:
+                return None
+            message = {"type": "snapshot", "camera_id": camera_id, "area": state["area"],
+                       "seq": state["seq"], "ts": round(state["ts"], 3)}
+            for section in self.SECTIONS:
+                if section in state:
+                    message[section] = dict(state[section])
+            return message
+
+    def camera_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._states)
+
+    def reset(self, camera_id: str) -> None:
+        with self._lock:
+            self._states.pop(camera_id, None)
@@ -1,16 +1,32 @@
-import time
-import requests
 import numpy as np  
 from src.utils.utils import utils
+from src.services.utils.clock import Clock, get_clock
 from src.services.lib.loggingService import log
-from src.config.config import NotificationENDPOINT, EXIT_THRESHOLD, CHECK_DURATION, NOT_EXIST_THRES, SSIM_THRESHOLD, MASK_SIMILARITY_THRESHOLD
-from skimage.metrics import structural_similarity as ssim
+from src.config.config import NotificationENDPOINT, EXIT_THRESHOLD, CHECK_DURATION, NOT_EXIST_THRES, \
+    ORIGIN_FRAME_REFRESH_INTERVAL, MASK_CACHE_PREFETCH, MAX_NOTIFICATIONS, ROI_MIN_INSIDE_RATIO
+from src.services.track.maskCache import MaskCache
+from src.services.track.regionVerifier import RegionVerifier
+from src.services.track.secondCheckWorker import SecondCheckWorker
+from src.services.utils.changeDetector import ChangeDetector
+from src.services.notification.notificationClient import get_notification_client
 
 class AreaInteractionMonitor:
-    def __init__(self, area_bbox, mobilesam_model, exit_threshold: int=EXIT_THRESHOLD, check_duration: int=CHECK_DURATION):
+    def __init__(self, area_bbox, mobilesam_model, exit_threshold: int=EXIT_THRESHOLD, check_duration: int=CHECK_DURATION,
+                 area_key: str=None, mask_cache: MaskCache=None,
+                 origin_refresh_interval: float=ORIGIN_FRAME_REFRESH_INTERVAL, prefetch_masks: bool=MASK_CACHE_PREFETCH,
+                 second_check_worker: SecondCheckWorker=None, compiled_roi=None,
+                 min_inside_ratio: float=ROI_MIN_INSIDE_RATIO, clock: Clock=None):
         """
         :param area_bbox: 定义的区域边界框，格式为 [x1, y1, x2, y2]
         :param check_duration: 检查物品消失的时间窗口
+        :param area_key: 區域鍵值，作為遮罩快取的鍵值之一
+        :param mask_cache: 原始幀遮罩快取，未指定時建立區域專屬的快取
+        :param origin_refresh_interval: 區域無人時更新原始幀的最小間隔秒數
+        :param prefetch_masks: 是否在區域無人時預先計算原始幀遮罩
+        :param second_check_worker: 二次檢查背景工作池，未指定時在呼叫線程同步執行
+        :param compiled_roi: 已編譯的 ROI 多邊形 (CompiledROI)，指定時以多邊形過濾互動
+        :param min_inside_ratio: 交集區域落在多邊形內的最小比例
+        :param clock: 呼叫端未提供影格時間戳時使用的時鐘，預設為進程共用的時鐘
         """
         self.area_bbox = area_bbox
         self.exit_threshold = exit_threshold
@@ -19,9 +35,24 @@ class AreaInteractionMonitor:
         self.person_data = {}
         self.objects_dict = {}
         self.last_check_time = None
+        self.check_deferred = False  # 二次檢查因工作池已滿而延後，下一幀重新提交
+        self.pending_ids = set()  # 已提交背景二次檢查、尚未取回結果的物件 ID（只在分析線程讀寫）
         self.active_intersections = []
         self.origin_frame = None
+        self.origin_frame_version = 0  # 原始幀版本，每次更新原始幀時遞增
+        self.origin_frame_time = None
+        self.origin_refresh_interval = origin_refresh_interval
+        self.change_detector = ChangeDetector()  # 區域畫面沒有變化時沿用原始幀，遮罩快取不會失效
+        self._area_box = tuple(int(v) for v in area_bbox)
+        self.area_key = area_key if area_key is not None else id(self)
+        self.mask_cache = mask_cache if mask_cache is not None else MaskCache()
+        self.prefetch_masks = prefetch_masks
+        self.verifier = RegionVerifier()
+        self.second_check_worker = second_check_worker
+        self.compiled_roi = compiled_roi
+        self.min_inside_ratio = min_inside_ratio
         self.mobilesam_model = mobilesam_model
+        self.clock = clock if clock is not None else get_clock()
         self.notification_count = 0  # 新增：通知計數器    
     
     def process_person(self, persons: list):
@@ -31,6 +62,10 @@ class AreaInteractionMonitor:
             person_bbox = person['bbox']
         
             intersection = self.get_intersection(self.area_bbox, person_bbox)
+            if intersection and self.compiled_roi is not None and \
+                    self.compiled_roi.fraction_inside(intersection) < self.min_inside_ratio:
+                # 交集主要落在多邊形外（例如斜向貨架的外接框角落），不視為互動
+                intersection = None
             if intersection:
                 visited = True
                 self.active_intersections.append(intersection)
@@ -48,72 +83,154 @@ class AreaInteractionMonitor:
                     self.person_data[person_id]['exit_timer'] = None
                 
             person.update({"visited": visited})
-        print(self.person_data, '==============123')
         return [person_info['max_area_bbox'] for person_info in self.person_data.values()]
 
-    def monitor_area_interaction(self, persons: list, current_frame: np.ndarray):
+    def monitor_area_interaction(self, persons: list, current_frame: np.ndarray, current_time: float=None):
+        """
+        :param current_time: 影格時間戳，未提供時使用時鐘的時間
+        """
+        current_time = self.clock.now() if current_time is None else current_time
         if self.person_data:
             current_persons_dict = {person['id']: person['visited'] for person in persons}
             for person_id, info in self.person_data.items():
                 if not current_persons_dict.get(person_id):
                     if info['exit_timer'] is None:
-                        info['exit_timer'] = time.time()
-                    elif time.time()-info['exit_timer']>self.exit_threshold:
+                        info['exit_timer'] = current_time
+                    elif current_time-info['exit_timer']>self.exit_threshold:
                         info['in_area'] = False
                         
             if not any(data['in_area'] for data in self.person_data.values()):
                 if self.last_check_time is None:
                     # print("start========================"); time.sleep(1)
-                    self.last_check_time = time.time()
+                    self.last_check_time = current_time
         else:
-            self.origin_frame = current_frame   
-            # print("更新origin_frame")
+            self.refresh_origin_frame(current_frame, current_time=current_time)
+
+    def refresh_origin_frame(self, current_frame: np.ndarray, current_time: float=None):
+        """
+        區域無人時更新原始幀。
+        區域畫面與目前的原始幀相比沒有變化時沿用原始幀（版本與遮罩快取不變）；
+        有變化時才更新原始幀並遞增版本，舊版本的遮罩自快取中移除；若啟用預取，則趁區域閒置時計算遮罩。
+        """
+        current_time = self.clock.now() if current_time is None else current_time
+        if (self.origin_frame is not None and self.origin_frame_time is not None
+                and current_time - self.origin_frame_time < self.origin_refresh_interval):
+            return
+
+        crop = None
+        if current_frame is not None:
+            x1, y1, x2, y2 = self._area_box
+            crop = current_frame[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)]
+            if crop.size == 0:
+                crop = None
+        if self.origin_frame is not None and crop is not None and \
+                not self.change_detector.has_changed(self._area_box, crop):
+            self.origin_frame_time = current_time
+            return
+
+        if crop is not None:
+            self.change_detector.set_reference(self._area_box, crop)
+        self.origin_frame = current_frame
+        self.origin_frame_time = current_time
+        self.origin_frame_version += 1
+        self.mask_cache.invalidate(self.area_key, keep_version=self.origin_frame_version)
+        if self.prefetch_masks:
+            self.prefetch_origin_masks()
+
+    def prefetch_origin_masks(self):
+        """預先計算區域內所有物件在原始幀上的遮罩"""
+        if self.origin_frame is None or self.mobilesam_model is None:
+            return
+        bboxes = [
+            info.get('object').get('bbox') for info in self.objects_dict.values()
+            if utils.calculate_iou(info.get('object').get('bbox'), self.area_bbox) > 0
+        ]
+        self.get_origin_masks(bboxes)
+
+    def get_origin_masks(self, obj_bboxes: list, origin_frame=None, version: int=None):
+        """
+        批次取得多個物件在原始幀上的遮罩，快取未命中的項目以一次 MobileSAM 推論補齊。
+        :param obj_bboxes: 物件邊界框列表
+        :param origin_frame: 原始幀快照，未指定時使用目前的原始幀
+        :param version: 原始幀快照的版本，需與 origin_frame 一併指定
+        :return: 與 obj_bboxes 順序對應的遮罩列表
+        """
+        if origin_frame is None:
+            origin_frame, version = self.origin_frame, self.origin_frame_version
+        bboxes = [[int(v) for v in bbox] for bbox in obj_bboxes]
+        masks = [self.mask_cache.get(self.area_key, version, bbox) for bbox in bboxes]
+        missing = [i for i, mask in enumerate(masks) if mask is None]
+        if missing:
+            computed = self.mobilesam_model.detect_batch(origin_frame, [bboxes[i] for i in missing])
+            for i, mask in zip(missing, computed):
+                masks[i] = mask
+                self.mask_cache.put(self.area_key, version, bboxes[i], mask)
+        return masks
             
     def update_objects(self, camera_id, area_id, current_frame, current_time, objects_dict):
         self.objects_dict = objects_dict
-        if self.last_check_time:
-            print(f'=================計時秒數為：{current_time - self.last_check_time}')
         if self.last_check_time and (current_time - self.last_check_time > self.check_duration):
             self.notification_count = 0  # 重置通知計數器
             # 检查物品丢失
             missing_detected = self.check_missing_objects(current_time=current_time, camera_id=camera_id, area_id=area_id, current_frame=current_frame)
+            if self.check_deferred:
+                # 工作池已滿：保留本輪的互動狀態，下一幀重新提交二次檢查
+                return False
             self.reset_monitoring()
             return missing_detected
         return False
 
-    def second_check(self, current_frame, obj_bbox):
+    def second_check_batch(self, current_frame, obj_bboxes: list, origin_frame=None, origin_version: int=None):
         """
-        二次檢查機制：使用 SSIM 和 MobileSAM 檢查是否為誤報。
+        批次二次檢查：當前幀只編碼一次，一併解碼所有候選物件的遮罩。
         :param current_frame: 當前幀圖像
-        :param obj_bbox: 物件的邊界框 [x1, y1, x2, y2]
-        :return: 是否為真實丟失（True: 丟失，False: 誤報）
+        :param obj_bboxes: 候選物件的邊界框列表 [[x1, y1, x2, y2], ...]
+        :param origin_frame: 原始幀快照，未指定時使用目前的原始幀
+        :param origin_version: 原始幀快照的版本
+        :return: 與 obj_bboxes 順序對應的結果列表，每個結果包含 bbox、ssim、mask_similarity 與 missing
         """
-        if self.origin_frame is None:
+        if origin_frame is None:
+            origin_frame, origin_version = self.origin_frame, self.origin_frame_version
+        if origin_frame is None:
             log.warning("Origin frame is not set. Skipping second check.")
-            return False
+            return [{"bbox": bbox, "ssim": None, "mask_similarity": None, "missing": False} for bbox in obj_bboxes]
+        if not obj_bboxes:
+            return []
 
-        # 提取 ROI 區域
-        x1, y1, x2, y2 = map(int, obj_bbox)
-        origin_roi = self.origin_frame[y1:y2, x1:x2]
-        current_roi = current_frame[y1:y2, x1:x2]
-
-        # 計算 SSIM
-        ssim_score, _ = ssim(origin_roi, current_roi, full=True, channel_axis=-1)
-        log.info(f"SSIM score: {ssim_score}")
-
-        # 使用 MobileSAM 計算 Mask 相似度
-        origin_mask = self.mobilesam_model.detect(self.origin_frame, bbox=[x1, y1, x2, y2], label=[1])
-        current_mask = self.mobilesam_model.detect(current_frame, bbox=[x1, y1, x2, y2], label=[1])
-        mask_similarity = utils.compare_masks(origin_mask, current_mask)
-        log.info(f"Mask similarity: {mask_similarity}")
-
-        # 判定是否為真實丟失
-        if ssim_score < SSIM_THRESHOLD or mask_similarity < MASK_SIMILARITY_THRESHOLD:
-            log.info("Object confirmed as missing.")
-            return True
-        
-        log.info("Object misdetection confirmed.")
-        return False
+        bboxes = [[int(v) for v in bbox] for bbox in obj_bboxes]
+        origin_crops = [origin_frame[y1:y2, x1:x2] for x1, y1, x2, y2 in bboxes]
+        current_crops = [current_frame[y1:y2, x1:x2] for x1, y1, x2, y2 in bboxes]
+
+        # 先以 SSIM 篩選，已確定丟失的物件不需要再計算遮罩
+        ssim_scores = [self.verifier.crop_ssim(o, c) for o, c in zip(origin_crops, current_crops)]
+        verdicts = [None] * len(bboxes)
+        pending = []
+        for i, ssim_score in enumerate(ssim_scores):
+            if self.verifier.is_decided_by_ssim(ssim_score):
+                verdicts[i] = self.verifier.verify(origin_crops[i], current_crops[i], ssim_score=ssim_score)
+            else:
+                pending.append(i)
+
+        if pending:
+            pending_bboxes = [bboxes[i] for i in pending]
+            origin_masks = self.get_origin_masks(pending_bboxes, origin_frame=origin_frame, version=origin_version)
+            current_masks = self.mobilesam_model.detect_batch(current_frame, pending_bboxes)
+            for i, origin_mask, current_mask in zip(pending, origin_masks, current_masks):
+                verdicts[i] = self.verifier.verify(origin_crops[i], current_crops[i],
+                                                   masks=(origin_mask, current_mask),
+                                                   ssim_score=ssim_scores[i])
+
+        results = []
+        for bbox, verdict in zip(bboxes, verdicts):
+            log.info(f"bbox {bbox} SSIM score: {verdict.ssim}, Mask similarity: {verdict.mask_similarity}, "
+                     f"missing: {verdict.missing}")
+            results.append({
+                "bbox": bbox,
+                "ssim": verdict.ssim,
+                "mask_similarity": verdict.mask_similarity,
+                "missing": verdict.missing
+            })
+        return results
 
     def check_missing_objects(self, camera_id, area_id, current_time, current_frame):
         """
@@ -123,12 +240,11 @@ class AreaInteractionMonitor:
         :param area_id: 区域ID
         :return: 是否检测到物品丢失
         """
-        missing_detected = False
+        self.check_deferred = False
+        candidates = []
         for id, info in self.objects_dict.items():
-            if self.notification_count >= 3:  # 限制每次最多通知三次
-                log.info(f"Notification limit reached for Camera {camera_id}, Area {area_id}.")
-                break
-            
+            if info.get('notified') is not None or id in self.pending_ids:
+                continue
             object_bbox = info.get('object').get('bbox')
             last_time = info.get('time')
             # 检查物品是否在任何人的最大交互区域内
@@ -136,16 +252,65 @@ class AreaInteractionMonitor:
                 utils.calculate_iou(object_bbox, person_info['max_area_bbox']) > 0
                 for person_info in self.person_data.values()
             )
-            if is_in_interaction_area:
-                if current_time - last_time > self.not_exist_thres:
-                    if self.second_check(current_frame, object_bbox) and info.get('notified') is None:     
-                        print(f"{camera_id} 區域{area_id}的商品{id}被拿走了！！")
-                        self.notify_external_api(camera_id, area_id)
-                        # time.sleep(5)
-                        info.update({'notified': True})
-                        self.notification_count += 1  # 增加通知計數器
-                        missing_detected = True
-                        
+            if is_in_interaction_area and current_time - last_time > self.not_exist_thres:
+                candidates.append((id, info))
+
+        if not candidates:
+            return False
+
+        if self.second_check_worker is not None:
+            return self.submit_missing_check(camera_id, area_id, candidates, current_frame)
+        results = self.second_check_batch(current_frame, [info.get('object').get('bbox') for _, info in candidates])
+        return self.apply_check_results(camera_id, area_id, candidates, [result['missing'] for result in results])
+
+    def submit_missing_check(self, camera_id, area_id, candidates, current_frame):
+        """
+        將候選物件的二次檢查交給背景工作池，工作持有當前幀與原始幀的快照。
+        工作線程只計算判定結果，通報與狀態更新由分析線程在 SecondCheckWorker.drain_completed() 取回後
+        以 apply_check_results() 執行，因此本次一律回傳 False。
+        工作池已滿時設定 check_deferred，update_objects 不重置監控狀態，下一幀重新提交。
+        """
+        frame_snapshot = current_frame.copy()
+        origin_frame, origin_version = self.origin_frame, self.origin_frame_version
+        bboxes = [info.get('object').get('bbox') for _, info in candidates]
+
+        def job():
+            try:
+                results = self.second_check_batch(frame_snapshot, bboxes,
+                                                  origin_frame=origin_frame, origin_version=origin_version)
+                missing = [result['missing'] for result in results]
+            except Exception as e:
+                log.error(f"{camera_id} 區域{area_id}二次檢查失敗: {str(e)}")
+                missing = [False] * len(candidates)
+            self.second_check_worker.report_completed((self, camera_id, area_id, candidates, missing))
+
+        if not self.second_check_worker.submit(job):
+            self.check_deferred = True
+            return False
+        self.pending_ids.update(id for id, _ in candidates)
+        return False
+
+    def apply_check_results(self, camera_id, area_id, candidates, missing: list) -> bool:
+        """
+        套用二次檢查的判定結果（在分析線程執行）：確認丟失者通知外部API並標記為已通報，
+        每一輪監控最多通報 MAX_NOTIFICATIONS 次。
+        :param candidates: [(物件ID, 物件資訊), ...]
+        :param missing: 與 candidates 順序對應的判定結果
+        :return: 是否確認有物品丟失
+        """
+        missing_detected = False
+        for (id, info), is_missing in zip(candidates, missing):
+            self.pending_ids.discard(id)
+            if not is_missing:
+                continue
+            if self.notification_count >= MAX_NOTIFICATIONS:  # 限制每輪最多通知次數
+                log.info(f"Notification limit reached for Camera {camera_id}, Area {area_id}.")
+                continue
+            log.info(f"{camera_id} 區域{area_id}的商品{id}被拿走了！！")
+            self.notify_external_api(camera_id, area_id)
+            info.update({'notified': True})
+            self.notification_count += 1  # 增加通知計數器
+            missing_detected = True
         return missing_detected
 
     def reset_monitoring(self):
@@ -153,32 +318,21 @@ class AreaInteractionMonitor:
         self.active_intersections.clear()
         self.last_check_time = None
         # self.objects_dict.clear()
-        print('==========================清除資料')
 
     def notify_external_api(self, camera_id: str, area_id: str):
         """
         访问外部API通报『促销区』的商品数量有减少。
         """
         if not NotificationENDPOINT:
-            print("Notification endpoint is not set.")
+            log.warning("Notification endpoint is not set.")
             return
 
         payload = {
             'camera_id': camera_id,
             'area_id': area_id,
         }
-        api_url = f"http://{NotificationENDPOINT}/promotion-event"
-
-        try:
-            response = requests.post(api_url, json=payload)
-
-            if response.status_code == 200:
-                print(f"Notification sent successfully for camera {camera_id} and area_id {area_id}")
-            else:
-                print(f"Failed to send notification for camera {camera_id} and area_id {area_id}")
-
-        except Exception as e:
-            print(f"Error sending notification: {e}")
+        if not get_notification_client().notify(path="/promotion-event", payload=payload):
+            log.error(f"Failed to queue notification for camera {camera_id} and area_id {area_id}")
             
     def get_intersection(self, roi, person_bbox):
         """
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+import numpy as np
+
+
+class MaskCache:
+    """
+    MobileSAM 遮罩快取。
+    以 (區域鍵值, 原始幀版本, bbox) 作為鍵值，保存原始幀 (origin_frame) 上計算過的遮罩，
+    讓二次檢查在決策時只需計算當前幀的遮罩。
+    """
+    def __init__(self, max_entries: int = 256):
+        """
+        :param max_entries: 快取最多保存的遮罩數量，超過時淘汰最久未使用的項目
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, int, Tuple[int, int, int, int]], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(area_key: Hashable, version: int, bbox: list):
+        x1, y1, x2, y2 = map(int, bbox)
+        return (area_key, version, (x1, y1, x2, y2))
+
+    def get(self, area_key: Hashable, version: int, bbox: list) -> Optional[np.ndarray]:
+        key = self.make_key(area_key, version, bbox)
+        with self._lock:
+            mask = self._entries.get(key)
+            if mask is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return mask
+
+    def put(self, area_key: Hashable, version: int, bbox: list, mask: np.ndarray) -> None:
+        if mask is None:
+            return
+        key = self.make_key(area_key, version, bbox)
+        with self._lock:
+            self._entries[key] = mask
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def contains(self, area_key: Hashable, version: int, bbox: list) -> bool:
+        with self._lock:
+            return self.make_key(area_key, version, bbox) in self._entries
+
+    def invalidate(self, area_key: Hashable, keep_version: Optional[int] = None) -> int:
+        """
+        移除指定區域的遮罩。
+        :param area_key: 區域鍵值
+        :param keep_version: 若指定，保留該版本的遮罩，只移除其他版本
+        :return: 移除的項目數量
+        """
+        with self._lock:
+            stale_keys = [
+                key for key in self._entries
+                if key[0] == area_key and (keep_version is None or key[1] != keep_version)
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+        return len(stale_keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
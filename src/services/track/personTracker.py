@@ -1,16 +1,19 @@
-import time
+from src.services.utils.clock import Clock, get_clock
 from src.utils.utils import utils
 
 class PersonAreaTracker:
-    def __init__(self, area_bbox, exit_threshold: int=5):
+    def __init__(self, area_bbox, exit_threshold: int=5, clock: Clock=None):
         """
         :param area_bbox: 定义的区域边界框，格式为 [x1, y1, x2, y2]
+        :param clock: 呼叫端未提供影格時間戳時使用的時鐘，預設為進程共用的時鐘
         """
+        self.clock = clock if clock is not None else get_clock()
         self.area_bbox = area_bbox
         self.exit_threshold = exit_threshold
         self.person_data = {}  # 存储每个行人的交集数据
         
-    def process_person(self, person_id, person_bbox):
+    def process_person(self, person_id, person_bbox, current_time: float=None):
+        current_time = self.clock.now() if current_time is None else current_time
         intersection = self.get_intersection(self.area_bbox, person_bbox)
 
         if intersection:
@@ -31,8 +34,8 @@ class PersonAreaTracker:
             if person_id in self.person_data and self.person_data[person_id]['in_area']:
                 # 行人离开区域，开始计时
                 if self.person_data[person_id]['exit_timer'] is None:
-                    self.person_data[person_id]['exit_timer'] = time.time()
-                elif time.time() - self.person_data[person_id]['exit_timer'] > self.exit_threshold:
+                    self.person_data[person_id]['exit_timer'] = current_time
+                elif current_time - self.person_data[person_id]['exit_timer'] > self.exit_threshold:
                     # 超过阈值时间，标记行人离开区域
                     self.person_data[person_id]['in_area'] = False
 
@@ -0,0 +1,206 @@
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple, Union
+from src.config.config import SSIM_THRESHOLD, MASK_SIMILARITY_THRESHOLD, VERIFY_MAX_SIDE
+
+# 8-bit 查表，用於計算位元組的漢明距離
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+MaskPair = Tuple[Optional[np.ndarray], Optional[np.ndarray]]
+
+
+@dataclass
+class VerificationResult:
+    ssim: float
+    mask_similarity: Optional[float]
+    missing: bool
+    early_exit: bool = False
+    decided_by: str = ""
+
+
+class RegionVerifier:
+    """
+    商品區域二次檢查的比對引擎。
+    在縮小後的灰階裁切影像上以積分圖計算 SSIM，遮罩比對使用位元壓縮的 pHash，
+    並在任一指標已足以決定結果時提前結束，省下後續（包含 MobileSAM）計算。
+    判定規則與原本逐物件的 skimage SSIM + MobileSAM 遮罩比對相同：SSIM 或遮罩相似度低於閾值即視為丟失。
+    """
+    def __init__(self, ssim_threshold: float = SSIM_THRESHOLD,
+                 mask_threshold: float = MASK_SIMILARITY_THRESHOLD,
+                 max_side: int = VERIFY_MAX_SIDE,
+                 win_size: int = 7,
+                 early_exit: bool = True):
+        """
+        :param ssim_threshold: SSIM 相似度閾值
+        :param mask_threshold: 遮罩相似度閾值
+        :param max_side: 裁切影像縮小後的最長邊（像素），0 表示不縮小
+        :param win_size: SSIM 視窗大小（奇數）
+        :param early_exit: 是否在結果確定時提前結束
+        """
+        self.ssim_threshold = ssim_threshold
+        self.mask_threshold = mask_threshold
+        self.max_side = max_side
+        self.win_size = win_size
+        self.early_exit = early_exit
+
+    # ------------------------------------------------------------------ 前處理
+    def _target_size(self, shape) -> Optional[Tuple[int, int]]:
+        h, w = shape[:2]
+        if not self.max_side or max(h, w) <= self.max_side:
+            return None
+        scale = self.max_side / float(max(h, w))
+        return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+    def prepare_crop(self, crop: np.ndarray) -> np.ndarray:
+        """將裁切影像轉為縮小後的灰階影像"""
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        size = self._target_size(crop.shape)
+        if size is not None:
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        return crop
+
+    def prepare_mask(self, mask: np.ndarray) -> np.ndarray:
+        """將遮罩縮小並重新二值化為 0/255"""
+        size = self._target_size(mask.shape)
+        if size is not None:
+            mask = cv2.resize(mask, size, interpolation=cv2.INTER_AREA)
+        return np.where(mask > 127, 255, 0).astype(np.uint8)
+
+    # ------------------------------------------------------------------ SSIM
+    @staticmethod
+    def _box_sums(image: np.ndarray, win: int) -> np.ndarray:
+        """以積分圖計算所有完整視窗的總和（valid 模式）"""
+        integral = cv2.integral(image, sdepth=cv2.CV_64F)
+        return (integral[win:, win:] - integral[:-win, win:]
+                - integral[win:, :-win] + integral[:-win, :-win])
+
+    def ssim(self, image1: np.ndarray, image2: np.ndarray, data_range: float = 255.0) -> float:
+        """
+        積分圖版本的 SSIM，參數與 skimage.metrics.structural_similarity 的預設值一致
+        （均勻視窗、樣本共變異數、僅取完整視窗的平均）。
+        """
+        x = image1.astype(np.float64)
+        y = image2.astype(np.float64)
+        win = min(self.win_size, x.shape[0], x.shape[1])
+        if win % 2 == 0:
+            win -= 1
+        if win < 3:
+            # 區域過小無法計算結構相似度，退化為亮度差異
+            return float(1.0 - np.mean(np.abs(x - y)) / data_range)
+
+        n = win * win
+        cov_norm = n / (n - 1.0)
+        ux = self._box_sums(x, win) / n
+        uy = self._box_sums(y, win) / n
+        uxx = self._box_sums(x * x, win) / n
+        uyy = self._box_sums(y * y, win) / n
+        uxy = self._box_sums(x * y, win) / n
+        vx = cov_norm * (uxx - ux * ux)
+        vy = cov_norm * (uyy - uy * uy)
+        vxy = cov_norm * (uxy - ux * uy)
+
+        c1 = (0.01 * data_range) ** 2
+        c2 = (0.03 * data_range) ** 2
+        numerator = (2 * ux * uy + c1) * (2 * vxy + c2)
+        denominator = (ux * ux + uy * uy + c1) * (vx + vy + c2)
+        return float(np.mean(numerator / denominator))
+
+    # ------------------------------------------------------------------ 遮罩指標
+    @staticmethod
+    def mask_iou(mask1: np.ndarray, mask2: np.ndarray) -> float:
+        m1 = mask1 > 0
+        m2 = mask2 > 0
+        union = np.count_nonzero(m1 | m2)
+        if union == 0:
+            return 0.0
+        return np.count_nonzero(m1 & m2) / union
+
+    @staticmethod
+    def contour_similarity(mask1: np.ndarray, mask2: np.ndarray) -> float:
+        contours1, _ = cv2.findContours(mask1, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours2, _ = cv2.findContours(mask2, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours1) == 0 or len(contours2) == 0:
+            return 0.0
+        try:
+            similarity = cv2.matchShapes(contours1[0], contours2[0], cv2.CONTOURS_MATCH_I1, 0.0)
+        except cv2.error:
+            return 0.0
+        return max(0.0, 1.0 - similarity)
+
+    @staticmethod
+    def phash(mask: np.ndarray) -> np.ndarray:
+        """計算 64 位元的 pHash，以 8 個位元組回傳"""
+        resized = cv2.resize(mask, (32, 32), interpolation=cv2.INTER_AREA)
+        dct_low_freq = cv2.dct(np.float32(resized))[:8, :8]
+        mean_val = np.mean(dct_low_freq[1:])
+        return np.packbits((dct_low_freq > mean_val).ravel())
+
+    @staticmethod
+    def phash_similarity(hash1: np.ndarray, hash2: np.ndarray) -> float:
+        distance = int(_POPCOUNT_TABLE[np.bitwise_xor(hash1, hash2)].sum())
+        return 1.0 - distance / (hash1.size * 8)
+
+    def mask_similarity(self, mask1: np.ndarray, mask2: np.ndarray) -> Tuple[float, bool]:
+        """
+        計算 IoU、輪廓與 pHash 三項指標的平均相似度。
+        啟用提前結束時，若剩餘指標已無法改變與閾值的比較結果，直接回傳目前的估計值。
+        :return: (遮罩相似度, 是否提前結束)
+        """
+        mask1 = self.prepare_mask(mask1)
+        mask2 = self.prepare_mask(mask2)
+        metrics = (
+            lambda: self.mask_iou(mask1, mask2),
+            lambda: self.phash_similarity(self.phash(mask1), self.phash(mask2)),
+            lambda: self.contour_similarity(mask1, mask2),
+        )
+        total = 0.0
+        for done, metric in enumerate(metrics, start=1):
+            total += max(0.0, min(1.0, metric()))
+            remaining = len(metrics) - done
+            if self.early_exit and remaining:
+                upper = (total + remaining) / len(metrics)
+                lower = total / len(metrics)
+                if upper < self.mask_threshold or lower >= self.mask_threshold:
+                    return (upper if upper < self.mask_threshold else lower), True
+        return total / len(metrics), False
+
+    # ------------------------------------------------------------------ 判定
+    def crop_ssim(self, origin_crop: np.ndarray, current_crop: np.ndarray) -> float:
+        """計算兩張裁切影像在縮小灰階後的 SSIM"""
+        return self.ssim(self.prepare_crop(origin_crop), self.prepare_crop(current_crop))
+
+    def is_decided_by_ssim(self, ssim_score: float) -> bool:
+        """SSIM 是否已足以判定為丟失（僅在啟用提前結束時成立）"""
+        return self.early_exit and ssim_score < self.ssim_threshold
+
+    def verify(self, origin_crop: np.ndarray, current_crop: np.ndarray,
+               masks: Union[MaskPair, Callable[[], MaskPair], None] = None,
+               ssim_score: Optional[float] = None) -> VerificationResult:
+        """
+        比對原始幀與當前幀的商品區域。
+        :param origin_crop: 原始幀的裁切影像
+        :param current_crop: 當前幀的裁切影像
+        :param masks: (原始遮罩, 當前遮罩) 或回傳該二元組的函式；使用函式時，SSIM 已能判定結果就不會呼叫
+        :param ssim_score: 已計算過的 SSIM，未指定時重新計算
+        :return: VerificationResult
+        """
+        if ssim_score is None:
+            ssim_score = self.crop_ssim(origin_crop, current_crop)
+        if self.is_decided_by_ssim(ssim_score):
+            return VerificationResult(ssim=ssim_score, mask_similarity=None, missing=True,
+                                      early_exit=True, decided_by="ssim")
+
+        if callable(masks):
+            masks = masks()
+        origin_mask, current_mask = masks if masks is not None else (None, None)
+        if origin_mask is None or current_mask is None or origin_mask.size == 0 or current_mask.size == 0:
+            mask_score, mask_early = 0.0, False
+        else:
+            mask_score, mask_early = self.mask_similarity(origin_mask, current_mask)
+
+        missing = ssim_score < self.ssim_threshold or mask_score < self.mask_threshold
+        decided_by = "ssim" if ssim_score < self.ssim_threshold else "mask"
+        return VerificationResult(ssim=ssim_score, mask_similarity=mask_score, missing=missing,
+                                  early_exit=mask_early, decided_by=decided_by)
@@ -0,0 +1,82 @@
+import queue
+import threading
+from typing import Any, Callable, List
+from src.services.lib.loggingService import log
+from src.config.config import SECOND_CHECK_WORKERS, SECOND_CHECK_MAX_PENDING
+
+
+class SecondCheckWorker:
+    """
+    促銷區二次檢查與通報的背景工作池。
+    分析線程只負責提交持有幀快照的工作，MobileSAM 推論在工作線程中執行；
+    工作線程不修改監控狀態，只以 report_completed() 回報判定結果，
+    由分析線程透過 drain_completed() 取回後套用（通報、標記已通報、啟動錄影）。
+    """
+    def __init__(self, max_workers: int = SECOND_CHECK_WORKERS, max_pending: int = SECOND_CHECK_MAX_PENDING):
+        """
+        :param max_workers: 工作線程數量
+        :param max_pending: 等待中工作的上限，超過時拒絕提交
+        """
+        self._jobs: "queue.Queue[Callable]" = queue.Queue(maxsize=max_pending)
+        self._completed: "queue.Queue[Any]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self.rejected = 0
+        for i in range(max_workers):
+            thread = threading.Thread(target=self._run, name=f"second-check-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                job = self._jobs.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                job()
+            except Exception as e:
+                log.error(f"二次檢查工作執行錯誤: {str(e)}")
+            finally:
+                self._jobs.task_done()
+
+    def submit(self, job: Callable) -> bool:
+        """
+        提交工作，不會阻塞呼叫端。
+        :return: 是否成功提交（佇列已滿時回傳 False）
+        """
+        if self._stop_event.is_set():
+            return False
+        try:
+            self._jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            log.warning("二次檢查佇列已滿，本次檢查延後至下一幀重新提交")
+            return False
+
+    def report_completed(self, result: Any) -> None:
+        """工作線程回報一次二次檢查的判定結果"""
+        self._completed.put(result)
+
+    def drain_completed(self) -> List[Any]:
+        """取出所有已完成的判定結果"""
+        events = []
+        while True:
+            try:
+                events.append(self._completed.get_nowait())
+            except queue.Empty:
+                return events
+
+    @property
+    def pending(self) -> int:
+        return self._jobs.qsize()
+
+    def stats(self) -> dict:
+        """等待中的工作數與佇列已滿而延後的提交次數"""
+        return {'pending': self.pending, 'rejected': self.rejected}
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
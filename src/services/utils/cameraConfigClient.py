@@ -0,0 +1,145 @@
+import os
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from src.services.lib.loggingService import log
+from src.config.config import GetCameraInfoENDPOINT, CAMERA_CONFIG_CACHE_DIR, CAMERA_CONFIG_TIMEOUT
+
+
+@dataclass
+class CameraConfigDiff:
+    added: Dict[str, Any] = field(default_factory=dict)  # 新增的相機 {camera_id: info}
+    removed: List[str] = field(default_factory=list)  # 移除的相機ID
+    changed: Dict[str, Any] = field(default_factory=dict)  # 內容有變動的相機 {camera_id: 新的 info}
+    changed_rois: Dict[str, List[str]] = field(default_factory=dict)  # 每台相機新增/移除/變動的 ROI ID
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+class CameraConfigClient:
+    """
+    相機區域設定 (/camera-area) 的客戶端。
+    以 ETag / If-Modified-Since 做條件式請求，最近一次的回應存放在磁碟上，
+    服務重啟或設定服務暫時無法連線時直接使用快取；每次更新會計算與上一版的差異。
+    """
+    def __init__(self, type: str, endpoint: str = GetCameraInfoENDPOINT,
+                 cache_dir: str = CAMERA_CONFIG_CACHE_DIR, timeout: float = CAMERA_CONFIG_TIMEOUT):
+        """
+        :param type: 區域類型 (promotion / experience)
+        :param endpoint: 相機資訊服務位址
+        :param cache_dir: 快取檔案的存放位置
+        :param timeout: 請求逾時秒數
+        """
+        self.type = type
+        self.url = f"http://{endpoint}/camera-area"
+        self.timeout = timeout
+        self.cache_path = os.path.join(cache_dir, f"camera_area_{type}.json")
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._config: Optional[Dict[str, Any]] = None
+        self._load_cache()
+
+    @property
+    def config(self) -> Optional[Dict[str, Any]]:
+        """最近一次取得的設定（可能來自磁碟快取）"""
+        return self._config
+
+    def _load_cache(self) -> None:
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            self._config = cached.get('data')
+            self._etag = cached.get('etag')
+            self._last_modified = cached.get('last_modified')
+        except Exception as e:
+            log.warning(f"讀取相機設定快取失敗: {str(e)}")
+
+    def _save_cache(self) -> None:
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'etag': self._etag, 'last_modified': self._last_modified, 'data': self._config},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            log.warning(f"寫入相機設定快取失敗: {str(e)}")
+
+    def fetch(self) -> Optional[Dict[str, Any]]:
+        """
+        取得最新設定；內容未變更 (304) 或請求失敗時回傳快取的設定。
+        """
+        with self._lock:
+            headers = {}
+            if self._config is not None:
+                if self._etag:
+                    headers['If-None-Match'] = self._etag
+                if self._last_modified:
+                    headers['If-Modified-Since'] = self._last_modified
+            try:
+                response = self.session.get(self.url, params={"type": self.type}, headers=headers, timeout=self.timeout)
+                if response.status_code == 304:
+                    return self._config
+                response.raise_for_status()
+                self._config = response.json()
+                self._etag = response.headers.get('ETag')
+                self._last_modified = response.headers.get('Last-Modified')
+                self._save_cache()
+            except requests.exceptions.HTTPError as http_err:
+                log.error(f"HTTP error occurred: {http_err}")
+            except Exception as err:
+                log.error(f"An error occurred: {err}")
+                if self._config is not None:
+                    log.warning("相機資訊服務無法連線，使用快取的相機設定")
+            return self._config
+
+    def refresh(self) -> Tuple[Optional[Dict[str, Any]], CameraConfigDiff]:
+        """
+        重新取得設定並回傳 (新設定, 與上一版的差異)。
+        """
+        previous = self._config or {}
+        current = self.fetch()
+        if current is None:
+            return None, CameraConfigDiff()
+        return current, self.diff(previous, current)
+
+    @staticmethod
+    def _rois_by_id(info: Dict[str, Any]) -> Dict[str, Any]:
+        return {roi.get('id'): roi for roi in info.get('area_list', []) or []}
+
+    @classmethod
+    def diff(cls, old: Dict[str, Any], new: Dict[str, Any]) -> CameraConfigDiff:
+        """計算兩版設定間每台相機的差異"""
+        result = CameraConfigDiff()
+        for camera_id, info in new.items():
+            if camera_id not in old:
+                result.added[camera_id] = info
+                result.changed_rois[camera_id] = list(cls._rois_by_id(info))
+            elif old[camera_id] != info:
+                result.changed[camera_id] = info
+                old_rois, new_rois = cls._rois_by_id(old[camera_id]), cls._rois_by_id(info)
+                result.changed_rois[camera_id] = [
+                    roi_id for roi_id in set(old_rois) | set(new_rois)
+                    if old_rois.get(roi_id) != new_rois.get(roi_id)
+                ]
+        result.removed = [camera_id for camera_id in old if camera_id not in new]
+        return result
+
+
+_clients: Dict[str, CameraConfigClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_camera_config_client(type: str) -> CameraConfigClient:
+    """取得目前進程中指定區域類型共用的設定客戶端"""
+    with _clients_lock:
+        if type not in _clients:
+            _clients[type] = CameraConfigClient(type=type)
+        return _clients[type]
@@ -1,5 +1,4 @@
 import cv2
-import requests
 import threading
 import queue
 import time
@@ -7,7 +6,7 @@ from typing import Dict, Optional, Any
 import numpy as np
 from dataclasses import dataclass
 from src.services.lib.loggingService import log
-from src.config.config import GetCameraInfoENDPOINT
+from src.services.utils.cameraConfigClient import get_camera_config_client
 
 @dataclass
 class FrameData:
@@ -17,18 +16,8 @@ class FrameData:
     metadata: Dict[str, Any]
 
 def fetch_camera_area(type: str) -> Optional[Dict[str, Any]]:
-    """訪問 /camera-area API 並獲取對應的輸出"""
-    url = f"http://{GetCameraInfoENDPOINT}/camera-area"
-    params = {"type": type}
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        log.error(f"HTTP error occurred: {http_err}")
-    except Exception as err:
-        log.error(f"An error occurred: {err}")
-        return None
+    """訪問 /camera-area API 並獲取對應的輸出（條件式請求，失敗時使用磁碟快取）"""
+    return get_camera_config_client(type).fetch()
 
 class CameraManager:
     def __init__(self, buffer_size: int = 30):
@@ -39,7 +28,42 @@ class CameraManager:
         self._buffer_size = buffer_size
         self._lock = threading.Lock()
         self._camera_errors: Dict[str, int] = {}
+        self._capture_counts: Dict[str, Dict[str, int]] = {}  # 擷取線程累計的影格/丟棄/讀取失敗次數
         self.MAX_RETRY_ATTEMPTS = 3
+        self._passthrough_options: Optional[Dict[str, Any]] = None
+        self._passthrough_recorders: Dict[str, Any] = {}
+
+    def enable_passthrough(self, pre_seconds: float, post_seconds: float, output_dir: str, max_bytes: int) -> bool:
+        """
+        啟用不重新編碼的事件錄影：每台相機另外以 PyAV 保存原始壓縮封包。
+        :return: 是否成功啟用（未安裝 PyAV 時回傳 False）
+        """
+        from src.services.video.passthroughRecorder import PYAV_AVAILABLE
+        if not PYAV_AVAILABLE:
+            log.warning("未安裝 PyAV，事件錄影改用解碼後重新編碼的方式")
+            return False
+        self._passthrough_options = {
+            'pre_seconds': pre_seconds,
+            'post_seconds': post_seconds,
+            'output_dir': output_dir,
+            'max_bytes': max_bytes,
+        }
+        with self._lock:
+            for camera_id, stream_info in self._streams.items():
+                self._start_passthrough(camera_id, stream_info['url'])
+        return True
+
+    def _start_passthrough(self, camera_id: str, rtsp_url: str) -> None:
+        if self._passthrough_options is None or camera_id in self._passthrough_recorders:
+            return
+        from src.services.video.passthroughRecorder import PassthroughRecorder
+        recorder = PassthroughRecorder(camera_id=camera_id, rtsp_url=rtsp_url, **self._passthrough_options)
+        recorder.start()
+        self._passthrough_recorders[camera_id] = recorder
+
+    def get_passthrough_recorder(self, camera_id: str):
+        """取得相機的壓縮封包錄影器，未啟用時回傳 None"""
+        return self._passthrough_recorders.get(camera_id)
 
     def initialize_camera(self, camera_id: str, rtsp_url: str, metadata: Dict[str, Any] = None) -> bool:
         """初始化單個攝影機"""
@@ -53,6 +77,8 @@ class CameraManager:
                 }
                 self._frame_buffers[camera_id] = queue.Queue(maxsize=self._buffer_size)
                 self._camera_errors[camera_id] = 0
+                self._capture_counts[camera_id] = {'frames': 0, 'dropped': 0, 'read_errors': 0}
+                self._start_passthrough(camera_id, rtsp_url)
                 return True
             return False
 
@@ -74,6 +100,10 @@ class CameraManager:
                 del self._streams[camera_id]
                 del self._frame_buffers[camera_id]
                 del self._camera_errors[camera_id]
+                self._capture_counts.pop(camera_id, None)
+                recorder = self._passthrough_recorders.pop(camera_id, None)
+                if recorder is not None:
+                    recorder.close()
                 return True
             return False
 
@@ -122,7 +152,9 @@ class CameraManager:
                             continue
 
                     ret, frame = cap.read()
+                    counts = self._capture_counts[camera_id]
                     if not ret:
+                        counts['read_errors'] += 1
                         self._camera_errors[camera_id] += 1
                         log.warning(f"無法讀取攝影機 {camera_id} 的影像，重試次數: {self._camera_errors[camera_id]}")
                         if self._initialize_capture(camera_id):
@@ -141,11 +173,13 @@ class CameraManager:
                     if self._frame_buffers[camera_id].full():
                         try:
                             self._frame_buffers[camera_id].get_nowait()
+                            counts['dropped'] += 1
                         except queue.Empty:
                             pass
 
                     self._frame_buffers[camera_id].put_nowait(frame_data)
                     stream_info['last_frame_time'] = current_time
+                    counts['frames'] += 1
 
                 except queue.Full:
                     continue
@@ -181,6 +215,24 @@ class CameraManager:
             pass
         return None
 
+    def get_newest_frame(self, camera_id: str):
+        """
+        取出緩衝區中最新的影像，並丟棄較舊的影像。
+        :return: (最新的 FrameData 或 None, 丟棄的影像數量)
+        """
+        frame_buffer = self._frame_buffers.get(camera_id)
+        newest, discarded = None, 0
+        if frame_buffer is None:
+            return newest, discarded
+        while True:
+            try:
+                frame_data = frame_buffer.get_nowait()
+            except queue.Empty:
+                return newest, discarded
+            if newest is not None:
+                discarded += 1
+            newest = frame_data
+
     def get_frame_delay(self, camera_id: str) -> float:
         """獲取當前影像延遲時間（秒）"""
         with self._lock:
@@ -206,4 +258,21 @@ class CameraManager:
                     'last_frame_delay': self.get_frame_delay(camera_id),
                     'metadata': self._streams[camera_id]['metadata']
                 }
-        return {}
\ No newline at end of file
+        return {}
+
+    def capture_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各攝影機的擷取統計：累計擷取影格數、緩衝區滿時丟棄的影格數、讀取失敗次數、
+        目前緩衝區長度與最新影像延遲（秒）。
+        """
+        with self._lock:
+            camera_ids = list(self._streams.keys())
+        stats = {}
+        for camera_id in camera_ids:
+            counts = self._capture_counts.get(camera_id)
+            frame_buffer = self._frame_buffers.get(camera_id)
+            if counts is None or frame_buffer is None:
+                continue
+            stats[camera_id] = dict(counts, buffered=frame_buffer.qsize(),
+                                    delay=round(self.get_frame_delay(camera_id), 3))
+        return stats
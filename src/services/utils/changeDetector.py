@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+from typing import Dict, Tuple
+from src.config.config import SEGMENT_MOTION_THRES
+
+
+class ChangeDetector:
+    """
+    以縮小灰階影像的平均絕對差判斷裁切區域是否有變化。
+    """
+    def __init__(self, motion_thres: float = SEGMENT_MOTION_THRES, probe_side: int = 64):
+        """
+        :param motion_thres: 平均灰階差異閾值 (0~255)，超過即視為有變化
+        :param probe_side: 比對用縮圖的最長邊
+        """
+        self.motion_thres = motion_thres
+        self.probe_side = probe_side
+        self._references: Dict[Tuple[int, int, int, int], np.ndarray] = {}
+
+    def _probe(self, crop: np.ndarray) -> np.ndarray:
+        h, w = crop.shape[:2]
+        scale = self.probe_side / float(max(h, w))
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def has_changed(self, key: Tuple[int, int, int, int], crop: np.ndarray) -> bool:
+        """比對與上次分割時的參考影像，有變化或沒有參考影像時回傳 True"""
+        reference = self._references.get(key)
+        if reference is None:
+            return True
+        probe = self._probe(crop)
+        if probe.shape != reference.shape:
+            return True
+        return float(cv2.absdiff(probe, reference).mean()) > self.motion_thres
+
+    def set_reference(self, key: Tuple[int, int, int, int], crop: np.ndarray) -> None:
+        self._references[key] = self._probe(crop)
+
+    def retain(self, keys) -> None:
+        """只保留指定的參考影像"""
+        keys = set(keys)
+        for key in list(self._references):
+            if key not in keys:
+                del self._references[key]
@@ -0,0 +1,60 @@
+import time
+import threading
+from typing import Optional
+
+
+class Clock:
+    """
+    規則引擎（椅子狀態、區域互動、物件逾時、事件錄影）的時間來源。
+    各元件優先使用呼叫端傳入的影格時間戳 (FrameData.timestamp)，沒有時間戳時才使用時鐘，預設為系統時間。
+    """
+    def now(self) -> float:
+        return time.time()
+
+
+class SimulatedClock(Clock):
+    """
+    由呼叫端推進的模擬時鐘，用於偵測結果重播與離線處理：
+    重播時將時間設為每一幀錄製的時間戳，規則引擎的門檻秒數即以錄製時間計算，不受執行速度影響。
+    """
+    def __init__(self, start: float = 0.0):
+        """
+        :param start: 起始時間（秒）
+        """
+        self._now = float(start)
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return self._now
+
+    def set(self, timestamp: float) -> None:
+        """設定目前時間，不允許倒退（晚到的幀沿用目前時間）"""
+        with self._lock:
+            if timestamp > self._now:
+                self._now = float(timestamp)
+
+    def advance(self, seconds: float) -> float:
+        with self._lock:
+            self._now += max(float(seconds), 0.0)
+            return self._now
+
+
+_clock: Clock = Clock()
+_clock_lock = threading.Lock()
+
+
+def get_clock() -> Clock:
+    """取得目前進程共用的時鐘"""
+    return _clock
+
+
+def set_clock(clock: Optional[Clock]) -> Clock:
+    """
+    替換目前進程共用的時鐘。
+    :param clock: 新的時鐘，None 表示恢復為系統時間
+    :return: 原本的時鐘
+    """
+    global _clock
+    with _clock_lock:
+        previous, _clock = _clock, clock if clock is not None else Clock()
+        return previous
@@ -0,0 +1,39 @@
+import binascii
+import cv2
+import numpy as np
+from typing import Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def decode_jpeg(data: BytesLike) -> np.ndarray:
+    """
+    直接從請求的緩衝區解碼 JPEG。
+    np.frombuffer 只建立指向原緩衝區的視圖，不會複製資料，再交由 cv2.imdecode 解碼。
+    :param data: JPEG 位元組
+    :return: BGR 影像
+    """
+    if not data:
+        raise ValueError("影像資料為空")
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("無法解碼影像資料")
+    return image
+
+
+def decode_base64_jpeg(data: Union[str, BytesLike]) -> np.ndarray:
+    """
+    解碼 base64 編碼的 JPEG，可接受含 data URI 前綴 (data:image/jpeg;base64,...) 的字串。
+    base64 解碼為唯一的一次轉換，解碼結果直接交給 decode_jpeg。
+    """
+    if isinstance(data, str):
+        comma = data.find(',', 0, 64)
+        if data.startswith('data:') and comma != -1:
+            data = data[comma + 1:]
+        data = data.encode('ascii')
+    try:
+        raw = binascii.a2b_base64(data)
+    except binascii.Error as e:
+        raise ValueError(f"base64 格式錯誤: {str(e)}")
+    return decode_jpeg(raw)
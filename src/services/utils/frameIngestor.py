@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict
+from src.services.lib.loggingService import log
+from src.services.utils.cameraUtils import FrameData
+
+
+class FrameIngestor:
+    """
+    推送模式的影像接收佇列。
+    每台相機只保留最新一幀，新幀到達時直接取代尚未處理的舊幀，
+    由單一背景線程依到達順序輪流交給偵測流程，避免高併發請求堆積在推論之前。
+    """
+    def __init__(self, process_frame: Callable[[FrameData], None], name: str = "frame-ingestor"):
+        """
+        :param process_frame: 處理單一 FrameData 的函式（例如呼叫 detector.detect）
+        :param name: 背景線程名稱
+        """
+        self.process_frame = process_frame
+        self.name = name
+        self._pending: "OrderedDict[str, FrameData]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        with self._condition:
+            self._running = False
+            self._pending.clear()
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def submit(self, frame_data: FrameData) -> bool:
+        """
+        放入一幀影像，同一相機尚未處理的舊幀會被取代。
+        :return: 是否取代了舊幀
+        """
+        if not self._running:
+            self.start()
+        with self._condition:
+            replaced = self._pending.pop(frame_data.camera_id, None) is not None
+            self._pending[frame_data.camera_id] = frame_data
+            self.received += 1
+            if replaced:
+                self.dropped += 1
+            self._condition.notify()
+        return replaced
+
+    def _run(self):
+        log.info(f"{self.name} 已啟動")
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait(timeout=0.5)
+                if not self._running:
+                    break
+                _, frame_data = self._pending.popitem(last=False)
+            try:
+                self.process_frame(frame_data)
+                self.processed += 1
+            except Exception as e:
+                self.errors += 1
+                log.error(f"處理推送影像時發生錯誤 ({frame_data.camera_id}): {str(e)}")
+        log.info(f"{self.name} 已退出")
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            pending = len(self._pending)
+        return {"received": self.received, "processed": self.processed,
+                "dropped": self.dropped, "errors": self.errors, "pending": pending}
@@ -0,0 +1,145 @@
+import time
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from src.config.config import GOVERNOR_MIN_FPS, GOVERNOR_MAX_FPS, GOVERNOR_COMPUTE_BUDGET, \
+    GOVERNOR_ACTIVITY_DECAY, GOVERNOR_REBALANCE_INTERVAL
+
+
+@dataclass
+class CameraRate:
+    target_fps: float
+    activity: float = 0.0       # 0~1，近期畫面活動程度的指數移動平均
+    cost: float = 0.0           # 單幀分析耗時（秒）的指數移動平均
+    last_scheduled: float = 0.0
+    processed: int = 0
+    skipped: int = 0
+
+
+class FrameRateGovernor:
+    """
+    依相機活動程度、實測推論耗時與整體運算預算，分配每台相機的分析 FPS。
+    有人活動的相機提高到 max_fps，空場景降到 min_fps；所有相機需要的運算量超過預算時，
+    先保證每台相機的最低 FPS，剩餘預算再依活動程度分配。
+    最低 FPS 不會低於狀態機閾值所需的取樣頻率（每個閾值期間至少取樣 min_samples 次），
+    狀態機以時間計算，降低 FPS 不會改變 EXPERIENCE_TIME_THRES、NOT_EXIST_THRES 等判定的時間長度。
+    """
+    def __init__(self, min_fps: float = GOVERNOR_MIN_FPS, max_fps: float = GOVERNOR_MAX_FPS,
+                 compute_budget: float = GOVERNOR_COMPUTE_BUDGET,
+                 activity_decay: float = GOVERNOR_ACTIVITY_DECAY,
+                 rebalance_interval: float = GOVERNOR_REBALANCE_INTERVAL,
+                 min_state_threshold: Optional[float] = None, min_samples: int = 3):
+        """
+        :param min_fps: 每台相機的最低分析 FPS
+        :param max_fps: 每台相機的最高分析 FPS
+        :param compute_budget: 每秒可用於分析的秒數（例如 0.9 表示單一分析線程 90% 的時間）
+        :param activity_decay: 活動程度指數移動平均的衰減係數 (0~1)，越大越快反映最新狀態
+        :param rebalance_interval: 重新分配 FPS 的間隔秒數
+        :param min_state_threshold: 狀態機最短的時間閾值（秒），用來限制最低 FPS
+        :param min_samples: 每個狀態機閾值期間至少取樣的次數
+        """
+        if min_state_threshold:
+            min_fps = max(min_fps, min_samples / float(min_state_threshold))
+        self.min_fps = min(min_fps, max_fps)
+        self.max_fps = max_fps
+        self.compute_budget = compute_budget
+        self.activity_decay = activity_decay
+        self.rebalance_interval = rebalance_interval
+        self._cameras: Dict[str, CameraRate] = {}
+        self._lock = threading.Lock()
+        self._last_rebalance = 0.0
+        self.overloaded = False
+
+    def _get(self, camera_id: str) -> CameraRate:
+        rate = self._cameras.get(camera_id)
+        if rate is None:
+            # 新相機先以最高 FPS 量測耗時與活動程度
+            rate = self._cameras[camera_id] = CameraRate(target_fps=self.max_fps, activity=1.0)
+        return rate
+
+    def is_due(self, camera_id: str, now: Optional[float] = None) -> bool:
+        """是否已到該相機下一次分析的時間"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rate = self._get(camera_id)
+            return now - rate.last_scheduled >= 1.0 / rate.target_fps
+
+    def mark_scheduled(self, camera_id: str, now: Optional[float] = None, skipped: int = 0) -> None:
+        """
+        記錄該相機已排入一幀分析。
+        :param skipped: 這段期間被略過（未分析）的幀數
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rate = self._get(camera_id)
+            rate.last_scheduled = now
+            rate.processed += 1
+            rate.skipped += skipped
+        self._maybe_rebalance(now)
+
+    def record(self, camera_id: str, cost: float, active: bool) -> None:
+        """
+        回報一幀的分析結果。
+        :param cost: 分析耗時（秒）
+        :param active: 畫面中是否有活動（例如有行人、椅子被使用中）
+        """
+        alpha = self.activity_decay
+        with self._lock:
+            rate = self._cameras.get(camera_id)
+            if rate is None:
+                # 相機已移除，分析中的最後一幀不重新建立排程狀態
+                return
+            rate.activity = (1 - alpha) * rate.activity + alpha * (1.0 if active else 0.0)
+            rate.cost = cost if rate.cost == 0.0 else 0.8 * rate.cost + 0.2 * cost
+
+    def remove(self, camera_id: str) -> None:
+        with self._lock:
+            self._cameras.pop(camera_id, None)
+
+    def _maybe_rebalance(self, now: float) -> None:
+        if now - self._last_rebalance >= self.rebalance_interval:
+            self._last_rebalance = now
+            self.rebalance()
+
+    def rebalance(self) -> None:
+        """依活動程度與耗時重新分配各相機的目標 FPS"""
+        with self._lock:
+            if not self._cameras:
+                return
+            desired = {
+                camera_id: self.min_fps + rate.activity * (self.max_fps - self.min_fps)
+                for camera_id, rate in self._cameras.items()
+            }
+            demand = sum(desired[camera_id] * rate.cost for camera_id, rate in self._cameras.items())
+            self.overloaded = demand > self.compute_budget
+            if not self.overloaded:
+                for camera_id, rate in self._cameras.items():
+                    rate.target_fps = desired[camera_id]
+                return
+
+            base_cost = sum(self.min_fps * rate.cost for rate in self._cameras.values())
+            if base_cost >= self.compute_budget:
+                # 連最低 FPS 都無法滿足時，所有相機依比例降低
+                scale = self.compute_budget / base_cost if base_cost > 0 else 1.0
+                for rate in self._cameras.values():
+                    rate.target_fps = max(self.min_fps * scale, 0.1)
+                return
+
+            # 先保證最低 FPS，剩餘預算依額外需求的比例分配
+            extra_cost = demand - base_cost
+            scale = (self.compute_budget - base_cost) / extra_cost if extra_cost > 0 else 0.0
+            for camera_id, rate in self._cameras.items():
+                rate.target_fps = self.min_fps + (desired[camera_id] - self.min_fps) * scale
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                camera_id: {
+                    "target_fps": round(rate.target_fps, 2),
+                    "activity": round(rate.activity, 2),
+                    "cost_ms": round(rate.cost * 1000, 1),
+                    "processed": rate.processed,
+                    "skipped": rate.skipped,
+                }
+                for camera_id, rate in self._cameras.items()
+            }
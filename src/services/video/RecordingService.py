@@ -1,45 +1,128 @@
 import os
-import cv2
-import time
-from collections import deque
+import queue
+import threading
+from src.services.lib.loggingService import log
+from src.services.video.preRollBuffer import PreRollBuffer
+from src.services.video.clipWriter import AsyncClipWriter, get_clip_writer
+from src.services.utils.clock import Clock, get_clock
+from src.config.config import RECORD_PREROLL_MAX_BYTES, RECORD_JPEG_QUALITY, RECORD_TASK_QUEUE_SIZE
+
+_STOP = object()
 
 class RecordingService:
-    def __init__(self, fps=30, pre_seconds=20, post_seconds=10, output_dir: str='output'):
+    """
+    單一相機的事件錄影。
+    分析線程只做取樣判斷並把影格放入佇列；JPEG 壓縮在本服務的背景線程執行，
+    影片編碼與寫檔由 AsyncClipWriter 的影片線程執行，錄影不會增加偵測延遲。
+    """
+    needs_frames = True  # 需要分析線程提供（已繪製偵測結果的）影格
+
+    def __init__(self, fps=30, pre_seconds=20, post_seconds=10, output_dir: str='output',
+                 max_buffer_bytes: int=RECORD_PREROLL_MAX_BYTES, jpeg_quality: int=RECORD_JPEG_QUALITY,
+                 clip_writer: AsyncClipWriter=None, max_pending: int=RECORD_TASK_QUEUE_SIZE, clock: Clock=None):
+        """
+        各方法的 timestamp 為影格時間戳（預錄取樣、錄影長度皆依影格時間計算），未提供時使用 clock 的時間
+        :param clock: 預設為進程共用的時鐘
+        """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         self.output_dir = output_dir
+        self.clock = clock if clock is not None else get_clock()
         self.fps = fps
-        self.pre_frames = pre_seconds * fps
-        self.post_frames = post_seconds * fps
-        self.frame_buffer = deque(maxlen=self.pre_frames)
+        self.post_seconds = post_seconds
+        # 預錄影格以 JPEG 壓縮保存，並依實際時間以 fps 取樣
+        self.frame_buffer = PreRollBuffer(fps=fps, pre_seconds=pre_seconds,
+                                          max_bytes=max_buffer_bytes, jpeg_quality=jpeg_quality)
+        self.clip_writer = clip_writer or get_clip_writer()
+        self.max_pending = max_pending
         self.is_recording = False
-        self.post_recording_frames = 0
-        self.out = None
+        self.record_end_time = 0.0
+        self.next_record_time = 0.0
+        self.dropped = 0
+        self._clip = None
+        # 控制指令 (start/stop) 不受上限限制，影格超過 max_pending 時丟棄
+        self._tasks: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _submit(self, task, is_frame: bool=True):
+        if is_frame and self._tasks.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="recording", daemon=True)
+                self._thread.start()
+        self._tasks.put(task)
 
-    def buffer_frame(self, frame):
-        """將當前影格加入緩存"""
-        self.frame_buffer.append(frame)
+    def buffer_frame(self, frame, timestamp: float=None):
+        """將當前影格加入緩存（依時間取樣，壓縮在背景線程執行）"""
+        timestamp = self.clock.now() if timestamp is None else timestamp
+        if self.frame_buffer.reserve(timestamp):
+            self._submit(('buffer', frame, timestamp))
 
-    def start_recording(self, camera_id):
-        """開始錄影並將緩存影格寫入影片"""
+    def start_recording(self, camera_id, timestamp: float=None):
+        """開始錄影，緩存影格與後續影格交由背景線程寫入影片"""
         if not self.is_recording:
+            timestamp = self.clock.now() if timestamp is None else timestamp
             self.is_recording = True
-            timestamp = int(time.time())
-            output_path = os.path.join(self.output_dir, f'{camera_id}_{timestamp}.avi')
-            self.out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'XVID'), 
-                                       self.fps, (self.frame_buffer[0].shape[1], self.frame_buffer[0].shape[0]))
+            output_path = os.path.join(self.output_dir, f'{camera_id}_{int(timestamp)}.avi')
+            self._submit(('start', output_path), is_frame=False)
+            self.record_end_time = timestamp + self.post_seconds
+            self.next_record_time = timestamp
 
-            for frame in self.frame_buffer:
-                self.out.write(frame)
-            self.post_recording_frames = 0
-
-    def record_frame(self, frame):
-        """錄製後續影格直到達到指定秒數"""
+    def record_frame(self, frame, timestamp: float=None):
+        """錄製後續影格（依時間以 fps 取樣）直到達到指定秒數"""
         if self.is_recording:
-            self.out.write(frame)
-            self.post_recording_frames += 1
+            timestamp = self.clock.now() if timestamp is None else timestamp
+            if timestamp >= self.next_record_time:
+                self._submit(('record', frame))
+                self.next_record_time += 1.0 / self.fps
+                if timestamp - self.next_record_time > 1.0 / self.fps:
+                    self.next_record_time = timestamp + 1.0 / self.fps
 
-            if self.post_recording_frames >= self.post_frames:
+            if timestamp >= self.record_end_time:
                 self.is_recording = False
-                self.out.release()
-                self.out = None
+                self._submit(('stop',), is_frame=False)
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is _STOP:
+                break
+            try:
+                action = task[0]
+                if action == 'buffer':
+                    self.frame_buffer.store(task[1], task[2])
+                elif action == 'start':
+                    self._close_clip()
+                    self._clip = self.clip_writer.open_clip(task[1], fps=self.fps)
+                    # 預錄影格以 JPEG 位元組交給影片線程，解碼也不在本線程執行
+                    for _, data in self.frame_buffer.drain():
+                        self._clip.write(data)
+                elif action == 'record':
+                    if self._clip is not None:
+                        self._clip.write(task[1])
+                elif action == 'stop':
+                    self._close_clip()
+            except Exception as e:
+                log.error(f"錄影背景線程發生錯誤: {str(e)}")
+        self._close_clip()
+
+    def _close_clip(self):
+        if self._clip is not None:
+            self._clip.close()
+            self._clip = None
+
+    def close(self, timeout: float=5.0):
+        """結束錄影並停止背景線程，未完成的影片會寫完剩餘影格後關閉"""
+        self.is_recording = False
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._tasks.put(_STOP)
+            thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return dict(self.frame_buffer.stats(), pending=self._tasks.qsize(), dropped=self.dropped,
+                    recording=self.is_recording)
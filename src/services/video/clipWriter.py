@@ -0,0 +1,196 @@
+import os
+import cv2
+import time
+import queue
+import threading
+import numpy as np
+from typing import Dict, Optional, Union
+from src.services.lib.loggingService import log
+from src.config.config import CLIP_QUEUE_SIZE
+
+_CLOSE = object()
+
+FrameItem = Union[np.ndarray, bytes]
+
+
+class Clip:
+    """
+    單一事件影片。
+    影格放入有上限的佇列後由該影片專屬的編碼線程寫入暫存檔 (*.part.avi)，
+    完成後以 os.replace 原子性地更名為正式檔名，讀取端不會看到寫到一半的影片。
+    佇列已滿時丟棄影格而不等待，呼叫端不會被編碼速度拖慢。
+    """
+    def __init__(self, path: str, fps: float, fourcc: str, max_queue: int, metrics: 'ClipWriterMetrics'):
+        """
+        :param path: 完成後的影片路徑
+        :param fps: 影片 FPS
+        :param fourcc: 編碼格式
+        :param max_queue: 待寫入影格的上限
+        :param metrics: 共用的統計資料
+        """
+        root, ext = os.path.splitext(path)
+        self.path = path
+        self.temp_path = f"{root}.part{ext}"
+        self.fps = fps
+        self.fourcc = fourcc
+        self.metrics = metrics
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self.finished = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name=f"clip-{os.path.basename(root)}", daemon=True)
+        self._thread.start()
+
+    def write(self, frame: FrameItem) -> bool:
+        """
+        放入一張影格（BGR 影像或 JPEG 位元組），不會阻塞。
+        :return: 是否成功放入
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+            self.metrics.count('frames_dropped')
+            return False
+        self.metrics.observe_queue(self._queue.qsize())
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """送出結束標記，剩餘影格寫完後關閉影片並更名"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_CLOSE, timeout=timeout)
+        except queue.Full:
+            log.warning(f"事件影片 {self.path} 佇列持續已滿，略過剩餘影格")
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait(_CLOSE)
+
+    def _run(self):
+        writer = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _CLOSE:
+                    break
+                start_time = time.perf_counter()
+                frame = cv2.imdecode(np.frombuffer(item, dtype=np.uint8), cv2.IMREAD_COLOR) \
+                    if isinstance(item, (bytes, bytearray)) else item
+                if frame is None:
+                    continue
+                if writer is None:
+                    frame_size = (frame.shape[1], frame.shape[0])
+                    writer = cv2.VideoWriter(self.temp_path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, frame_size)
+                writer.write(frame)
+                self.written += 1
+                self.metrics.count('frames_written')
+                self.metrics.observe_encode(time.perf_counter() - start_time)
+        except Exception as e:
+            log.error(f"寫入事件影片 {self.path} 時發生錯誤: {str(e)}")
+        finally:
+            if writer is not None:
+                writer.release()
+                try:
+                    os.replace(self.temp_path, self.path)
+                    log.info(f"事件影片已完成: {self.path} ({self.written} 張, 丟棄 {self.dropped} 張)")
+                except OSError as e:
+                    log.error(f"事件影片更名失敗 {self.temp_path}: {str(e)}")
+            self.metrics.clip_finished()
+            self.finished.set()
+
+
+class ClipWriterMetrics:
+    """事件影片寫入的背壓統計"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {
+            'clips_open': 0,
+            'clips_finished': 0,
+            'frames_written': 0,
+            'frames_dropped': 0,
+            'max_queue_depth': 0,
+            'encode_seconds': 0.0,
+        }
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.values[key] += amount
+
+    def observe_queue(self, depth: int) -> None:
+        with self._lock:
+            if depth > self.values['max_queue_depth']:
+                self.values['max_queue_depth'] = depth
+
+    def observe_encode(self, seconds: float) -> None:
+        with self._lock:
+            self.values['encode_seconds'] += seconds
+
+    def clip_finished(self) -> None:
+        with self._lock:
+            self.values['clips_open'] -= 1
+            self.values['clips_finished'] += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            values = dict(self.values)
+        written = values.pop('encode_seconds')
+        values['avg_encode_ms'] = round(written / values['frames_written'] * 1000, 2) if values['frames_written'] else 0.0
+        return values
+
+
+class AsyncClipWriter:
+    """
+    事件影片的非同步寫入器，每支影片有自己的佇列與編碼線程。
+    """
+    def __init__(self, max_queue: int = CLIP_QUEUE_SIZE, fourcc: str = 'XVID'):
+        """
+        :param max_queue: 每支影片待寫入影格的上限
+        :param fourcc: 編碼格式
+        """
+        self.max_queue = max_queue
+        self.fourcc = fourcc
+        self.metrics = ClipWriterMetrics()
+        self._clips: Dict[str, Clip] = {}
+        self._lock = threading.Lock()
+
+    def open_clip(self, path: str, fps: float) -> Clip:
+        clip = Clip(path=path, fps=fps, fourcc=self.fourcc, max_queue=self.max_queue, metrics=self.metrics)
+        with self._lock:
+            self._clips = {p: c for p, c in self._clips.items() if not c.finished.is_set()}
+            self._clips[path] = clip
+        self.metrics.count('clips_open')
+        return clip
+
+    def close_all(self, timeout: float = 5.0) -> None:
+        """關閉所有影片並等待寫入完成"""
+        with self._lock:
+            clips = list(self._clips.values())
+            self._clips.clear()
+        for clip in clips:
+            clip.close(timeout=timeout)
+        for clip in clips:
+            clip.finished.wait(timeout=timeout)
+
+    def stats(self) -> Dict[str, float]:
+        return self.metrics.snapshot()
+
+
+_writer: Optional[AsyncClipWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_clip_writer() -> AsyncClipWriter:
+    """取得目前進程共用的事件影片寫入器"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AsyncClipWriter()
+        return _writer
@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Optional
+from src.services.lib.loggingService import log
+
+try:
+    import av
+except ImportError:  # PyAV 為選用套件，未安裝時退回解碼後重新編碼的錄影方式
+    av = None
+
+PYAV_AVAILABLE = av is not None
+
+
+class PacketRingBuffer:
+    """
+    保存相機原始壓縮封包（未解碼）的環狀緩衝區。
+    以保存時間與位元組上限淘汰最舊的封包，並以 GOP 為單位淘汰，
+    確保緩衝區開頭永遠是關鍵幀，取出的封包可直接封裝成可播放的影片。
+    """
+    def __init__(self, pre_seconds: float, max_bytes: int):
+        """
+        :param pre_seconds: 保存的秒數
+        :param max_bytes: 封包的總位元組上限
+        """
+        self.pre_seconds = pre_seconds
+        self.max_bytes = max_bytes
+        self._packets: deque = deque()  # (timestamp, packet, size)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._packets)
+
+    def append(self, packet, timestamp: float) -> None:
+        size = packet.size
+        with self._lock:
+            if not self._packets and not packet.is_keyframe:
+                # 等到第一個關鍵幀才開始保存
+                return
+            self._packets.append((timestamp, packet, size))
+            self.total_bytes += size
+            self._evict(timestamp)
+
+    def _evict(self, now: float) -> None:
+        while self._packets and (now - self._packets[0][0] > self.pre_seconds or self.total_bytes > self.max_bytes):
+            # 找到下一個關鍵幀，整個 GOP 一起淘汰；只剩目前的 GOP 時保留
+            next_key = next((i for i, (_, packet, _) in enumerate(self._packets) if i > 0 and packet.is_keyframe), None)
+            if next_key is None:
+                return
+            for _ in range(next_key):
+                _, _, size = self._packets.popleft()
+                self.total_bytes -= size
+
+    def drain(self) -> list:
+        """取出並清空所有封包 [(timestamp, packet), ...]"""
+        with self._lock:
+            packets, self._packets = self._packets, deque()
+            self.total_bytes = 0
+        return [(timestamp, packet) for timestamp, packet, _ in packets]
+
+    def stats(self) -> dict:
+        with self._lock:
+            span = self._packets[-1][0] - self._packets[0][0] if len(self._packets) > 1 else 0.0
+            return {"packets": len(self._packets), "bytes": self.total_bytes, "seconds": round(span, 2)}
+
+
+class PassthroughRecorder:
+    """
+    不重新編碼的事件錄影。
+    以 PyAV 另外讀取相機的壓縮串流（只解封裝、不解碼），封包保存在 PacketRingBuffer；
+    事件發生時把預錄封包與後續封包直接封裝 (remux) 寫入影片，每台相機的 CPU 成本接近零。
+    提供與 RecordingService 相同的介面，影片內容為相機原始畫面（不含偵測框）。
+    """
+    needs_frames = False  # 不需要分析線程提供解碼後的影格
+
+    def __init__(self, camera_id: str, rtsp_url: str, pre_seconds: float, post_seconds: float,
+                 output_dir: str = 'output', max_bytes: int = 32 * 1024 * 1024, reconnect_delay: float = 2.0):
+        """
+        :param camera_id: 相機 ID
+        :param rtsp_url: 相機串流位址
+        :param pre_seconds: 事件前保存的秒數
+        :param post_seconds: 事件後錄製的秒數
+        :param output_dir: 影片存放位置
+        :param max_bytes: 預錄封包的位元組上限
+        :param reconnect_delay: 串流中斷後重新連線的間隔秒數
+        """
+        if av is None:
+            raise RuntimeError("未安裝 PyAV，無法使用不重新編碼的錄影模式")
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.post_seconds = post_seconds
+        self.output_dir = output_dir
+        self.reconnect_delay = reconnect_delay
+        self.packets = PacketRingBuffer(pre_seconds=pre_seconds, max_bytes=max_bytes)
+        self.is_recording = False
+        self.record_end_time = 0.0
+        self.clips_written = 0
+        self._pending_path: Optional[str] = None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"passthrough-{self.camera_id}", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def buffer_frame(self, frame, timestamp: float = None):
+        """封包由讀取線程直接保存，不需要解碼後的影格"""
+
+    def record_frame(self, frame, timestamp: float = None):
+        """後續封包由讀取線程直接寫入，不需要解碼後的影格"""
+
+    def start_recording(self, camera_id, timestamp: float = None):
+        """標記事件發生，由讀取線程封裝預錄與後續封包"""
+        if self.is_recording:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        self.record_end_time = timestamp + self.post_seconds
+        self._pending_path = os.path.join(self.output_dir, f'{camera_id}_{int(timestamp)}.mp4')
+        self.is_recording = True
+
+    def _run(self):
+        while self._running:
+            try:
+                container = av.open(self.rtsp_url, options={'rtsp_transport': 'tcp'}, timeout=10.0)
+            except Exception as e:
+                log.error(f"無法以 PyAV 連接攝影機 {self.camera_id}: {str(e)}")
+                time.sleep(self.reconnect_delay)
+                continue
+            try:
+                self._demux(container)
+            except Exception as e:
+                log.error(f"讀取攝影機 {self.camera_id} 壓縮串流時發生錯誤: {str(e)}")
+            finally:
+                container.close()
+            if self._running:
+                time.sleep(self.reconnect_delay)
+
+    def _demux(self, container):
+        in_stream = container.streams.video[0]
+        clip = None
+        for packet in container.demux(in_stream):
+            if not self._running:
+                break
+            if packet.dts is None:
+                continue
+            now = time.time()
+            if clip is None and self.is_recording and self._pending_path is not None:
+                clip = _RemuxClip(self._pending_path, in_stream)
+                self._pending_path = None
+                for _, buffered in self.packets.drain():
+                    clip.write(buffered)
+            if clip is not None:
+                clip.write(packet)
+                if now >= self.record_end_time:
+                    self._finish(clip)
+                    clip = None
+            else:
+                self.packets.append(packet, now)
+        if clip is not None:
+            self._finish(clip)
+
+    def _finish(self, clip: '_RemuxClip') -> None:
+        clip.close()
+        self.clips_written += 1
+        self.is_recording = False
+
+    def stats(self) -> dict:
+        return dict(self.packets.stats(), recording=self.is_recording, clips=self.clips_written)
+
+
+class _RemuxClip:
+    """把原始封包封裝寫入暫存檔，完成後原子性地更名為正式檔名"""
+    def __init__(self, path: str, in_stream):
+        root, ext = os.path.splitext(path)
+        self.path = path
+        self.temp_path = f"{root}.part{ext}"
+        self.output = av.open(self.temp_path, mode='w', format=ext.lstrip('.') or None)
+        self.stream = self.output.add_stream(template=in_stream)
+        self._first_dts = None
+        self.written = 0
+
+    def write(self, packet) -> None:
+        # 時間戳以第一個封包為起點，影片從 0 秒開始播放
+        if self._first_dts is None:
+            self._first_dts = packet.dts
+        packet.dts -= self._first_dts
+        if packet.pts is not None:
+            packet.pts -= self._first_dts
+        packet.stream = self.stream
+        self.output.mux(packet)
+        self.written += 1
+
+    def close(self) -> None:
+        try:
+            self.output.close()
+            os.replace(self.temp_path, self.path)
+            log.info(f"事件影片已完成(未重新編碼): {self.path} ({self.written} 個封包)")
+        except Exception as e:
+            log.error(f"事件影片寫入失敗 {self.path}: {str(e)}")
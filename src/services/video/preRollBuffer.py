@@ -0,0 +1,97 @@
+import cv2
+import threading
+import numpy as np
+from collections import deque
+from typing import Iterator, Optional, Tuple
+
+
+class PreRollBuffer:
+    """
+    事件發生前的預錄緩衝區。
+    影格以 JPEG 壓縮後保存，並依實際時間取樣（每 1/fps 秒最多保存一張），
+    同時以保存時間 (pre_seconds) 與位元組上限 (max_bytes) 淘汰最舊的影格。
+    以 4K 影像為例，JPEG 約為原始影像的 1/20 ~ 1/30。
+    """
+    def __init__(self, fps: float, pre_seconds: float, max_bytes: int, jpeg_quality: int = 80):
+        """
+        :param fps: 取樣頻率（張/秒）
+        :param pre_seconds: 保存的秒數
+        :param max_bytes: 壓縮後影格的總位元組上限
+        :param jpeg_quality: JPEG 壓縮品質 (0~100)
+        """
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.pre_seconds = pre_seconds
+        self.max_bytes = max_bytes
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self._frames: deque = deque()  # (timestamp, jpeg bytes)
+        self._lock = threading.Lock()
+        self._next_sample_time = 0.0
+        self.total_bytes = 0
+        self.frame_size: Optional[Tuple[int, int]] = None  # (width, height)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def is_due(self, timestamp: float) -> bool:
+        """是否已到下一個取樣時間"""
+        return timestamp >= self._next_sample_time
+
+    def reserve(self, timestamp: float) -> bool:
+        """
+        依時間取樣：已到取樣時間時推進下一個取樣時間並回傳 True，呼叫端再以 store 保存影格。
+        取樣判斷很輕量，可在分析線程上呼叫；JPEG 壓縮 (store) 可交由背景線程執行。
+        """
+        with self._lock:
+            if timestamp < self._next_sample_time:
+                return False
+            # 以取樣時格為基準推進，避免累積取樣誤差；間隔過久時從目前時間重新起算
+            if timestamp - self._next_sample_time > self.interval:
+                self._next_sample_time = timestamp + self.interval
+            else:
+                self._next_sample_time += self.interval
+            return True
+
+    def store(self, frame: np.ndarray, timestamp: float) -> bool:
+        """
+        壓縮並保存已取樣的影格。
+        :return: 是否有保存該影格
+        """
+        ok, encoded = cv2.imencode('.jpg', frame, self.encode_params)
+        if not ok:
+            return False
+        data = encoded.tobytes()
+        with self._lock:
+            self.frame_size = (frame.shape[1], frame.shape[0])
+            self._frames.append((timestamp, data))
+            self.total_bytes += len(data)
+            self._evict(timestamp)
+        return True
+
+    def append(self, frame: np.ndarray, timestamp: float) -> bool:
+        """
+        依時間取樣並壓縮保存影格。
+        :return: 是否有保存該影格
+        """
+        return self.reserve(timestamp) and self.store(frame, timestamp)
+
+    def _evict(self, now: float) -> None:
+        while self._frames and (now - self._frames[0][0] > self.pre_seconds or self.total_bytes > self.max_bytes):
+            _, data = self._frames.popleft()
+            self.total_bytes -= len(data)
+
+    def drain(self) -> Iterator[Tuple[float, bytes]]:
+        """取出並清空所有壓縮影格 (timestamp, jpeg bytes)，依時間排序"""
+        with self._lock:
+            frames, self._frames = self._frames, deque()
+            self.total_bytes = 0
+        return iter(frames)
+
+    @staticmethod
+    def decode(data: bytes) -> Optional[np.ndarray]:
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def stats(self) -> dict:
+        with self._lock:
+            span = self._frames[-1][0] - self._frames[0][0] if len(self._frames) > 1 else 0.0
+            return {"frames": len(self._frames), "bytes": self.total_bytes, "seconds": round(span, 2)}
@@ -186,6 +186,25 @@ class Utils:
         
         return [x_min, y_min, x_max, y_max]    
 
+    def phash(self, mask):
+        """计算感知哈希值（pHash），以 '0'/'1' 字串回傳"""
+        resized = cv2.resize(mask, (32, 32), interpolation=cv2.INTER_AREA)
+        dct = cv2.dct(np.float32(resized))
+        dct_low_freq = dct[:8, :8]
+        mean_val = np.mean(dct_low_freq[1:])
+        hash_bits = (dct_low_freq > mean_val).flatten()
+        return ''.join(['1' if bit else '0' for bit in hash_bits])
+
+    def phash_similarity(self, mask1, mask2):
+        """计算两个遮罩 pHash 的相似度"""
+        try:
+            hash1 = self.phash(mask1)
+            hash2 = self.phash(mask2)
+            return 1 - sum(c1 != c2 for c1, c2 in zip(hash1, hash2)) / len(hash1)
+        except Exception as e:
+            self.log.error(f"Error in pHash similarity calculation: {e}")
+            return 0
+
     def compare_masks(self, mask1, mask2):
         def iou(mask1, mask2):
             """计算交并比（IoU）"""
@@ -208,30 +227,11 @@ class Utils:
                 self.log.error(f"Error in contour similarity calculation: {e}")
                 return 0
 
-        def phash(mask):
-            """计算感知哈希值（pHash）"""
-            resized = cv2.resize(mask, (32, 32), interpolation=cv2.INTER_AREA)
-            dct = cv2.dct(np.float32(resized))
-            dct_low_freq = dct[:8, :8]
-            mean_val = np.mean(dct_low_freq[1:])
-            hash_bits = (dct_low_freq > mean_val).flatten()
-            return ''.join(['1' if bit else '0' for bit in hash_bits])
-
-        def phash_similarity(mask1, mask2):
-            """计算两个 pHash 的相似度"""
-            try:
-                hash1 = phash(mask1)
-                hash2 = phash(mask2)
-                return 1 - sum(c1 != c2 for c1, c2 in zip(hash1, hash2)) / len(hash1)
-            except Exception as e:
-                self.log.error(f"Error in pHash similarity calculation: {e}")
-                return 0
-
         """整合多种相似度计算方法"""
         results = {
             'IoU': iou(mask1, mask2),
             'Contour Similarity': contour_similarity(mask1, mask2),
-            'pHash Similarity': phash_similarity(mask1, mask2)
+            'pHash Similarity': self.phash_similarity(mask1, mask2)
         }
 
         # 过滤异常值并计算平均值
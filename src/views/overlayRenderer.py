@@ -0,0 +1,144 @@
+import cv2
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class OverlayLayer:
+    """同一顏色、線寬的一組框與標籤"""
+    boxes: Sequence[Sequence[int]]
+    color: Tuple[int, int, int]
+    thickness: int = 1
+    labels: Optional[List[str]] = None
+    # 標籤背景色，未指定時與框同色
+    label_color: Optional[Tuple[int, int, int]] = field(default=None)
+
+
+class OverlayRenderer:
+    """
+    批次繪製偵測框與標籤。
+    同一圖層的所有框以一次 cv2.polylines 繪製；標籤（底色 + 白字）依文字與大小柵格化後快取，
+    之後直接複製到影像上，不再每個物件呼叫 getTextSize / rectangle / putText。
+    指定 output_size 時先縮放到重複使用的輸出緩衝區再繪製，縮小後的畫面繪製成本也跟著降低。
+    """
+    def __init__(self, font_face: int = cv2.FONT_HERSHEY_DUPLEX, font_scale: float = 1.0,
+                 font_thickness: int = 1, max_sprites: int = 2048):
+        """
+        :param font_face: 標籤字型
+        :param font_scale: 原始解析度下的字型大小
+        :param font_thickness: 字型線寬
+        :param max_sprites: 標籤快取的最大數量
+        """
+        self.font_face = font_face
+        self.font_scale = font_scale
+        self.font_thickness = font_thickness
+        self.max_sprites = max_sprites
+        self._sprites: OrderedDict = OrderedDict()
+        self._sprite_lock = threading.Lock()
+        self._buffers: Dict[Tuple[int, int], np.ndarray] = {}
+        self.sprite_hits = 0
+        self.sprite_misses = 0
+
+    def render(self, image: np.ndarray, layers: List[OverlayLayer],
+               output_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        繪製所有圖層。
+        :param image: 原始影像
+        :param layers: 依序繪製的圖層
+        :param output_size: 輸出大小 (width, height)；未指定時直接繪製在 image 上
+        :return: 繪製後的影像（指定 output_size 時為重複使用的緩衝區，下次呼叫會被覆寫）
+        """
+        if output_size is None:
+            canvas, scale = image, 1.0
+        else:
+            canvas = self._canvas(image, tuple(output_size))
+            scale = output_size[0] / float(image.shape[1])
+
+        for layer in layers:
+            boxes = self._scale_boxes(layer.boxes, scale)
+            if boxes is None:
+                continue
+            thickness = max(1, int(round(layer.thickness * scale)))
+            self.draw_boxes(canvas, boxes, layer.color, thickness)
+            if layer.labels:
+                self.draw_labels(canvas, boxes, layer.labels, layer.label_color or layer.color, scale)
+        return canvas
+
+    def _canvas(self, image: np.ndarray, output_size: Tuple[int, int]) -> np.ndarray:
+        width, height = output_size
+        buffer = self._buffers.get(output_size)
+        if buffer is None or buffer.shape[2:] != image.shape[2:]:
+            buffer = self._buffers[output_size] = np.empty((height, width) + image.shape[2:], dtype=image.dtype)
+        if image.shape[:2] == (height, width):
+            np.copyto(buffer, image)
+        else:
+            cv2.resize(image, output_size, dst=buffer, interpolation=cv2.INTER_AREA)
+        return buffer
+
+    @staticmethod
+    def _scale_boxes(boxes, scale: float) -> Optional[np.ndarray]:
+        if boxes is None or len(boxes) == 0:
+            return None
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if scale != 1.0:
+            boxes = boxes * scale
+        return np.rint(boxes).astype(np.int32)
+
+    @staticmethod
+    def draw_boxes(canvas: np.ndarray, boxes: np.ndarray, color, thickness: int) -> None:
+        """以一次 polylines 繪製 (N, 4) 的 [x1, y1, x2, y2] 框"""
+        x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+        polygons = np.stack([
+            np.stack([x1, y1], axis=1),
+            np.stack([x2, y1], axis=1),
+            np.stack([x2, y2], axis=1),
+            np.stack([x1, y2], axis=1),
+        ], axis=1)
+        cv2.polylines(canvas, list(polygons), isClosed=True, color=color, thickness=thickness)
+
+    def draw_labels(self, canvas: np.ndarray, boxes: np.ndarray, labels: List[str], color, scale: float = 1.0) -> None:
+        """將快取的標籤貼在每個框的左上角上方"""
+        height, width = canvas.shape[:2]
+        for (x1, y1, _, _), text in zip(boxes.tolist(), labels):
+            if not text:
+                continue
+            sprite = self._sprite(text, color, scale)
+            sprite_h, sprite_w = sprite.shape[:2]
+            top, left = y1 - sprite_h, x1
+            # 超出影像的部分裁掉
+            src_top, src_left = max(0, -top), max(0, -left)
+            dst_top, dst_left = max(0, top), max(0, left)
+            dst_bottom, dst_right = min(height, top + sprite_h), min(width, left + sprite_w)
+            if dst_bottom <= dst_top or dst_right <= dst_left:
+                continue
+            canvas[dst_top:dst_bottom, dst_left:dst_right] = \
+                sprite[src_top:src_top + dst_bottom - dst_top, src_left:src_left + dst_right - dst_left]
+
+    def _sprite(self, text: str, color, scale: float) -> np.ndarray:
+        key = (text, tuple(color), round(scale, 3))
+        with self._sprite_lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.sprite_hits += 1
+                return sprite
+        self.sprite_misses += 1
+        font_scale = self.font_scale * scale
+        (text_w, text_h), _ = cv2.getTextSize(text, self.font_face, font_scale, self.font_thickness)
+        # 與 View._drawText 相同的版面：底色高度為文字高度 + 4，文字基線距底部 3 像素
+        pad = max(1, int(round(4 * scale)))
+        sprite = np.empty((text_h + pad, max(1, text_w)) + (3,), dtype=np.uint8)
+        sprite[:] = color
+        cv2.putText(sprite, text, (0, text_h + pad - max(1, int(round(3 * scale)))), self.font_face, font_scale,
+                    (255, 255, 255), self.font_thickness, cv2.LINE_AA)
+        with self._sprite_lock:
+            self._sprites[key] = sprite
+            while len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    def stats(self) -> Dict[str, int]:
+        return {"sprites": len(self._sprites), "hits": self.sprite_hits, "misses": self.sprite_misses}
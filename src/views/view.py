@@ -1,6 +1,18 @@
 import cv2
 import numpy as np
+from src.views.overlayRenderer import OverlayRenderer, OverlayLayer
+
 class View:
+    def __init__(self):
+        self.renderer = OverlayRenderer()
+
+    @staticmethod
+    def _label(object: dict) -> str:
+        """與 drawObject 相同的預設標籤：category-id"""
+        category = object.get('category')
+        id = object.get('id')
+        return category if id is None else f'{category}-{id}'
+
     def drawObject(self, image: np.ndarray, object: dict, text: str=None, rectColor: tuple=(255,0,0)):
         x1, y1, x2, y2 = object.get('bbox')
         category = object.get('category')
@@ -44,20 +56,25 @@ class View:
         self.drawObject(image=image, object=chair, text=text, rectColor=rectColor)
         
     def visualSalesArea(self, image: np.ndarray, persons: list, objects_dict: dict, zones: list, 
-                        interactiveAreas: list):
-        for zone in zones:
-            cv2.rectangle(image, zone[:2], zone[2:], (233, 189, 222), 3)
-        
-        for interactiveArea in interactiveAreas:
-            cv2.rectangle(image, interactiveArea[:2], interactiveArea[2:], (0, 69, 255), 5)
-
-        for person in persons:
-            self.drawObject(image=image, object=person, rectColor=(0,188,0))
-            
-        for id, info in objects_dict.items():
-            object = info['object']
-            rectColor = (0,0,255) if info.get('notified') else (255,0,0)
-            self.drawObject(image=image, object=object, rectColor=rectColor)
+                        interactiveAreas: list, output_size: tuple=None):
+        """
+        繪製促銷區結果（批次繪製）。
+        :param output_size: 輸出大小 (width, height)，未指定時直接繪製在 image 上
+        :return: 繪製後的影像
+        """
+        objects = [info['object'] for info in objects_dict.values() if not info.get('notified')]
+        notified = [info['object'] for info in objects_dict.values() if info.get('notified')]
+        layers = [
+            OverlayLayer(boxes=[zone[:4] for zone in zones], color=(233, 189, 222), thickness=3),
+            OverlayLayer(boxes=[area[:4] for area in interactiveAreas], color=(0, 69, 255), thickness=5),
+            OverlayLayer(boxes=[person['bbox'] for person in persons], color=(0,188,0),
+                         labels=[self._label(person) for person in persons]),
+            OverlayLayer(boxes=[object['bbox'] for object in objects], color=(255,0,0),
+                         labels=[self._label(object) for object in objects]),
+            OverlayLayer(boxes=[object['bbox'] for object in notified], color=(0,0,255),
+                         labels=[self._label(object) for object in notified]),
+        ]
+        return self.renderer.render(image, layers, output_size=output_size)
         
     def visualExperienceArea(self, image: np.ndarray, pillows, chairs, persons):
         history_chairs = []
@@ -70,12 +87,28 @@ class View:
                 "type": chair.type
             })
         
-        for chair in history_chairs:
-            self.drawChair(image=image, chair=chair)
-        
-        for pillow in pillows:
-            self.drawObject(image=image, object=pillow, rectColor=(0,0,255))
-        
-        for person in persons:
-            self.drawObject(image=image, object=person, rectColor=(255, 0, 0))
-    
\ No newline at end of file
+        return self.visualExperienceChairs(image=image, pillows=pillows, chairs=history_chairs, persons=persons)
+
+    def visualExperienceChairs(self, image: np.ndarray, pillows, chairs: list, persons, output_size: tuple=None):
+        """
+        繪製體驗區結果（批次繪製），chairs 為椅子資訊的 dict 列表。
+        :param output_size: 輸出大小 (width, height)，未指定時直接繪製在 image 上
+        :return: 繪製後的影像
+        """
+        def chair_label(chair: dict) -> str:
+            return '-'.join(str(value) for value in (chair.get('category'), chair.get('id'),
+                                                      chair.get('type'), chair.get('state')) if value is not None)
+
+        in_use = [chair for chair in chairs if chair.get('state') == 'in_use']
+        vacant = [chair for chair in chairs if chair.get('state') != 'in_use']
+        layers = [
+            OverlayLayer(boxes=[chair['bbox'] for chair in in_use], color=(0,0,255),
+                         labels=[chair_label(chair) for chair in in_use]),
+            OverlayLayer(boxes=[chair['bbox'] for chair in vacant], color=(0, 155, 0),
+                         labels=[chair_label(chair) for chair in vacant]),
+            OverlayLayer(boxes=[pillow['bbox'] for pillow in pillows], color=(0,0,255),
+                         labels=[self._label(pillow) for pillow in pillows]),
+            OverlayLayer(boxes=[person['bbox'] for person in persons], color=(255, 0, 0),
+                         labels=[self._label(person) for person in persons]),
+        ]
+        return self.renderer.render(image, layers, output_size=output_size)
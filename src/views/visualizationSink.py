@@ -0,0 +1,222 @@
+import cv2
+import time
+import threading
+import numpy as np
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.services.lib.loggingService import log
+from src.config.config import VISUAL_MODE, VISUAL_MAX_FPS, VISUAL_SIZE, VISUAL_MJPEG_PORT, VISUAL_JPEG_QUALITY
+
+
+@dataclass
+class VisualRecord:
+    """送往視覺化線程的單幀資料：原始影像與繪製所需的偵測結果"""
+    camera_id: str
+    image: np.ndarray
+    timestamp: float
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+class VisualizationSink:
+    """
+    在獨立線程中繪製與顯示偵測結果。
+    分析線程只放入 VisualRecord（每台相機只保留最新一筆），繪製、縮放與顯示以 max_fps 為上限在背景執行，
+    繪製函式不可修改 record.image（用於推論的影格），應繪製在複本或縮放後的緩衝區上。
+    顯示方式為本機視窗 (window) 或 MJPEG HTTP 預覽 (mjpeg)：
+    以瀏覽器開啟 http://<host>:<port>/ 可看到相機列表，/stream/<camera_id> 為該相機的 MJPEG 串流。
+    """
+    def __init__(self, render: Callable[[VisualRecord], np.ndarray], mode: str = VISUAL_MODE,
+                 max_fps: float = VISUAL_MAX_FPS, output_size: Tuple[int, int] = VISUAL_SIZE,
+                 port: int = VISUAL_MJPEG_PORT, jpeg_quality: int = VISUAL_JPEG_QUALITY, name: str = "visual"):
+        """
+        :param render: 繪製函式，接收 VisualRecord 並回傳繪製後的影像（在視覺化線程中呼叫，不可修改 record.image）
+        :param mode: 顯示方式 window / mjpeg
+        :param max_fps: 每台相機的最高顯示 FPS
+        :param output_size: 輸出影像大小 (width, height)
+        :param port: MJPEG 預覽的埠號，被其他分片佔用時依序嘗試下一個埠號
+        :param jpeg_quality: MJPEG 的 JPEG 壓縮品質
+        :param name: 線程名稱
+        """
+        self.render = render
+        self.mode = mode
+        self.interval = 1.0 / max_fps
+        self.output_size = tuple(output_size)
+        self.port = port
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self.name = name
+        self._pending: Dict[str, VisualRecord] = {}
+        self._last_submit: Dict[str, float] = {}
+        self._jpegs: Dict[str, bytes] = {}
+        self._windows = set()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.submitted = 0
+        self.skipped = 0
+        self.rendered = 0
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        if self.mode == 'mjpeg':
+            self._start_server()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        if not self._running:
+            return
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def submit(self, camera_id: str, image: np.ndarray, timestamp: float = None, **payload) -> bool:
+        """
+        放入一幀待顯示的資料，不會阻塞；距離該相機上一次放入未滿 1/max_fps 秒時直接略過。
+        :return: 是否有放入
+        """
+        now = time.time()
+        if now - self._last_submit.get(camera_id, 0.0) < self.interval:
+            self.skipped += 1
+            return False
+        if not self._running:
+            self.start()
+        self._last_submit[camera_id] = now
+        record = VisualRecord(camera_id=camera_id, image=image,
+                              timestamp=now if timestamp is None else timestamp, payload=payload)
+        with self._cond:
+            self._pending[camera_id] = record
+            self.submitted += 1
+            self._cond.notify()
+        return True
+
+    def _run(self):
+        while self._running:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait(timeout=0.1)
+                    if self.mode == 'window' and self._windows:
+                        break
+                records, self._pending = list(self._pending.values()), {}
+            for record in records:
+                try:
+                    image = self.render(record)
+                    if (image.shape[1], image.shape[0]) != self.output_size:
+                        image = cv2.resize(image, self.output_size)
+                    self._show(record.camera_id, image)
+                    self.rendered += 1
+                except Exception as e:
+                    log.error(f"視覺化過程中發生錯誤: {str(e)}")
+            if self.mode == 'window' and self._windows:
+                # 視窗事件迴圈在同一線程處理
+                cv2.waitKey(1)
+        self._close_windows()
+
+    def _show(self, camera_id: str, image: np.ndarray) -> None:
+        if self.mode == 'mjpeg':
+            ok, encoded = cv2.imencode('.jpg', image, self.encode_params)
+            if ok:
+                with self._cond:
+                    self._jpegs[camera_id] = encoded.tobytes()
+                    self._cond.notify_all()
+        else:
+            self._windows.add(camera_id)
+            cv2.imshow(camera_id, image)
+
+    def _close_windows(self) -> None:
+        try:
+            for window_name in self._windows:
+                cv2.destroyWindow(window_name)
+            self._windows.clear()
+            cv2.waitKey(1)
+        except Exception as e:
+            log.error(f"清理視覺化窗口時發生錯誤: {str(e)}")
+
+    # ------------------------------------------------------------------ MJPEG
+    def latest_jpeg(self, camera_id: str, after: Optional[bytes] = None, timeout: float = 1.0) -> Optional[bytes]:
+        """取得相機最新的 JPEG，指定 after 時等待與其不同的新影像"""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._running or self._jpegs.get(camera_id) is not after,
+                                timeout=timeout)
+            return self._jpegs.get(camera_id)
+
+    def camera_ids(self):
+        with self._cond:
+            return sorted(self._jpegs)
+
+    def _start_server(self) -> None:
+        handler = _make_mjpeg_handler(self)
+        for port in range(self.port, self.port + 16):
+            try:
+                self._server = ThreadingHTTPServer(('0.0.0.0', port), handler)
+            except OSError:
+                continue
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name=f"{self.name}-mjpeg", daemon=True).start()
+            self.port = port
+            log.info(f"視覺化 MJPEG 預覽: http://0.0.0.0:{port}/")
+            return
+        log.error(f"無法啟動視覺化 MJPEG 預覽，埠號 {self.port}~{self.port + 15} 皆被佔用")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "port": self.port if self._server is not None else None,
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "rendered": self.rendered,
+        }
+
+
+def _make_mjpeg_handler(sink: VisualizationSink):
+    boundary = 'frame'
+
+    class MJPEGHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith('/stream/'):
+                self._stream(self.path[len('/stream/'):])
+            elif self.path in ('/', '/index.html'):
+                links = ''.join(f'<li><a href="/stream/{camera_id}">{camera_id}</a></li>'
+                                for camera_id in sink.camera_ids())
+                body = f'<html><body><ul>{links}</ul></body></html>'.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_error(404)
+
+        def _stream(self, camera_id: str):
+            self.send_response(200)
+            self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={boundary}')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            last = None
+            try:
+                while sink._running:
+                    data = sink.latest_jpeg(camera_id, after=last)
+                    if data is None or data is last:
+                        continue
+                    last = data
+                    self.wfile.write(f'--{boundary}\r\nContent-Type: image/jpeg\r\n'
+                                     f'Content-Length: {len(data)}\r\n\r\n'.encode('ascii'))
+                    self.wfile.write(data)
+                    self.wfile.write(b'\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return MJPEGHandler
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 測試以專案根目錄為匯入起點（與 python -m benchmarks.xxx 相同）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
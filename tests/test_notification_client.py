@@ -0,0 +1,163 @@
+"""
+NotificationClient 對本機 HTTP stub 的行為測試：5xx/429 重試、4xx 不重試、相同內容的合併，
+以及記憶體佇列已滿時溢出到本地暫存區 (outbox)。
+
+執行方式（於專案根目錄）：
+    python -m pytest tests/test_notification_client.py
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.config.database import outbox_db
+from src.services.notification.outbox import NotificationOutbox
+from src.services.notification.notificationClient import NotificationClient
+
+
+class StubServer:
+    """在臨時埠號上執行的通報服務 stub，依序回應 responses 中的狀態碼（用完後回應 200）"""
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        self.received = threading.Event()
+        self.gate = threading.Event()  # 清除時請求會停在伺服器端，用來讓送出線程卡住
+        self.gate.set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests.append((self.path, json.loads(body)))
+                stub.received.set()
+                stub.gate.wait(timeout=5)
+                status = stub.responses.pop(0) if stub.responses else 200
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.gate.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_client(stub):
+    clients = []
+
+    def make(**kwargs):
+        options = dict(endpoint=stub.endpoint, batch_window=0.05, max_retries=3,
+                       backoff_base=0.01, backoff_max=0.05, read_timeout=10.0)
+        options.update(kwargs)
+        client = NotificationClient(**options)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.stop(timeout=2.0)
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_retries_5xx_and_429_with_backoff(stub, make_client):
+    stub.responses = [500, 429, 503]
+    client = make_client()
+    assert client.notify("/promotion-event", {"camera_id": "cam-1", "area_id": "r1"})
+    assert client.flush(timeout=5)
+
+    assert len(stub.requests) == 4
+    metrics = client.metrics()
+    assert metrics["sent"] == 1 and metrics["retries"] == 3 and metrics["failed"] == 0
+
+
+def test_gives_up_after_max_retries(stub, make_client):
+    stub.responses = [500] * 10
+    client = make_client(max_retries=2)
+    client.notify("/promotion-event", {"camera_id": "cam-1", "area_id": "r1"})
+    assert client.flush(timeout=5)
+
+    assert len(stub.requests) == 3
+    assert client.metrics()["failed"] == 1
+
+
+def test_does_not_retry_4xx(stub, make_client):
+    stub.responses = [400]
+    client = make_client()
+    client.notify("/promotion-event", {"camera_id": "cam-1", "area_id": "r1"})
+    assert client.flush(timeout=5)
+
+    assert len(stub.requests) == 1
+    metrics = client.metrics()
+    assert metrics["failed"] == 1 and metrics["retries"] == 0 and metrics["sent"] == 0
+
+
+@pytest.mark.parametrize("status", [201, 202, 204])
+def test_any_2xx_counts_as_sent(stub, make_client, status):
+    stub.responses = [status]
+    client = make_client()
+    client.notify("/experience-event", {"camera_id": "cam-1", "is_using": True})
+    assert client.flush(timeout=5)
+
+    assert len(stub.requests) == 1
+    assert client.metrics()["sent"] == 1
+
+
+def test_coalesces_identical_payloads_per_key_and_keeps_state_changes(stub, make_client):
+    client = make_client(batch_window=0.5)
+    occupied = {"camera_id": "cam-1", "product_id": "p1", "is_using": True}
+    vacant = {"camera_id": "cam-1", "product_id": "p1", "is_using": False}
+    other_chair = {"camera_id": "cam-1", "product_id": "p2", "is_using": True}
+    for payload, key in [(occupied, "c1"), (occupied, "c1"), (other_chair, "c2"),
+                         (vacant, "c1"), (vacant, "c1"), (occupied, "c1")]:
+        client.notify("/experience-event", payload, coalesce_key=("cam-1", key))
+    assert client.flush(timeout=5)
+
+    assert [payload for _, payload in stub.requests] == [occupied, other_chair, vacant, occupied]
+    assert client.metrics()["coalesced"] == 2
+
+
+def test_spills_to_outbox_when_queue_is_full(stub, make_client, tmp_path):
+    outbox_db.init(str(tmp_path / "outbox.db"))
+    stub.gate.clear()
+    client = make_client(max_queue=1, batch_window=0.01, outbox=NotificationOutbox(channel="test"))
+
+    # 第一筆事件送出後停在伺服器端，送出線程卡住，之後的事件填滿佇列並溢出
+    assert client.notify("/promotion-event", {"seq": 0})
+    assert stub.received.wait(timeout=5)
+    assert client.notify("/promotion-event", {"seq": 1})  # 進入記憶體佇列
+    for seq in range(2, 6):
+        assert client.notify("/promotion-event", {"seq": seq})
+        # 溢出的事件由溢出線程寫入暫存區（第一筆事件仍在暫存區中等待送達）
+        assert wait_for(lambda: client.metrics()["backlog_size"] == seq)
+    metrics = client.metrics()
+    assert metrics["spilled"] == 4 and metrics["dropped"] == 0
+
+    stub.gate.set()
+    assert client.flush(timeout=10)
+    assert wait_for(lambda: len(stub.requests) >= 6)
+    assert sorted(payload["seq"] for _, payload in stub.requests) == list(range(6))
+    assert client.outbox.backlog()["backlog_size"] == 0
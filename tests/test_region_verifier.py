@@ -0,0 +1,107 @@
+"""
+RegionVerifier 與舊版二次檢查（skimage SSIM + utils.compare_masks）的一致性測試。
+
+執行方式（於專案根目錄）：
+    python -m pytest tests/test_region_verifier.py
+"""
+import cv2
+import numpy as np
+import pytest
+from src.utils.utils import utils
+from src.services.track.regionVerifier import RegionVerifier
+from src.config.config import SSIM_THRESHOLD, MASK_SIMILARITY_THRESHOLD
+
+skimage_metrics = pytest.importorskip("skimage.metrics")
+
+
+def make_sample(seed: int, taken: bool, h: int = 160, w: int = 220):
+    """固定亂數種子的 (原始裁切, 當前裁切, 原始遮罩, 當前遮罩)；taken 為商品被拿走的情境"""
+    rng = np.random.default_rng(seed)
+    base = cv2.GaussianBlur(rng.integers(0, 255, size=(h, w, 3), dtype=np.uint8), (0, 0), 3)
+    origin_mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.ellipse(origin_mask, (w // 2, h // 2), (w // 3, h // 3), 0, 0, 360, 255, -1)
+    origin = base.copy()
+    origin[origin_mask > 0] = (origin[origin_mask > 0] * 0.5 + 100).astype(np.uint8)
+    if taken:
+        current = base.copy()
+        current_mask = np.zeros_like(origin_mask)
+        cv2.ellipse(current_mask, (w // 3, h // 3), (w // 8, h // 6), 0, 0, 360, 255, -1)
+    else:
+        current = np.clip(origin.astype(np.int16) + rng.integers(-4, 4, size=origin.shape), 0, 255).astype(np.uint8)
+        current_mask = np.roll(origin_mask, 2, axis=1)
+    return origin, current, origin_mask, current_mask
+
+
+def legacy_missing(origin, current, origin_mask, current_mask) -> bool:
+    """舊版流程：彩色 SSIM 與三項遮罩指標平均，任一低於閾值即視為丟失"""
+    ssim_score = skimage_metrics.structural_similarity(origin, current, channel_axis=-1)
+    mask_similarity = utils.compare_masks(origin_mask, current_mask)
+    return ssim_score < SSIM_THRESHOLD or mask_similarity < MASK_SIMILARITY_THRESHOLD
+
+
+SAMPLES = [make_sample(seed, taken=seed % 2 == 1) for seed in range(12)]
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_exact_ssim_matches_skimage(sample):
+    origin, current, _, _ = sample
+    verifier = RegionVerifier(max_side=0, early_exit=False)
+    origin_gray = cv2.cvtColor(origin, cv2.COLOR_BGR2GRAY)
+    current_gray = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY)
+    expected = skimage_metrics.structural_similarity(origin_gray, current_gray)
+    assert verifier.crop_ssim(origin, current) == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_exact_ssim_close_to_legacy_color_ssim(sample):
+    origin, current, _, _ = sample
+    verifier = RegionVerifier(max_side=0, early_exit=False)
+    expected = skimage_metrics.structural_similarity(origin, current, channel_axis=-1)
+    # 新版以灰階計算 SSIM（與 skimage 灰階 SSIM 的一致性由上一個測試以 1e-6 檢查），
+    # 舊版為三個色彩通道 SSIM 的平均，兩者本來就不相等；此處只限制改用灰階造成的偏差，
+    # 判定結果是否與舊版相同由 test_decisions_match_legacy 檢查。
+    # 樣本為高斯模糊的雜訊，三個通道的結構相近，灰階與彩色 SSIM 的差距應遠小於 0.05。
+    assert verifier.crop_ssim(origin, current) == pytest.approx(expected, abs=0.05)
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_exact_mask_similarity_matches_legacy(sample):
+    _, _, origin_mask, current_mask = sample
+    verifier = RegionVerifier(max_side=0, early_exit=False)
+    score, early_exit = verifier.mask_similarity(origin_mask, current_mask)
+    assert not early_exit
+    assert score == pytest.approx(utils.compare_masks(origin_mask, current_mask), abs=1e-6)
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_phash_similarity_matches_legacy(sample):
+    _, _, origin_mask, current_mask = sample
+    # 舊版以 '0'/'1' 字串計算 pHash 與漢明距離 (utils.phash / utils.phash_similarity)
+    assert ''.join(map(str, np.unpackbits(RegionVerifier.phash(origin_mask)))) == utils.phash(origin_mask)
+    similarity = RegionVerifier.phash_similarity(RegionVerifier.phash(origin_mask), RegionVerifier.phash(current_mask))
+    assert similarity == pytest.approx(utils.phash_similarity(origin_mask, current_mask), abs=1e-9)
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+@pytest.mark.parametrize("max_side", [0, 64])
+def test_decisions_match_legacy(sample, max_side):
+    origin, current, origin_mask, current_mask = sample
+    expected = legacy_missing(origin, current, origin_mask, current_mask)
+    for early_exit in (False, True):
+        verifier = RegionVerifier(max_side=max_side, early_exit=early_exit)
+        result = verifier.verify(origin, current, masks=(origin_mask, current_mask))
+        assert result.missing == expected, f"max_side={max_side}, early_exit={early_exit}"
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_early_exit_skips_masks_only_when_ssim_decides(sample):
+    origin, current, origin_mask, current_mask = sample
+    verifier = RegionVerifier(max_side=0, early_exit=True)
+    calls = []
+
+    def masks():
+        calls.append(1)
+        return origin_mask, current_mask
+
+    result = verifier.verify(origin, current, masks=masks)
+    assert bool(calls) != (result.decided_by == "ssim" and result.early_exit)
@@ -0,0 +1,133 @@
+"""
+以模擬時鐘重播合成的偵測結果，檢查規則引擎的狀態轉換：
+體驗區椅子的 OCCUPIED / VACANT 與促銷區商品丟失通報，門檻秒數以影格時間戳計算。
+
+執行方式（於專案根目錄）：
+    python -m pytest tests/test_rule_replay.py
+"""
+import pytest
+from src.config.config import EXPERIENCE_TIME_THRES, LEAVE_TIME_THRES, EXIT_THRESHOLD, CHECK_DURATION, NOT_EXIST_THRES
+from src.services.replay.detectionLog import DetectionRecorder, DetectionLog, RecordedFrame
+from src.services.replay.ruleReplayer import RuleReplayer
+
+STEP = 0.5  # 幀間隔（秒），為 2 的負次方，時間戳相加沒有浮點誤差
+CAMERA_ID = 'cam-1'
+
+
+def timeline(start: float, end: float):
+    """[start, end] 之間每 STEP 秒一個時間戳"""
+    return [start + STEP * i for i in range(int(round((end - start) / STEP)) + 1)]
+
+
+# ------------------------------------------------------------------ 體驗區
+CHAIR = {'category': 'chair', 'id': 1, 'score': 0.9, 'bbox': [100, 100, 300, 400]}
+PILLOW = {'category': 'pillow_a', 'id': 11, 'score': 0.9, 'bbox': [120, 150, 280, 300]}
+SITTER = {'category': 'person', 'id': 5, 'score': 0.9, 'bbox': [90, 50, 310, 420]}
+PRODUCTS = ['pillow_a']
+
+EMPTY_UNTIL = 4.0  # 椅墊配對需要 3 秒無人的畫面
+SIT_START = EMPTY_UNTIL + STEP
+SIT_END = SIT_START + EXPERIENCE_TIME_THRES + 2.0
+LEAVE_START = SIT_END + STEP
+
+
+def experience_frames():
+    frames = []
+    for ts in timeline(0.0, LEAVE_START + LEAVE_TIME_THRES + 2.0):
+        persons = [dict(SITTER)] if SIT_START <= ts <= SIT_END else []
+        frames.append(RecordedFrame(camera_id=CAMERA_ID, timestamp=ts,
+                                    groups={'chairs': [dict(CHAIR)], 'pillows': [dict(PILLOW)], 'persons': persons},
+                                    extra=PRODUCTS))
+    return frames
+
+
+def replay(area: str, frames, **kwargs):
+    replayer = RuleReplayer(area=area, **kwargs)
+    try:
+        result = replayer.run(frames)
+    finally:
+        replayer.close()
+    return result, replayer.events
+
+
+def test_chair_occupied_then_vacant_after_thresholds():
+    frames = experience_frames()
+    result, events = replay('experience', frames)
+
+    assert result['frames'] == len(frames)
+    assert [event.detail['state'] for event in events] == ['occupied', 'vacant']
+    occupied, vacant = events
+    assert occupied.camera_id == CAMERA_ID and occupied.detail['chair_type'] == 'pillow_a'
+    assert occupied.timestamp == pytest.approx(SIT_START + EXPERIENCE_TIME_THRES)
+    assert vacant.timestamp == pytest.approx(LEAVE_START + LEAVE_TIME_THRES)
+
+
+def test_chair_not_occupied_when_product_is_not_of_interest():
+    frames = [RecordedFrame(camera_id=f.camera_id, timestamp=f.timestamp, groups=f.groups, extra=['other'])
+              for f in experience_frames()]
+    _, events = replay('experience', frames)
+    assert events == []
+
+
+def test_recorded_detections_replay_to_same_events(tmp_path):
+    frames = experience_frames()
+    recorder = DetectionRecorder(area='experience', output_dir=str(tmp_path), chunk_frames=7)
+    for frame in frames:
+        recorder.record(frame.camera_id, frame.timestamp, frame.groups, extra=frame.extra)
+    recorder.close()
+    assert len(recorder.files) > 1
+
+    detection_log = DetectionLog.load([str(tmp_path)])
+    assert detection_log.area == 'experience'
+    assert len(detection_log) == len(frames)
+    assert detection_log.camera_ids() == [CAMERA_ID]
+
+    _, expected = replay('experience', frames)
+    _, events = replay('experience', list(detection_log))
+    assert [(e.timestamp, e.detail['state']) for e in events] == [(e.timestamp, e.detail['state']) for e in expected]
+
+
+# ------------------------------------------------------------------ 促銷區
+ROIS_INFO = [{'id': 'r1', 'position': [[0, 0], [400, 0], [400, 400], [0, 400]]}]
+PRODUCT = {'category': 'object', 'id': 1, 'score': 0.9, 'bbox': [100, 100, 250, 250]}
+SHOPPER = {'category': 'person', 'id': 7, 'score': 0.9, 'bbox': [50, 50, 300, 300]}
+
+PRODUCT_LAST_SEEN = 5.0
+VISIT_END = 8.0
+
+
+def sales_frames(visit_end: float = VISIT_END, end: float = None):
+    """商品在 PRODUCT_LAST_SEEN 前穩定出現，之後顧客進入 ROI 拿走商品，visit_end 後離開"""
+    end = visit_end + EXIT_THRESHOLD + CHECK_DURATION + NOT_EXIST_THRES if end is None else end
+    frames = []
+    for ts in timeline(0.0, end):
+        if ts <= PRODUCT_LAST_SEEN:
+            objects = [dict(PRODUCT)]
+        elif ts <= visit_end:
+            objects = [dict(SHOPPER)]
+        else:
+            objects = []
+        frames.append(RecordedFrame(camera_id=CAMERA_ID, timestamp=ts, groups={'objects': objects}, extra=ROIS_INFO))
+    return frames
+
+
+def test_missing_product_reported_after_shopper_leaves():
+    _, events = replay('sales', sales_frames(), assume_missing=True)
+
+    assert len(events) == 1
+    event = events[0]
+    assert event.kind == 'promotion' and event.camera_id == CAMERA_ID and event.detail['area_id'] == 'r1'
+    # 顧客離開超過 EXIT_THRESHOLD 後開始計時，再經過 CHECK_DURATION 才檢查，且商品需消失超過 NOT_EXIST_THRES
+    earliest = max(VISIT_END + EXIT_THRESHOLD + CHECK_DURATION, PRODUCT_LAST_SEEN + NOT_EXIST_THRES)
+    assert earliest <= event.timestamp <= earliest + 4 * STEP
+
+
+def test_missing_product_not_reported_while_shopper_stays():
+    end = VISIT_END + EXIT_THRESHOLD + CHECK_DURATION + NOT_EXIST_THRES
+    _, events = replay('sales', sales_frames(visit_end=end, end=end), assume_missing=True)
+    assert events == []
+
+
+def test_missing_product_not_reported_when_second_check_finds_it():
+    _, events = replay('sales', sales_frames(), assume_missing=False)
+    assert events == []